@@ -0,0 +1,20 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'csrf.html'
+
+def root(context):
+    if 0: yield None
+    def macro(l_token_value):
+        t_1 = []
+        pass
+        t_1.extend((
+            u'<input type="hidden" name="csrf_token" value="', 
+            escape(l_token_value), 
+            u'">', 
+        ))
+        return Markup(concat(t_1))
+    context.exported_vars.add('make_csrf_input')
+    context.vars['make_csrf_input'] = l_make_csrf_input = Macro(environment, macro, 'make_csrf_input', ('token_value',), (), False, False, False)
+
+blocks = {}
+debug_info = '1=7&2=12'
\ No newline at end of file
@@ -0,0 +1,115 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'dashboard.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'dashboard.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_contributing = context.resolve('contributing')
+    l_own = context.resolve('own')
+    if 0: yield None
+    yield u'\n  <h2>Projects I Own</h2>\n    '
+    if l_own:
+        if 0: yield None
+        yield u'\n        '
+        l_project = missing
+        for l_project in l_own:
+            if 0: yield None
+            yield u'\n          '
+            def macro():
+                t_1 = []
+                pass
+                t_1.extend((
+                    u'\n          <div class="row">\n              <div class="col-md-6 h3">\n                  <a href="/project/', 
+                    escape(context.call(environment.getattr(environment.getattr(l_project, 'key'), 'id'))), 
+                    u'">', 
+                    escape(environment.getattr(l_project, 'name')), 
+                    u'</a>\n              </div>\n              <div class="col-md-3 h3">\n                 ', 
+                ))
+                if environment.getattr(l_project, 'code_link'):
+                    pass
+                    t_1.extend((
+                        u'\n                      <small>\n                        <a href="', 
+                        escape(environment.getattr(l_project, 'code_link')), 
+                        u'">Contribute Code</a>\n                      </small>\n                 ', 
+                    ))
+                t_1.append(
+                    u'\n              </div>\n              <div class="col-md-3 h3">\n                ', 
+                )
+                if environment.getattr(l_project, 'collaboration_link'):
+                    pass
+                    t_1.extend((
+                        u'\n                    <small>\n                        <a href="', 
+                        escape(environment.getattr(l_project, 'collaboration_link')), 
+                        u'">Collaborate</a>\n                    </small>\n                ', 
+                    ))
+                t_1.append(
+                    u'\n              </div>\n          </div>\n          ', 
+                )
+                return Markup(concat(t_1))
+            caller = Macro(environment, macro, None, (), (), False, False, False)
+            yield context.call(environment.extensions['ctc.helpers.fragment_cache.FragmentCacheExtension']._cache_support, 'dashboard.html:6', environment.getattr(l_project, 'key'), environment.getattr(l_project, 'updated_date'), caller=caller)
+            yield u'\n          <br>\n        '
+        l_project = missing
+        yield u'\n    '
+    else:
+        if 0: yield None
+        yield u'\n        <div class="row">\n            <div class="col-md-6 h3">\n                <small>You haven\'t proposed any projects.</small>\n            </div>\n        </div>\n    '
+    yield u'\n\n  <h2>Projects I Contribute To</h2>\n    '
+    if l_contributing:
+        if 0: yield None
+        yield u'\n        '
+        l_project = missing
+        for l_project in l_contributing:
+            if 0: yield None
+            yield u'\n          '
+            def macro():
+                t_2 = []
+                pass
+                t_2.extend((
+                    u'\n          <div class="row">\n              <div class="col-md-6 h3">\n                  <a href="/project/', 
+                    escape(context.call(environment.getattr(environment.getattr(l_project, 'key'), 'id'))), 
+                    u'">', 
+                    escape(environment.getattr(l_project, 'name')), 
+                    u'</a>\n              </div>\n              <div class="col-md-3 h3">\n                 ', 
+                ))
+                if environment.getattr(l_project, 'code_link'):
+                    pass
+                    t_2.extend((
+                        u'\n                      <small>\n                        <a href="', 
+                        escape(environment.getattr(l_project, 'code_link')), 
+                        u'">Contribute Code</a>\n                      </small>\n                 ', 
+                    ))
+                t_2.append(
+                    u'\n              </div>\n              <div class="col-md-3 h3">\n                ', 
+                )
+                if environment.getattr(l_project, 'collaboration_link'):
+                    pass
+                    t_2.extend((
+                        u'\n                    <small>\n                        <a href="', 
+                        escape(environment.getattr(l_project, 'collaboration_link')), 
+                        u'">Collaborate</a>\n                    </small>\n                ', 
+                    ))
+                t_2.append(
+                    u'\n              </div>\n          </div>\n          ', 
+                )
+                return Markup(concat(t_2))
+            caller = Macro(environment, macro, None, (), (), False, False, False)
+            yield context.call(environment.extensions['ctc.helpers.fragment_cache.FragmentCacheExtension']._cache_support, 'dashboard.html:40', environment.getattr(l_project, 'key'), environment.getattr(l_project, 'updated_date'), caller=caller)
+            yield u'\n          <br>\n        '
+        l_project = missing
+        yield u'\n    '
+    else:
+        if 0: yield None
+        yield u'\n        <div class="row">\n              <div class="col-md-6 h3">\n                <small>You\'re not working on any projects.</small>\n              </div>\n        </div>\n    '
+    yield u'\n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=14&4=19&5=23&6=26&9=31&12=36&14=40&19=46&21=50&6=58&38=66&39=70&40=73&43=78&46=83&48=87&53=93&55=97&40=105'
\ No newline at end of file
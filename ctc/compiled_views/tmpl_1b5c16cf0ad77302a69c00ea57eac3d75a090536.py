@@ -0,0 +1,62 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'admin_profile.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'admin_profile.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_profile = context.resolve('profile')
+    l_functions = context.resolve('functions')
+    l_profiles_link = context.resolve('profiles_link')
+    t_1 = environment.filters['int']
+    t_2 = environment.filters['round']
+    t_3 = environment.filters['format']
+    if 0: yield None
+    yield u'\n  <h2>%s %s</h2>\n  <p>\n    %s in %s ms at\n    %s UTC.\n    <a href="%s">All profiles</a>\n  </p>\n  <table class="table table-condensed profile">\n    <tr>\n      <th>Function</th>\n      ' % (
+        escape(environment.getattr(l_profile, 'method')), 
+        escape(environment.getattr(l_profile, 'path')), 
+        escape(environment.getattr(l_profile, 'status')), 
+        escape(t_1(t_2(environment.getattr(l_profile, 'total_ms')))), 
+        escape(context.call(environment.getattr(environment.getattr(l_profile, 'created'), 'strftime'), '%Y-%m-%d %H:%M:%S')), 
+        escape(l_profiles_link), 
+    )
+    l_title = l_column = missing
+    l_sort_key = context.resolve('sort_key')
+    for (l_column, l_title) in [('calls', 'Calls'), ('tottime', 'Own time'), ('cumtime', 'Cumulative time')]:
+        if 0: yield None
+        yield u'\n        <th>\n          '
+        if l_column == l_sort_key:
+            if 0: yield None
+            yield u'\n            %s\n          ' % (
+                escape(l_title), 
+            )
+        else:
+            if 0: yield None
+            yield u'\n            <a href="?sort=%s">%s</a>\n          ' % (
+                escape(l_column), 
+                escape(l_title), 
+            )
+        yield u'\n        </th>\n      '
+    l_title = l_column = missing
+    yield u'\n    </tr>\n    '
+    l_function = missing
+    for l_function in l_functions:
+        if 0: yield None
+        yield u'\n      <tr>\n        <td><code>%s</code></td>\n        <td>%s</td>\n        <td>%s ms</td>\n        <td>%s ms</td>\n      </tr>\n    ' % (
+            escape(environment.getattr(l_function, 'function')), 
+            escape(environment.getattr(l_function, 'calls')), 
+            escape(t_3('%.1f', (environment.getattr(l_function, 'tottime') * 1000))), 
+            escape(t_3('%.1f', (environment.getattr(l_function, 'cumtime') * 1000))), 
+        )
+    l_function = missing
+    yield u'\n  </table>\n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=14&3=23&5=25&6=27&7=28&12=32&15=35&16=38&18=43&23=50&25=53&26=54&27=55&28=56'
\ No newline at end of file
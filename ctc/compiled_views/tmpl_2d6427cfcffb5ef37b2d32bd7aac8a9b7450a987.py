@@ -0,0 +1,32 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'main.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'main.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    if 0: yield None
+    yield u'\n  \n  <div class="col-md-8" id="carousel-wrapper">\n    <div id="main-carousel" class="carousel slide" data-ride="carousel">\n      \n      <ol class="carousel-indicators">\n        <li data-target="#main-carousel" data-slide-to="0"></li>\n        <li data-target="#main-carousel" data-slide-to="1"></li>\n        <li data-target="#main-carousel" data-slide-to="2"></li>\n      </ol>\n      \n      <div class="carousel-inner">\n\n        \n        <div class="item active">\n          <img data-src="holder.js/900x500/auto/#777:#7a7a7a/text:First slide" alt="">\n          <div class="container">\n            <div class="carousel-caption">\n              <h1>Code the Change</h1>\n              <p>Code the Change helps computer scientists use their skills for social change to make social change an integral part of computer science culture.</p>\n              <p><a class="btn btn-lg btn-primary" href="/dashboard" role="button">Make an Account</a></p>\n            </div>\n          </div>\n        </div>\n\n        <div class="item">\n          <img data-src="holder.js/900x500/auto/#666:#6a6a6a/text:Second slide" alt="">\n          <div class="container">\n            <div class="carousel-caption">\n              <h1>Join a Project</h1>\n              <p>Contribute to our many non-profits using your programming expertise.</p>\n              <p><a class="btn btn-lg btn-primary" href="/projects" role="button">Browse gallery</a></p>\n            </div>\n          </div>\n        </div>\n\n        <div class="item">\n          <img data-src="holder.js/900x500/auto/#555:#5a5a5a/text:Third slide" alt="">\n          <div class="container">\n            <div class="carousel-caption">\n              <h1>Create a Project</h1>\n              <p>Have a social cause in mind? Recruit the help of like-minded programmers who share similar interests.</p>\n              <p><a class="btn btn-lg btn-primary" href="/project/new" role="button">Learn more</a></p>\n            </div>\n          </div>\n        </div>\n\n      </div> \n      <a class="left carousel-control" href="#main-carousel" data-slide="prev"><span class="glyphicon glyphicon-chevron-left"></span></a>\n      <a class="right carousel-control" href="#main-carousel" data-slide="next"><span class="glyphicon glyphicon-chevron-right"></span></a>\n    </div> \n  </div> \n'
+
+def block_custom_header(context):
+    l_asset_urls = context.resolve('asset_urls')
+    if 0: yield None
+    yield u'\n  \n  '
+    l_url = missing
+    for l_url in context.call(l_asset_urls, 'main.css'):
+        if 0: yield None
+        yield u'\n  <link href="%s" rel="stylesheet">\n  ' % (
+            escape(l_url), 
+        )
+    l_url = missing
+    yield u'\n'
+
+blocks = {'body': block_body, 'custom_header': block_custom_header}
+debug_info = '1=8&8=14&2=18&4=23&5=26'
\ No newline at end of file
@@ -0,0 +1,87 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'list_projects.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'list_projects.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_projects_and_links = context.resolve('projects_and_links')
+    l_query = context.resolve('query')
+    l_next_link = context.resolve('next_link')
+    l_previous_link = context.resolve('previous_link')
+    if 0: yield None
+    yield u'\n    '
+    if l_query:
+        if 0: yield None
+        yield u'\n      <h2>Projects matching &ldquo;%s&rdquo;</h2>\n    ' % (
+            escape(l_query), 
+        )
+    else:
+        if 0: yield None
+        yield u'\n      <h2>All Projects <br>\n          <small>Here are all of the projects Code the Change is working on or starting soon.</small>\n      </h2>\n    '
+    yield u'\n    <form class="form-inline" role="search" action="/projects" method="get">\n      <div class="form-group">\n        <input type="search" class="form-control" name="q" value="%s" placeholder="Search projects">\n      </div>\n      <button type="submit" class="btn btn-default">Search</button>\n    </form>\n    ' % (
+        escape(l_query), 
+    )
+    if (l_query and (not l_projects_and_links)):
+        if 0: yield None
+        yield u'\n      <p>No projects match your search.</p>\n    '
+    yield u'\n    '
+    l_link = l_project = missing
+    l_memberships = context.resolve('memberships')
+    for (l_project, l_link) in l_projects_and_links:
+        if 0: yield None
+        yield u'\n      \n      '
+        def macro():
+            t_1 = []
+            pass
+            t_1.extend((
+                u'\n      <div class="row">\n          <h3>\n              <div class="col-md-7">\n                     <a href="', 
+                escape(l_link), 
+                u'">', 
+                escape(environment.getattr(l_project, 'name')), 
+                u'</a>\n              </div>\n              <div class="col-md-5">\n                ', 
+            ))
+            if environment.getattr(l_project, 'organization_name'):
+                pass
+                t_1.extend((
+                    u'\n                    <small>Proposed by: ', 
+                    escape(environment.getattr(l_project, 'organization_name')), 
+                    u' </small>\n                ', 
+                ))
+            t_1.extend((
+                u'\n              </div>\n          </h3>\n      </div>\n      <div class="row">\n          <div class="col-md-12 h4">\n              <small>', 
+                escape(environment.getattr(l_project, 'overview')), 
+                u'</small>\n          </div>\n      </div>\n      ', 
+            ))
+            return Markup(concat(t_1))
+        caller = Macro(environment, macro, None, (), (), False, False, False)
+        yield context.call(environment.extensions['ctc.helpers.fragment_cache.FragmentCacheExtension']._cache_support, 'list_projects.html:21', environment.getattr(l_project, 'key'), environment.getattr(l_project, 'updated_date'), caller=caller)
+        yield u'\n      '
+        if context.call(environment.getattr(l_memberships, 'get'), environment.getattr(l_project, 'project_key')):
+            if 0: yield None
+            yield u'\n        <div class="row">\n            <div class="col-md-12">\n                <span class="label label-success">Joined</span>\n            </div>\n        </div>\n      '
+        yield u'\n      <br>\n    '
+    l_link = l_project = missing
+    yield u'\n    <ul class="pager">\n      '
+    if l_previous_link:
+        if 0: yield None
+        yield u'\n        <li class="previous"><a href="%s">&larr; Previous</a></li>\n      ' % (
+            escape(l_previous_link), 
+        )
+    yield u'\n      '
+    if l_next_link:
+        if 0: yield None
+        yield u'\n        <li class="next"><a href="%s">Next &rarr;</a></li>\n      ' % (
+            escape(l_next_link), 
+        )
+    yield u'\n    </ul>\n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=14&3=21&4=24&12=30&16=32&19=38&21=41&25=46&28=51&29=55&36=60&21=65&40=67&50=73&51=76&53=79&54=82'
\ No newline at end of file
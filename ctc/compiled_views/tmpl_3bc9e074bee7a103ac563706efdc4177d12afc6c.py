@@ -0,0 +1,132 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'admin_metrics.html'
+
+def root(context):
+    parent_template = None
+    t_1 = environment.filters['int']
+    t_2 = environment.filters['round']
+    t_3 = environment.tests['none']
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'admin_metrics.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    def macro(l_value):
+        t_4 = []
+        l_max_bucket_ms = context.resolve('max_bucket_ms')
+        l_infinity = context.resolve('infinity')
+        pass
+        if t_3(l_value):
+            pass
+            t_4.append(
+                u'-', 
+            )
+        else:
+            pass
+            if l_value == l_infinity:
+                pass
+                t_4.extend((
+                    u'&gt; ', 
+                    escape(l_max_bucket_ms), 
+                    u' ms', 
+                ))
+            else:
+                pass
+                t_4.extend((
+                    escape(t_1(t_2(l_value))), 
+                    u' ms', 
+                ))
+        return Markup(concat(t_4))
+    context.exported_vars.add('ms')
+    context.vars['ms'] = l_ms = Macro(environment, macro, 'ms', ('value',), (), False, False, False)
+    def macro(l_title, l_rows):
+        t_5 = []
+        l_status_groups = context.resolve('status_groups')
+        pass
+        t_5.extend((
+            u'\n  <h2>', 
+            escape(l_title), 
+            u'</h2>\n  ', 
+        ))
+        if l_rows:
+            pass
+            t_5.append(
+                u'\n    <table class="table table-condensed metrics">\n      <tr>\n        <th>Route</th>\n        <th>Requests</th>\n        <th>p50</th>\n        <th>p95</th>\n        <th>p99</th>\n        <th>Mean</th>\n        <th>Total time</th>\n        ', 
+            )
+            l_status_group = missing
+            for l_status_group in l_status_groups:
+                pass
+                t_5.extend((
+                    u'\n          <th>', 
+                    escape(l_status_group), 
+                    u'</th>\n        ', 
+                ))
+            l_status_group = missing
+            t_5.append(
+                u'\n        <th>Mean size</th>\n      </tr>\n      ', 
+            )
+            l_route_name = l_metrics = missing
+            l_status_groups = context.resolve('status_groups')
+            for (l_route_name, l_metrics) in l_rows:
+                pass
+                t_5.extend((
+                    u'\n        <tr>\n          <td>', 
+                    escape(l_route_name), 
+                    u'</td>\n          <td>', 
+                    escape(environment.getattr(l_metrics, 'count')), 
+                    u'</td>\n          <td>', 
+                    escape(context.call(l_ms, context.call(environment.getattr(l_metrics, 'percentile'), 0.5))), 
+                    u'</td>\n          <td>', 
+                    escape(context.call(l_ms, context.call(environment.getattr(l_metrics, 'percentile'), 0.95))), 
+                    u'</td>\n          <td>', 
+                    escape(context.call(l_ms, context.call(environment.getattr(l_metrics, 'percentile'), 0.99))), 
+                    u'</td>\n          <td>', 
+                    escape(context.call(l_ms, context.call(environment.getattr(l_metrics, 'mean_ms')))), 
+                    u'</td>\n          <td>', 
+                    escape(context.call(l_ms, environment.getattr(l_metrics, 'total_ms'))), 
+                    u'</td>\n          ', 
+                ))
+                l_status_group = missing
+                for l_status_group in l_status_groups:
+                    pass
+                    t_5.extend((
+                        u'\n            <td>', 
+                        escape(environment.getitem(environment.getattr(l_metrics, 'statuses'), l_status_group)), 
+                        u'</td>\n          ', 
+                    ))
+                l_status_group = missing
+                t_5.extend((
+                    u'\n          <td>', 
+                    escape(t_1(t_2(context.call(environment.getattr(l_metrics, 'mean_bytes'))))), 
+                    u' B</td>\n        </tr>\n      ', 
+                ))
+            l_route_name = l_metrics = missing
+            t_5.append(
+                u'\n    </table>\n  ', 
+            )
+        else:
+            pass
+            t_5.append(
+                u'\n    <p>No requests yet.</p>\n  ', 
+            )
+        t_5.append(
+            u'\n', 
+        )
+        return Markup(concat(t_5))
+    context.exported_vars.add('metrics_table')
+    context.vars['metrics_table'] = l_metrics_table = Macro(environment, macro, 'metrics_table', ('title', 'rows'), (), False, False, False)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_all_instances = context.resolve('all_instances')
+    l_metrics_table = context.resolve('metrics_table')
+    l_this_instance = context.resolve('this_instance')
+    if 0: yield None
+    yield u'\n  <p>\n    Percentiles are the upper bounds of the latency buckets that they fall in.\n    Routes are sorted by their total time.\n  </p>\n  %s\n  %s\n' % (
+        escape(context.call(l_metrics_table, 'All instances', l_all_instances)), 
+        escape(context.call(l_metrics_table, 'This instance', l_this_instance)), 
+    )
+
+blocks = {'body': block_body}
+debug_info = '1=11&2=14&3=19&5=42&6=48&7=51&17=57&18=61&22=70&24=74&25=76&26=78&27=80&28=82&29=84&30=86&31=90&32=94&34=100&42=121&47=127&48=128'
\ No newline at end of file
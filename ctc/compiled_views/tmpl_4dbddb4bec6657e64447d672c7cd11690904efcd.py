@@ -0,0 +1,49 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'display_user.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'display_user.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_profile = context.resolve('profile')
+    l_edit_link = context.resolve('edit_link')
+    if 0: yield None
+    yield u'\n  <div id="profile-header">\n    <div class="jumbotron">\n      <h1>%s</h1>\n    </div>\n\n    <div class="col-xs-8">\n      ' % (
+        escape(environment.getattr(l_profile, 'name')), 
+    )
+    if l_edit_link:
+        if 0: yield None
+        yield u'\n        <a href="%s"><button class="btn btn-primary" id="button-edit">Edit Your Profile</button></a>\n      ' % (
+            escape(l_edit_link), 
+        )
+    yield u'\n      <h2>Email</h2>\n      <p>%s</p>\n\n      ' % (
+        escape(environment.getattr(l_profile, 'email')), 
+    )
+    if environment.getattr(l_profile, 'secondary_contact'):
+        if 0: yield None
+        yield u'\n        <h2>Secondary Contact</h2>\n        <p>%s</p>\n      ' % (
+            escape(environment.getattr(l_profile, 'secondary_contact')), 
+        )
+    yield u'\n\n      '
+    if environment.getattr(l_profile, 'biography'):
+        if 0: yield None
+        yield u'\n        <h2>Developer History</h2>\n        <p>%s</p>\n      ' % (
+            escape(environment.getattr(l_profile, 'biography')), 
+        )
+    yield u'\n\n      '
+    if environment.getattr(l_profile, 'website'):
+        if 0: yield None
+        yield u'\n        <h2>Github Profile</h2>\n        <p>%s</p>\n      ' % (
+            escape(environment.getattr(l_profile, 'website')), 
+        )
+    yield u'\n    </div>\n  </div> \n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=14&5=19&9=21&10=24&13=27&15=29&17=32&20=35&22=38&25=41&27=44'
\ No newline at end of file
@@ -0,0 +1,39 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'edit_user.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'edit_user.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    included_template = environment.get_template('csrf.html', 'edit_user.html').module
+    l_make_csrf_input = getattr(included_template, 'make_csrf_input', missing)
+    if l_make_csrf_input is missing:
+        l_make_csrf_input = environment.undefined("the template %r (imported on line 2 in 'edit_user.html') does not export the requested name 'make_csrf_input'" % included_template.__name__, name='make_csrf_input')
+    context.vars['make_csrf_input'] = l_make_csrf_input
+    context.exported_vars.discard('make_csrf_input')
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_action = context.resolve('action')
+    l_csrf_token = context.resolve('csrf_token')
+    l_action_link = context.resolve('action_link')
+    l_profile = context.resolve('profile')
+    l_make_csrf_input = context.resolve('make_csrf_input')
+    if 0: yield None
+    yield u'\n  <h1>%s User</h1>\n  <hr>\n  <form action="%s" method="post">\n    %s\n    <div class="col-md-8 project-form">\n      \n      <h3>User Name</h3>\n      <div class="input-group input-large">\n        <input type="text" class="form-control" name="name"\n               placeholder="Enter the name you\'d like to have displayed."\n               value="%s">\n      </div>\n\n      \n\n      <h3>Secondary Contact Information</h3>\n      <div class="input-group input-large">\n        <input type="text" class="form-control" name="secondary_contact"\n               placeholder="[OPTIONAL] If you\'d like to share another way to get in touch..."\n               value="%s">\n      </div>\n\n      <h3>Biography</h3>\n      <div class="input-group input-large">\n        <textarea class="form-control" rows="5" name="biography"\n                  placeholder="Let people know what you\'ve worked on.">%s</textarea>\n      </div>\n\n      <h3>Github Link</h3>\n      <div class="input-group input-large">\n        <input type="text" class="form-control" name="website"\n               placeholder="Share a link to your Github profile if you have one."\n               value="%s">\n      </div>\n\n      <div>\n        <input class="btn btn-primary" type="submit" value="%s User">\n      </div>\n    </div> \n  </form>\n\n  \n  <div class="col-md-4">\n    <div>\n      \n      <br>\n      <br>\n      <p>Feel free to update your profile so other users can get in touch with you.</p>\n    </div>\n  </div>\n' % (
+        escape(l_action), 
+        escape(l_action_link), 
+        escape(context.call(l_make_csrf_input, l_csrf_token)), 
+        escape((l_profile and environment.getattr(l_profile, 'name'))), 
+        escape((l_profile and environment.getattr(l_profile, 'secondary_contact'))), 
+        escape((l_profile and environment.getattr(l_profile, 'biography'))), 
+        escape((l_profile and environment.getattr(l_profile, 'website'))), 
+        escape(l_action), 
+    )
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=11&3=20&4=28&6=29&7=30&14=31&31=32&38=33&46=34&50=35'
\ No newline at end of file
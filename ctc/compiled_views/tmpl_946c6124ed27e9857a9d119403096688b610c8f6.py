@@ -0,0 +1,45 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'admin_profiles.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'admin_profiles.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_profiles_and_links = context.resolve('profiles_and_links')
+    l_query_parameter = context.resolve('query_parameter')
+    t_1 = environment.filters['int']
+    t_2 = environment.filters['round']
+    if 0: yield None
+    yield u'\n  <h2>Profiled Requests</h2>\n  <p>\n    To profile a request, add <code>?%s=1</code> to its URL\n    while logged in as an admin.\n  </p>\n  ' % (
+        escape(l_query_parameter), 
+    )
+    if l_profiles_and_links:
+        if 0: yield None
+        yield u'\n    <table class="table table-condensed profiles">\n      <tr>\n        <th>Time (UTC)</th>\n        <th>Request</th>\n        <th>Status</th>\n        <th>Duration</th>\n      </tr>\n      '
+        l_link = l_profile = missing
+        for (l_profile, l_link) in l_profiles_and_links:
+            if 0: yield None
+            yield u'\n        <tr>\n          <td>%s</td>\n          <td>\n            <a href="%s">\n              %s %s\n            </a>\n          </td>\n          <td>%s</td>\n          <td>%s ms</td>\n        </tr>\n      ' % (
+                escape(context.call(environment.getattr(environment.getattr(l_profile, 'created'), 'strftime'), '%Y-%m-%d %H:%M:%S')), 
+                escape(l_link), 
+                escape(environment.getattr(l_profile, 'method')), 
+                escape(environment.getattr(l_profile, 'path')), 
+                escape(environment.getattr(l_profile, 'status')), 
+                escape(t_1(t_2(environment.getattr(l_profile, 'total_ms')))), 
+            )
+        l_link = l_profile = missing
+        yield u'\n    </table>\n  '
+    else:
+        if 0: yield None
+        yield u'\n    <p>No requests have been profiled.</p>\n  '
+    yield u'\n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=14&5=21&8=23&16=27&18=30&20=31&21=32&24=34&25=35'
\ No newline at end of file
@@ -0,0 +1,114 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'display_project.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'display_project.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    included_template = environment.get_template('csrf.html', 'display_project.html').module
+    l_make_csrf_input = getattr(included_template, 'make_csrf_input', missing)
+    if l_make_csrf_input is missing:
+        l_make_csrf_input = environment.undefined("the template %r (imported on line 2 in 'display_project.html') does not export the requested name 'make_csrf_input'" % included_template.__name__, name='make_csrf_input')
+    context.vars['make_csrf_input'] = l_make_csrf_input
+    context.exported_vars.discard('make_csrf_input')
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_num_contributors = context.resolve('num_contributors')
+    l_csrf_token = context.resolve('csrf_token')
+    l_action_link = context.resolve('action_link')
+    l_collaborator_emails = context.resolve('collaborator_emails')
+    l_make_csrf_input = context.resolve('make_csrf_input')
+    l_project = context.resolve('project')
+    l_user_is_logged_out = context.resolve('user_is_logged_out')
+    l_action = context.resolve('action')
+    l_edit_link = context.resolve('edit_link')
+    if 0: yield None
+    yield u'\n  <div id="project-header">\n    \n    '
+    def macro():
+        t_1 = []
+        l_project = context.resolve('project')
+        pass
+        t_1.extend((
+            u'\n    <div class="jumbotron">\n      <h1>', 
+            escape(environment.getattr(l_project, 'name')), 
+            u'</h1>\n      <p class="lead">', 
+            escape(environment.getattr(l_project, 'overview')), 
+            u'</p>\n    </div>\n    ', 
+        ))
+        return Markup(concat(t_1))
+    caller = Macro(environment, macro, None, (), (), False, False, False)
+    yield context.call(environment.extensions['ctc.helpers.fragment_cache.FragmentCacheExtension']._cache_support, 'display_project.html:7', environment.getattr(l_project, 'key'), environment.getattr(l_project, 'updated_date'), caller=caller)
+    yield u'\n\n    <div class="col-xs-8">\n      '
+    if l_edit_link:
+        if 0: yield None
+        yield u'\n        <a href="%s"><button class="btn btn-primary" id="button-edit">Edit Your Project</button></a>\n      ' % (
+            escape(l_edit_link), 
+        )
+    yield u'\n      '
+    def macro():
+        t_2 = []
+        l_project = context.resolve('project')
+        pass
+        t_2.extend((
+            u'\n      <h2>', 
+            escape(environment.getattr(l_project, 'organization_name')), 
+            u'</h2>\n      <p class="plain-text">', 
+            escape(environment.getattr(l_project, 'organization_mission')), 
+            u'</p>\n      <p><strong>Contact Info</strong></p>\n      <p class="plain-text">', 
+            escape(environment.getattr(l_project, 'organization_contact')), 
+            u'</p>\n      <h2>Technical Details</h2>\n      ', 
+        ))
+        if environment.getattr(l_project, 'code_link'):
+            pass
+            t_2.extend((
+                u'\n        <p>\n          <strong>Code:</strong>\n          <a href="', 
+                escape(environment.getattr(l_project, 'code_link')), 
+                u'">', 
+                escape(environment.getattr(l_project, 'code_link')), 
+                u'</a>\n        </p>\n      ', 
+            ))
+        t_2.extend((
+            u'\n      <p>\n        <strong>Collaboration:</strong>\n        <a href="', 
+            escape(environment.getattr(l_project, 'collaboration_link')), 
+            u'">', 
+            escape(environment.getattr(l_project, 'collaboration_link')), 
+            u'</a>\n      </p>\n      <p class="plain-text">', 
+            escape(environment.getattr(l_project, 'details')), 
+            u'</p>\n      ', 
+        ))
+        return Markup(concat(t_2))
+    caller = Macro(environment, macro, None, (), (), False, False, False)
+    yield context.call(environment.extensions['ctc.helpers.fragment_cache.FragmentCacheExtension']._cache_support, 'display_project.html:18', environment.getattr(l_project, 'key'), environment.getattr(l_project, 'updated_date'), caller=caller)
+    yield u'\n    </div>\n\n    <div class="col-xs-4">\n      <div id="numbers">\n        <h1>%s</h1>\n        <p>People Involved</p>\n        ' % (
+        escape(l_num_contributors), 
+    )
+    l_email = missing
+    for l_email in l_collaborator_emails:
+        if 0: yield None
+        yield u'\n          <p class="email"><a href="mailto:%s">%s</a></p>\n        ' % (
+            escape(l_email), 
+            escape(l_email), 
+        )
+    l_email = missing
+    yield u'\n\n        '
+    if l_user_is_logged_out:
+        if 0: yield None
+        yield u'\n          <a href="%s"><button class="btn btn-primary btn-lg" id="button-log-to-join">Login to Join</button></a>\n        ' % (
+            escape(l_action_link), 
+        )
+    else:
+        if 0: yield None
+        yield u'\n          <form action=\'%s\' method=\'post\'>\n            %s\n            <div><input class="btn btn-primary btn-lg" type=\'submit\' value=\'%s the Team\'></div>\n          </form>\n        ' % (
+            escape(l_action_link), 
+            escape(context.call(l_make_csrf_input, l_csrf_token)), 
+            escape(l_action), 
+        )
+    yield u'\n      </div>\n    </div>\n  </div> \n'
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=11&3=20&7=32&9=38&10=40&7=45&15=47&16=50&18=53&19=59&20=61&22=63&24=66&27=70&32=77&34=81&18=86&40=88&42=91&43=94&46=99&47=102&49=107&50=108&51=109'
\ No newline at end of file
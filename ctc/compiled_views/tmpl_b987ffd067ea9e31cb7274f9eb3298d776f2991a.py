@@ -0,0 +1,17 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'header.html'
+
+def root(context):
+    l_logout_url = context.resolve('logout_url')
+    if 0: yield None
+    yield u'<div id="header-wrapper">\n  <nav class="navbar navbar-default" role="navigation">\n    <div class="container-fluid">\n      \n      <div class="navbar-header">\n        <button type="button" class="navbar-toggle" data-toggle="collapse" data-target="#bs-example-navbar-collapse-1">\n          <span class="sr-only">Toggle navigation</span>\n          <span class="icon-bar"></span>\n          <span class="icon-bar"></span>\n          <span class="icon-bar"></span>\n        </button>\n        <a class="navbar-brand" href="/">Code the Change</a>\n      </div>\n\n      \n      <div class="collapse navbar-collapse" id="bs-example-navbar-collapse-1">\n        <ul class="nav navbar-nav">\n          <li><a href="/dashboard">Dashboard</a></li>\n          <li><a href="/projects">All Projects</a></li>\n          <li><a href="/project/new"><span class="navbar-standout">Create Project</span></a></li>\n        </ul>\n        <ul class="nav navbar-nav navbar-right">\n          '
+    if l_logout_url:
+        if 0: yield None
+        yield u'\n            <li><a href="%s">Logout</a></li>\n          ' % (
+            escape(l_logout_url), 
+        )
+    yield u'\n        </ul>\n      </div> \n    </div> \n  </nav>\n</div>'
+
+blocks = {}
+debug_info = '23=9&24=12'
\ No newline at end of file
@@ -0,0 +1,50 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'edit_project.html'
+
+def root(context):
+    parent_template = None
+    if 0: yield None
+    parent_template = environment.get_template('base.html', 'edit_project.html')
+    for name, parent_block in parent_template.blocks.iteritems():
+        context.blocks.setdefault(name, []).append(parent_block)
+    included_template = environment.get_template('csrf.html', 'edit_project.html').module
+    l_make_csrf_input = getattr(included_template, 'make_csrf_input', missing)
+    if l_make_csrf_input is missing:
+        l_make_csrf_input = environment.undefined("the template %r (imported on line 2 in 'edit_project.html') does not export the requested name 'make_csrf_input'" % included_template.__name__, name='make_csrf_input')
+    context.vars['make_csrf_input'] = l_make_csrf_input
+    context.exported_vars.discard('make_csrf_input')
+    for event in parent_template.root_render_func(context):
+        yield event
+
+def block_body(context):
+    l_csrf_token = context.resolve('csrf_token')
+    l_action_link = context.resolve('action_link')
+    l_make_csrf_input = context.resolve('make_csrf_input')
+    l_project = context.resolve('project')
+    l_action = context.resolve('action')
+    if 0: yield None
+    yield u'\n  <h1>%s Project</h1>\n  <hr>\n  <form id="project-form" action="%s" method="post">\n    %s\n    <div class="col-md-8 project-form">\n      \n      <h3>Project Name</h3>\n      <div class="input-group input-large">\n        <input type="text" class="form-control" name="name"\n               placeholder="Enter a name for your project."\n               value="%s" required>\n      </div>\n\n      <h3>Two Sentence Overview</h3>\n      <div class="input-group input-large">\n        <textarea class="form-control" rows="2" name="overview"\n                  placeholder="Write a short description of your project."\n                  required>%s</textarea>\n      </div>\n\n      <h3>Organization Name</h3>\n      <div class="input-group input-large">\n        <input type="text" class="form-control" name="organization_name"\n               placeholder="Who is behind the project?"\n               value="%s" required>\n      </div>\n\n      <h3>Mission</h3>\n      <div class="input-group input-large">\n        <textarea\n           class="form-control" rows="5" name="organization_mission"\n           placeholder="Feel free to put any information here about your organization.  Some people may be interested in what problems are you working on, who your beneficiaries are, etc." required>%s</textarea>\n      </div>\n\n      <h3>Contact Info</h3>\n      <div class="input-group input-large">\n        <textarea class="form-control" rows="2" name="organization_contact"\n                  placeholder="How should interested volunteers contact you?"\n                  required>%s</textarea>\n      </div>\n\n      <h3>Project Description</h3>\n      <div class="input-group input-large">\n        <textarea class="form-control" rows="12" name="details" required>' % (
+        escape(l_action), 
+        escape(l_action_link), 
+        escape(context.call(l_make_csrf_input, l_csrf_token)), 
+        escape((l_project and environment.getattr(l_project, 'name'))), 
+        escape((l_project and environment.getattr(l_project, 'overview'))), 
+        escape((l_project and environment.getattr(l_project, 'organization_name'))), 
+        escape((l_project and environment.getattr(l_project, 'organization_mission'))), 
+        escape((l_project and environment.getattr(l_project, 'organization_contact'))), 
+    )
+    if (l_project and environment.getattr(l_project, 'details')):
+        if 0: yield None
+        yield escape(environment.getattr(l_project, 'details'))
+    else:
+        if 0: yield None
+        yield u'Describe your project.  You can do this however you feel is appropriate, but you may want to include details such as:\n* What impact will it have?\n* What technical skills are required (programming languages, frameworks)?\n* What is the timeframe on the project (do you need it done by a certain date?)\n* What work, if any, has already been done on the project?\n* What should the design look like?  If you can link to some mocks (hand drawn is fine!), that would be a big help!\n* How do you expect users to use the project?  If you have done user interviews or have put together any of this information, link to it.\n* Do you already have technical people on your team?'
+    yield u'</textarea>\n      </div>\n\n      <h3>Collaboration Link</h3>\n      <div class="input-group input-large">\n        <input type="url" class="form-control" name="collaboration_link"\n               placeholder="Link to a Google Doc or some other way for volunteers to easily collaborate."\n               value="%s" required>\n      </div>\n\n      <h3>Code Link</h3>\n      <div class="input-group input-large">\n        <input class="form-control" name="code_link"\n               placeholder="If you already have a code repo (eg, GitHub) set up for your project, link to it here."\n               value="%s" type="url">\n      </div>\n\n      <div>\n        <input class="btn btn-primary" type="submit" value="%s Project">\n      </div>\n    </div> \n  </form>\n\n  \n  <div class="col-md-4">\n    <div>\n      \n      <br>\n      <br>\n      <p>Thanks for using Code the Change Projects! We have a few guidelines, however:</p>\n      <ul>\n        <li>\n          <strong>Each submission should be an actual project.</strong>\n          Projects should have a clearly defined beginning and end.\n        </li>\n        <li>\n          <strong>Each project should have some relevance to software development.</strong>\n          Programming, software design, algorithms, and data analysis are the\n          main areas we focus on.\n        <li>\n          <strong>Projects should have a social mission.</strong>\n          Our community is oriented around supporting nonprofits, social\n          enterprises, and the public sector.\n        </li>\n      </ul>\n    </div>\n  </div>\n\n  <script>\n    $(\'#project-form\').validate();\n  </script>\n' % (
+        escape((l_project and environment.getattr(l_project, 'collaboration_link'))), 
+        escape((l_project and environment.getattr(l_project, 'code_link'))), 
+        escape(l_action), 
+    )
+
+blocks = {'body': block_body}
+debug_info = '1=8&2=11&3=20&4=28&6=29&7=30&14=31&22=32&30=33&41=34&50=35&57=37&58=39&77=44&84=45&88=46'
\ No newline at end of file
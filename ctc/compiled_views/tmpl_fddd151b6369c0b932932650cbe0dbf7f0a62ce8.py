@@ -0,0 +1,47 @@
+from __future__ import division
+from jinja2.runtime import LoopContext, TemplateReference, Macro, Markup, TemplateRuntimeError, missing, concat, escape, markup_join, unicode_join, to_string, identity, TemplateNotFound
+name = 'base.html'
+
+def root(context):
+    l_asset_urls = context.resolve('asset_urls')
+    if 0: yield None
+    yield u'<!DOCTYPE html>\n<html lang="en">\n<head>\n  <meta charset="utf-8">\n  <meta name="description" content="A database that matches nonprofits with computer scientists">\n  <meta name="author" content="https://codethechange.org/contact">\n  <meta name="viewport" content="width=device-width, initial-scale=1.0">\n  <meta http-equiv="X-UA-Compatible" content="IE=edge">\n\n  <title>Code the Change Projects</title>\n\n  '
+    l_url = missing
+    for l_url in context.call(l_asset_urls, 'site.css'):
+        if 0: yield None
+        yield u'\n  <link href="%s" rel="stylesheet">\n  ' % (
+            escape(l_url), 
+        )
+    l_url = missing
+    yield u'\n\n  '
+    l_url = missing
+    for l_url in context.call(l_asset_urls, 'site.js'):
+        if 0: yield None
+        yield u'\n  <script src="%s"></script>\n  ' % (
+            escape(l_url), 
+        )
+    l_url = missing
+    yield u'\n\n  '
+    for event in context.blocks['custom_header'][0](context):
+        yield event
+    yield u'\n  '
+    template = environment.get_template('analytics.html', 'base.html')
+    for event in template.root_render_func(template.new_context(context.parent, True, locals())):
+        yield event
+    yield u'\n</head>\n<body>\n  '
+    template = environment.get_template('header.html', 'base.html')
+    for event in template.root_render_func(template.new_context(context.parent, True, locals())):
+        yield event
+    yield u'\n  <div id="main-content">\n    '
+    for event in context.blocks['body'][0](context):
+        yield event
+    yield u'\n  </div>\n</body>\n</html>'
+
+def block_body(context):
+    if 0: yield None
+
+def block_custom_header(context):
+    if 0: yield None
+
+blocks = {'body': block_body, 'custom_header': block_custom_header}
+debug_info = '12=10&13=13&16=18&17=21&20=25&21=28&24=32&26=36&20=43'
\ No newline at end of file
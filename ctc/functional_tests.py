@@ -4,9 +4,17 @@ See http://webapp-improved.appspot.com/guide/testing.html for the webapp2
 handler testing guide or http://webtest.pythonpaste.org/en/latest/ for webtest.
 """
 
+import time
 import unittest
 
+import mock
+
+from google.appengine.api import memcache
+from google.appengine.api import users
+from google.appengine.ext import ndb
+
 from ctc import server
+from ctc.helpers import conditional_get
 from ctc.helpers import csrf
 from ctc.models import collaborator as collaborator_model
 from ctc.models import project as project_model
@@ -58,6 +66,179 @@ class FunctionalTests(testutil.CtcTestCase):
         self.assertIn('hello', response.body)
         self.assertIn('world', response.body)
 
+    def test_list_projects_marks_joined_projects(self):
+        user_key = self.login().key
+        project = model_helpers.create_project('joined')
+        model_helpers.create_project('not joined')
+        response = self.testapp.get('/projects', status=200)
+        self.assertNotIn('Joined', response.body)
+        collaborator_model.add_collaborator(user_key, project.key)
+        response = self.testapp.get('/projects', status=200)
+        self.assertEqual(response.body.count('Joined'), 1)
+
+    def test_list_projects_skips_unused_values(self):
+        model_helpers.create_project('hello')
+        # The projects list has no forms, so it shouldn't make a CSRF token
+        # (which would load the secret key ring from the datastore), and it
+        # doesn't use the login URL.
+        with mock.patch.object(csrf, '_load_key_ring') as load_key_ring:
+            with mock.patch.object(users, 'create_login_url') as login_url:
+                self.testapp.get('/projects', status=200)
+                self.login()
+                self.testapp.get('/projects', status=200)
+        self.assertFalse(load_key_ring.called)
+        self.assertFalse(login_url.called)
+        self.assertIsNone(
+            ndb.Key(csrf.SecretKeyRing, csrf.KEY_RING_ID).get())
+
+    def test_list_projects_pagination(self):
+        for i in range(project_model.PAGE_SIZE + 1):
+            model_helpers.create_project('project%03d' % i)
+        first_page = self.testapp.get('/projects', status=200)
+        self.assertIn('project000', first_page.body)
+        self.assertNotIn('project%03d' % project_model.PAGE_SIZE,
+                         first_page.body)
+        self.assertNotIn('Previous', first_page.body)
+        second_page = first_page.click('Next')
+        self.assertIn('project%03d' % project_model.PAGE_SIZE,
+                      second_page.body)
+        self.assertNotIn('project000', second_page.body)
+        self.assertNotIn('Next', second_page.body)
+        previous_page = second_page.click('Previous')
+        self.assertIn('project000', previous_page.body)
+        # A malformed cursor is a bad request rather than a server error.
+        self.testapp.get('/projects?cursor=garbage', status=400)
+
+    def test_search_projects(self):
+        model_helpers.create_project(
+            'Community Gardens', overview='A map of gardening plots')
+        model_helpers.create_project('Food Bank', overview='Tracks donations')
+        response = self.testapp.get('/projects?q=garden', status=200)
+        self.assertIn('Community Gardens', response.body)
+        self.assertNotIn('Food Bank', response.body)
+        response = self.testapp.get('/projects?q=tracking+donation', status=200)
+        self.assertIn('Food Bank', response.body)
+        self.assertNotIn('Community Gardens', response.body)
+        response = self.testapp.get('/projects?q=garden+food', status=200)
+        self.assertIn('No projects match', response.body)
+        # An empty search lists every project.
+        response = self.testapp.get('/projects?q=+', status=200)
+        self.assertIn('Community Gardens', response.body)
+        self.assertIn('Food Bank', response.body)
+        self.testapp.get('/projects?q=garden&offset=-1', status=400)
+        self.testapp.get('/projects?q=garden&offset=garbage', status=400)
+
+    def test_search_projects_pagination(self):
+        for i in range(project_model.PAGE_SIZE + 1):
+            model_helpers.create_project('project%03d' % i, overview='robot')
+        first_page = self.testapp.get('/projects?q=robots', status=200)
+        self.assertNotIn('Previous', first_page.body)
+        second_page = first_page.click('Next')
+        self.assertNotIn('Next', second_page.body)
+        names = set('project%03d' % i
+                    for i in range(project_model.PAGE_SIZE + 1))
+        first_names = set(name for name in names if name in first_page.body)
+        second_names = set(name for name in names if name in second_page.body)
+        self.assertEqual(len(first_names), project_model.PAGE_SIZE)
+        self.assertEqual(first_names | second_names, names)
+        previous_page = second_page.click('Previous')
+        self.assertEqual(previous_page.body, first_page.body)
+
+    def test_logged_out_pages_are_cached(self):
+        # The logged in user owns the project so that they can edit it.
+        self.login()
+        project = model_helpers.create_project('hello')
+        self.logout()
+        project_path = '/project/%d' % project.key.id()
+        for path in ['/projects', project_path]:
+            first = self.testapp.get(path, status=200)
+            self.assertEqual(first.headers['X-Page-Cache'], 'miss')
+            second = self.testapp.get(path, status=200)
+            self.assertEqual(second.headers['X-Page-Cache'], 'hit')
+            self.assertEqual(first.body, second.body)
+        # Logged in users aren't served from the cache.
+        self.login()
+        page = self.testapp.get(project_path, status=200)
+        self.assertNotIn('X-Page-Cache', page.headers)
+        # Editing the project invalidates its page and the list.
+        csrf_token = csrf.make_token(project_path + '/edit')
+        self.testapp.post(project_path + '/edit',
+                          {'name': 'goodbye', 'csrf_token': csrf_token})
+        self.logout()
+        for path in ['/projects', project_path]:
+            page = self.testapp.get(path, status=200)
+            self.assertEqual(page.headers['X-Page-Cache'], 'miss')
+            self.assertIn('goodbye', page.body)
+
+    def test_join_invalidates_logged_out_project_page(self):
+        project = model_helpers.create_project()
+        project_path = '/project/%d' % project.key.id()
+        self.testapp.get(project_path, status=200)
+        self.login()
+        join_path = project_path + '/join'
+        self.testapp.post(
+            join_path, {'csrf_token': csrf.make_token(join_path)}, status=302)
+        self.logout()
+        page = self.testapp.get(project_path, status=200)
+        self.assertRegexpMatches(
+            page.body, 'id="numbers".*\n.*<h1>1</h1>.*\n.*People Involved')
+
+    def test_conditional_get(self):
+        project = model_helpers.create_project()
+        project_path = '/project/%d' % project.key.id()
+        for path in ['/projects', project_path]:
+            page = self.testapp.get(path, status=200)
+            etag = page.headers['ETag']
+            not_modified = self.testapp.get(
+                path, headers={'If-None-Match': etag}, status=304)
+            self.assertEqual(not_modified.headers['Vary'],
+                             page.headers['Vary'])
+            self.testapp.get(
+                path, headers={'If-None-Match': '"stale"'}, status=200)
+        # Joining changes the project page and the joined marks on the list for
+        # the user who joined.
+        self.login()
+        etags = dict((path, self.testapp.get(path).headers['ETag'])
+                     for path in ['/projects', project_path])
+        join_path = project_path + '/join'
+        self.testapp.post(
+            join_path, {'csrf_token': csrf.make_token(join_path)}, status=302)
+        for path, etag in etags.items():
+            page = self.testapp.get(
+                path, headers={'If-None-Match': etag}, status=200)
+            self.assertIn('private', page.headers['Cache-Control'])
+
+    def test_compressed_pages(self):
+        for index in range(project_model.PAGE_SIZE):
+            model_helpers.create_project('project%03d' % index)
+        gzip_header = {'Accept-Encoding': 'gzip'}
+        page = self.testapp.get('/projects', headers=gzip_header, status=200)
+        self.assertIn('Accept-Encoding', page.headers['Vary'])
+        self.assertIn('project000', page.body)
+        # Compressed pages have weak ETags, which still match.
+        etag = page.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        gzip_header['If-None-Match'] = etag
+        not_modified = self.testapp.get(
+            '/projects', headers=gzip_header, status=304)
+        self.assertEqual(not_modified.headers['Vary'], page.headers['Vary'])
+
+    def test_conditional_get_if_modified_since(self):
+        project = model_helpers.create_project()
+        project_path = '/project/%d' % project.key.id()
+        # Pages that were just modified don't have a Last-Modified.
+        page = self.testapp.get(project_path, status=200)
+        self.assertNotIn('Last-Modified', page.headers)
+        with mock.patch.object(conditional_get.time, 'time',
+                               return_value=time.time() + 10):
+            page = self.testapp.get(project_path, status=200)
+            last_modified = page.headers['Last-Modified']
+            self.testapp.get(
+                project_path, headers={'If-Modified-Since': last_modified},
+                status=304)
+        # Missing projects aren't validated.
+        self.testapp.get('/project/12345', status=404)
+
     def test_get_edit_project(self):
         self.login()
         project = model_helpers.create_project('hello', 'world')
@@ -104,6 +285,20 @@ class FunctionalTests(testutil.CtcTestCase):
         self.assertIn('hello', project_page.body)
         self.assertIn('world', project_page.body)
 
+    def test_display_missing_project(self):
+        self.testapp.get('/project/12345', status=404)
+
+    def test_owner_sees_collaborator_emails(self):
+        owner_key = self.login().key
+        project = model_helpers.create_project(owner_key=owner_key)
+        collaborator_key = user_model.User(
+            email='collaborator@codethechange.org').put()
+        collaborator_model.add_collaborator(collaborator_key, project.key)
+        project_page = self.testapp.get(
+            '/project/%d' % project.key.id(), status=200)
+        self.assertIn('collaborator@codethechange.org', project_page.body)
+        self.assertIn('Edit Your Project', project_page.body)
+
     def test_project_page_includes_counts(self):
         user_key = self.login().key
         project = model_helpers.create_project('hello', 'world')
@@ -114,9 +309,7 @@ class FunctionalTests(testutil.CtcTestCase):
             project_page.body,
             'id="numbers".*\n.*<h1>0</h1>.*\n.*People Involved')
         # Add a collaborator and check to see the count increments.
-        collab = collaborator_model.Collaborator(
-            user_key=user_key, parent=project.key)
-        collab.put()
+        collaborator_model.add_collaborator(user_key, project.key)
         project_page = self.testapp.get('/project/%d' % project_id, status=200)
         self.assertRegexpMatches(
             project_page.body,
@@ -131,9 +324,7 @@ class FunctionalTests(testutil.CtcTestCase):
         self.assertIn('Login to', project_page.body)
         # Now, make the user a collaborator and verify the emails are present.
         user_key = self.login().key
-        collab = collaborator_model.Collaborator(
-            user_key=user_key, parent=project.key)
-        collab.put()
+        collaborator_model.add_collaborator(user_key, project.key)
         project_page = self.testapp.get('/project/%d' % project_id, status=200)
         self.assertIn('email', project_page.body)
         self.assertIn('@', project_page.body)
@@ -147,10 +338,145 @@ class FunctionalTests(testutil.CtcTestCase):
         dashboard = self.testapp.get('/dashboard', status=200)
         self.assertIn('Projects I Own', dashboard.body)
 
+    def test_dashboard_lists_own_and_contributing(self):
+        user_key = self.login().key
+        model_helpers.create_project('my project')
+        other_project = model_helpers.create_project(
+            'their project',
+            owner_key=user_model.User(email='other@codethechange.org').put())
+        collaborator_model.add_collaborator(user_key, other_project.key)
+        dashboard = self.testapp.get('/dashboard', status=200)
+        own, contributing = dashboard.body.split('Projects I Contribute To')
+        self.assertIn('my project', own)
+        self.assertNotIn('their project', own)
+        self.assertIn('their project', contributing)
+
     def test_analytics(self):
         page = self.testapp.get('/')
         self.assertIn('google-analytics', page)
 
+    def test_warmup(self):
+        response = self.testapp.get('/_ah/warmup', status=200)
+        for step_name in ['templates', 'csrf_key_ring', 'models']:
+            self.assertIn(step_name + ':', response.body)
+        self.assertIsNotNone(csrf.SecretKeyRing.query().get())
+
+    def test_admin_metrics(self):
+        self.login()
+        self.testapp.get('/projects', status=200)
+        self.testapp.get('/admin/metrics', status=403)
+        self.login(is_admin=True)
+        page = self.testapp.get('/admin/metrics', status=200)
+        self.assertIn('ListProjects', page.body)
+        self.assertIn('All instances', page.body)
+
+    def test_admin_profiles(self):
+        self.login()
+        response = self.testapp.get('/projects?profile=1', status=200)
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.testapp.get('/admin/profiles', status=403)
+        self.login(is_admin=True)
+        response = self.testapp.get('/projects?profile=1', status=200)
+        self.assertIn('All Projects', response.body)
+        profile_path = '/admin/profiles/' + response.headers['X-Profile-Id']
+        page = self.testapp.get('/admin/profiles', status=200)
+        self.assertIn(profile_path, page.body)
+        page = self.testapp.get(profile_path + '?sort=tottime', status=200)
+        self.assertIn('handlers.py', page.body)
+        self.testapp.get('/admin/profiles/missing', status=404)
+
+    def test_datastore_rpc_budgets(self):
+        # Enough projects and collaborators that a datastore or memcache get
+        # per row would go over budget, even when ndb batches the gets.
+        user = self.login()
+        other_user_keys = [
+            user_model.User(email='user%d@codethechange.org' % index).put()
+            for index in range(5)]
+        projects = [model_helpers.create_project('project%03d' % index)
+                    for index in range(project_model.PAGE_SIZE + 1)]
+        project = projects[0]
+        # The user joins projects that they don't own, so that the dashboard
+        # doesn't read any summary twice.
+        joined_projects = [
+            model_helpers.create_project(
+                'other%d' % index, owner_key=other_user_keys[0])
+            for index in range(5)]
+        for joined_project in joined_projects:
+            collaborator_model.add_collaborator(user.key, joined_project.key)
+        for other_user_key in other_user_keys:
+            collaborator_model.add_collaborator(other_user_key, project.key)
+        project_path = '/project/%d' % project.key.id()
+        joined_path = '/project/%d' % joined_projects[0].key.id()
+        user_path = '/user/%s' % user.key.id()
+        # The joins above lock their projects' counts out of memcache for a few
+        # seconds, so the RPCs would depend on how long the setup took.
+        memcache.flush_all()
+        # Each route, with the most datastore RPCs, datastore keys, and
+        # memcache keys that it may use.
+        get_budgets = [
+            ('/', 0, 0, 8),
+            ('/projects', 5, 42, 72),
+            # A search reads the index once per word, then the summaries.
+            ('/projects?q=project001', 3, 3, 8),
+            ('/projects?q=project001+name', 4, 28, 5),
+            ('/dashboard', 3, 31, 23),
+            (project_path, 9, 11, 23),
+            (project_path + '/edit', 0, 0, 4),
+            ('/project/new', 0, 0, 0),
+            (user_path, 0, 0, 3),
+            (user_path + '/edit', 0, 0, 3),
+            # A query per model, and the key ring if this instance's copy is
+            # stale.
+            ('/_ah/warmup', 7, 7, 7),
+        ]
+        post_budgets = [
+            # The summary and search index are written with the new project.
+            ('/project/new', {'name': 'new project'}, 2, 4, 10),
+            # Editing also reads the search index and then writes the words
+            # that changed.
+            (project_path + '/edit', {'name': 'edited'}, 4, 13, 17),
+            (joined_path + '/leave', {}, 6, 4, 10),
+            (joined_path + '/join', {}, 7, 5, 11),
+            # The new name is copied onto each of the user's Collaborators.
+            (user_path + '/edit', {'name': 'Renamed'}, 4, 12, 26),
+        ]
+        for path, max_rpcs, max_keys, max_memcache_keys in get_budgets:
+            response = self.testapp.get(path, status=200)
+            self.assert_max_rpcs(
+                response, max_rpcs, max_keys, max_memcache_keys)
+        for path, params, max_rpcs, max_keys, max_memcache_keys in (
+                post_budgets):
+            params['csrf_token'] = csrf.make_token(path)
+            response = self.testapp.post(path, params, status=302)
+            self.assert_max_rpcs(
+                response, max_rpcs, max_keys, max_memcache_keys)
+        # Logged out users are served from the page cache once it is warm.
+        # The project page still reads its collaborator count for its ETag.
+        self.logout()
+        logged_out_budgets = [
+            ('/projects', (1, 20, 6), (0, 0, 3)),
+            (project_path, (2, 2, 12), (0, 0, 4)),
+        ]
+        for path, miss_budgets, hit_budgets in logged_out_budgets:
+            response = self.testapp.get(path, status=200)
+            self.assert_max_rpcs(response, *miss_budgets)
+            response = self.testapp.get(path, status=200)
+            self.assert_max_rpcs(response, *hit_budgets)
+        # The admin pages only read memcache.
+        self.login(is_admin=True)
+        response = self.testapp.get('/projects?profile=1', status=200)
+        profile_path = '/admin/profiles/' + response.headers['X-Profile-Id']
+        admin_budgets = [
+            # One batch get of the rollup counters for every route.
+            ('/admin/metrics', 0, 0, 676),
+            ('/admin/profiles', 0, 0, 1),
+            (profile_path, 0, 0, 1),
+        ]
+        for path, max_rpcs, max_keys, max_memcache_keys in admin_budgets:
+            response = self.testapp.get(path, status=200)
+            self.assert_max_rpcs(
+                response, max_rpcs, max_keys, max_memcache_keys)
+
     def test_login_required(self):
         project = model_helpers.create_project()
         user_key = user_model.User(email='test@codethechange.org').put()
@@ -259,6 +585,18 @@ class FunctionalTests(testutil.CtcTestCase):
         self.assertEqual(edited_profile.email, 'test@codethechange.org')
         self.assertEqual(edited_profile.biography, 'i can edit')
 
+    def test_post_edit_user_updates_collaborators(self):
+        user_profile = self.login()
+        project = model_helpers.create_project()
+        collaborator = collaborator_model.add_collaborator(
+            user_profile.key, project.key)
+        user_id = user_profile.key.id()
+        csrf_token = csrf.make_token('/user/%s/edit' % user_id)
+        self.testapp.post(
+            '/user/%s/edit' % user_id,
+            {'name': 'Renamed', 'csrf_token': csrf_token}, status=302)
+        self.assertEqual(collaborator.key.get().name, 'Renamed')
+
     def test_only_owner_can_edit_profile(self):
         self.login()
         other_profile_key = user_model.User(
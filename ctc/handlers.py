@@ -1,15 +1,96 @@
 """All handlers for CtC projects."""
 
+import logging
+import time
+
+import webapp2
+
+from google.appengine.api import datastore_errors
 from google.appengine.api import users
 from google.appengine.ext import ndb
 
+from ctc.helpers import conditional_get
 from ctc.helpers import csrf
+from ctc.helpers import lazy
+from ctc.helpers import metrics
+from ctc.helpers import page_cache
+from ctc.helpers import profiler
 from ctc.helpers import templates
 from ctc.models import collaborator as collaborator_model
 from ctc.models import project as project_model
 from ctc.models import user as user_model
 
 
+# The page cache version for the projects list.
+PROJECT_LIST_VERSION = 'project_list'
+
+
+def project_list_versions():
+    """Returns the page cache versions that the projects list depends on."""
+    return [PROJECT_LIST_VERSION]
+
+
+# Pages with forms change their ETags this often so that a revalidated page
+# never has an expired CSRF token.
+FORM_ETAG_SECONDS = 60*60*24
+
+
+def project_page_versions(project_id):
+    """Returns the page cache versions that a project's page depends on."""
+    return ['project:%s' % project_id]
+
+
+def membership_versions(user_id):
+    """Returns the versions that change when the user joins or leaves projects.
+    """
+    return ['memberships:%s' % user_id]
+
+
+def _get_viewer_id():
+    """Returns the current user's id, or '' if the user isn't logged in."""
+    user = users.get_current_user()
+    return user.user_id() if user else ''
+
+
+def project_page_validators(project_id):
+    """Returns the conditional GET validators for a project's page.
+
+    Editing the project, joining or leaving it, and editing a collaborator's
+    profile all bump the project's version, so the version and the viewer
+    determine the page (including whether the viewer is a collaborator or the
+    owner).  The count is included since repairs can change it without a bump.
+    """
+    project_key = ndb.Key(project_model.Project, int(project_id))
+    count_future = collaborator_model.get_collaborator_count_async(project_key)
+    versions = page_cache.get_versions(project_page_versions(project_id))
+    num_contributors = count_future.get_result()
+    if versions is None:
+        return None
+    viewer_id = _get_viewer_id()
+    # Logged in users' pages have a CSRF token, which eventually expires.
+    token_period = int(time.time() / FORM_ETAG_SECONDS) if viewer_id else ''
+    etag = conditional_get.make_etag(
+        versions, num_contributors, viewer_id, token_period)
+    return etag, page_cache.get_modified_time(versions)
+
+
+def project_list_validators():
+    """Returns the conditional GET validators for the projects list.
+
+    The list changes when a project is created or edited, and the projects
+    marked as joined change when the viewer joins or leaves a project.
+    """
+    viewer_id = _get_viewer_id()
+    version_names = project_list_versions()
+    if viewer_id:
+        version_names += membership_versions(viewer_id)
+    versions = page_cache.get_versions(version_names)
+    if versions is None:
+        return None
+    etag = conditional_get.make_etag(versions, viewer_id)
+    return etag, page_cache.get_modified_time(versions)
+
+
 class BaseHandler(csrf.CsrfHandler):
     """Superclass for all CtC handlers."""
 
@@ -18,10 +99,34 @@ class BaseHandler(csrf.CsrfHandler):
         if not users.get_current_user():
             self.redirect(users.create_login_url(self.request.uri), abort=True)
 
+    def require_admin(self):
+        """Abort the request unless the user is logged in as an admin.
+
+        app.yaml only serves /admin to admins, but this also protects admin
+        pages that are routed elsewhere or served without app.yaml.
+        """
+        self.require_login()
+        if not users.is_current_user_admin():
+            self.abort(403)
+
+    def stream_template(self, template_name):
+        """Sends the template, rendered with self.values, as it renders.
+
+        This is for large pages: the start of the page reaches the client while
+        the rest renders, and the whole page is never in memory at once.  Errors
+        in the page's <head> still fail the request, but later errors can only
+        be logged and end the page early (see templates.stream).
+        """
+        self.response.app_iter = templates.stream(template_name, self.values)
+
     def dispatch(self):
-        """Initializes default values and dispatches the request."""
-        self.values['login_url'] = users.create_login_url(self.request.uri)
-        self.values['logout_url'] = generate_logout_url()
+        """Initializes default values and dispatches the request.
+
+        The login and logout URLs are lazy since most pages don't use them.
+        """
+        self.values['login_url'] = lazy.LazyValue(
+            users.create_login_url, self.request.uri)
+        self.values['logout_url'] = lazy.LazyValue(generate_logout_url)
         super(BaseHandler, self).dispatch()
 
 
@@ -36,12 +141,15 @@ class MainPage(BaseHandler):
 class DisplayDashboard(BaseHandler):
     """The handler for displaying a which projects the user is working on"""
 
+    @ndb.synctasklet
     def get(self):
         """Renders the dashboard corresponding to the logged in user"""
         self.require_login()
-        user_key = user_model.get_current_user_key()
-        self.values['own'] = project_model.get_by_owner(user_key)
-        self.values['contributing'] = collaborator_model.get_projects(user_key)
+        user_key = yield user_model.get_current_user_key_async()
+        # Run both queries at once.
+        self.values['own'], self.values['contributing'] = yield (
+            project_model.get_by_owner_async(user_key),
+            collaborator_model.get_projects_async(user_key))
         self.response.write(templates.render('dashboard.html', self.values))
 
 
@@ -55,7 +163,7 @@ class DisplayUser(BaseHandler):
         self.values['profile'] = user_model.User.get_by_id(user_id)
         is_profile_owner = (user_id == requesting_user_id)
         if is_profile_owner:
-            self.values['edit_link'] = self.uri_for(EditUser, user_id=user_id)
+            self.values['edit_link'] = self.uri_for('EditUser', user_id=user_id)
         self.response.write(templates.render('display_user.html', self.values))
 
 
@@ -73,7 +181,7 @@ class EditUser(BaseHandler):
         self.require_login()
         self.require_owner(user_id)
         self.values['profile'] = user_model.User.get_by_id(user_id)
-        self.values['action_link'] = self.uri_for(EditUser, user_id=user_id)
+        self.values['action_link'] = self.uri_for('EditUser', user_id=user_id)
         self.values['action'] = 'Update'
         self.response.write(templates.render('edit_user.html', self.values))
 
@@ -83,7 +191,15 @@ class EditUser(BaseHandler):
         self.require_owner(user_id)
         profile_object = user_model.User.get_by_id(user_id)
         profile_object.populate(self.request).put()
-        self.redirect_to(DisplayUser, user_id=user_id)
+        changed_project_keys = collaborator_model.update_collaborator_profiles(
+            profile_object)
+        # The projects' pages show their collaborators' emails.
+        version_names = []
+        for project_key in changed_project_keys:
+            version_names += project_page_versions(project_key.id())
+        if version_names:
+            page_cache.bump_versions(*version_names)
+        self.redirect_to('DisplayUser', user_id=user_id)
 
 
 class DisplayProject(BaseHandler):
@@ -93,38 +209,60 @@ class DisplayProject(BaseHandler):
         """Sets action, action_link, and csrf_token in self.values."""
         if is_collaborating:
             self.values['action'] = 'Leave'
-            action_link = self.uri_for(LeaveProject, project_id=project_id)
+            action_link = self.uri_for('LeaveProject', project_id=project_id)
         if not is_collaborating and is_logged_in:
             self.values['action'] = 'Join'
-            action_link = self.uri_for(JoinProject, project_id=project_id)
+            action_link = self.uri_for('JoinProject', project_id=project_id)
         if not is_logged_in:
             self.values['action'] = 'Login to Join'
             action_link = users.create_login_url(self.request.uri)
         self.values['action_link'] = action_link
-        self.values['csrf_token'] = csrf.make_token(action_link)
-
+        self.values['csrf_token'] = lazy.LazyValue(csrf.make_token, action_link)
+
+    @ndb.tasklet
+    def _get_viewer_async(self, project_key):
+        """Returns a future for (user_key, collaborator) for the current user.
+
+        Either value is None if the user isn't logged in or isn't collaborating.
+        """
+        user_key = yield user_model.get_current_user_key_async()
+        collaborator = None
+        if user_key:
+            collaborator = yield collaborator_model.get_collaborator_async(
+                user_key, project_key)
+        raise ndb.Return((user_key, collaborator))
+
+    @conditional_get.conditional(project_page_validators)
+    @page_cache.cached_for_logged_out_users(project_page_versions)
+    @ndb.synctasklet
     def get(self, project_id):
-        """Renders the project page in response to a GET request."""
-        project = ndb.Key(project_model.Project, int(project_id)).get()
-        user_key = user_model.get_current_user_key()
+        """Renders the project page in response to a GET request.
+
+        The independent datastore and memcache calls run in parallel, and the
+        collaborator emails are only fetched for users who can see them.
+        """
+        project_key = ndb.Key(project_model.Project, int(project_id))
+        project, (user_key, is_collaborating), num_contributors = yield (
+            project_key.get_async(),
+            self._get_viewer_async(project_key),
+            collaborator_model.get_collaborator_count_async(project_key))
+        if not project:
+            self.abort(404)
         collaborator_emails = []
         # Initialize some truthy objects for the following display logic.
         is_logged_in = user_key
         self.values['user_is_logged_out'] = not is_logged_in
-        is_collaborating = collaborator_model.get_collaborator(
-            user_key, project.key)
         is_project_owner = is_logged_in and project.owner_key == user_key
         should_show_collaborator_emails = is_collaborating or is_project_owner
         # Use the above as booleans to guide permissions.
         if is_project_owner:
             self.values['edit_link'] = self.uri_for(
-                EditProject, project_id=project_id)
+                'EditProject', project_id=project_id)
         if should_show_collaborator_emails:
-            collaborator_emails = collaborator_model.get_collaborator_emails(
-                ndb.Key(project_model.Project, int(project_id)))
+            collaborator_emails = (
+                yield collaborator_model.get_collaborator_emails_async(
+                    project_key))
         self._set_action_and_link(project_id, is_collaborating, is_logged_in)
-        num_contributors = collaborator_model.get_collaborator_count(
-            ndb.Key(project_model.Project, int(project_id)))
         self.values['num_contributors'] = num_contributors
         self.values['collaborator_emails'] = collaborator_emails
         self.values['project'] = project
@@ -148,7 +286,7 @@ class EditProject(BaseHandler):
         self.require_project_owner(project)
         self.values['project'] = project
         self.values['action_link'] = self.uri_for(
-            EditProject, project_id=project_id)
+            'EditProject', project_id=project_id)
         self.values['action'] = 'Edit Your'
         self.response.write(templates.render('edit_project.html', self.values))
 
@@ -158,23 +296,91 @@ class EditProject(BaseHandler):
         project = ndb.Key(project_model.Project, int(project_id)).get()
         self.require_project_owner(project)
         project.populate(self.request).put()
-        self.redirect_to(DisplayProject, project_id=project_id)
+        page_cache.bump_versions(
+            PROJECT_LIST_VERSION, *project_page_versions(project_id))
+        self.redirect_to('DisplayProject', project_id=project_id)
 
 
 class ListProjects(BaseHandler):
     """The handler for the projects list."""
 
+    @conditional_get.conditional(project_list_validators)
+    @page_cache.cached_for_logged_out_users(project_list_versions)
+    @ndb.synctasklet
     def get(self):
-        """Renders the projects page in response to a GET request."""
-        query = project_model.Project.query()
-        query = query.order(project_model.Project.updated_date)
-        projects = query.fetch()
+        """Renders one page of the projects list in response to a GET request.
+
+        If there is a "q" query parameter, only the projects that match it are
+        listed, best matches first, and the page is selected by the "offset"
+        parameter.  Otherwise, the page is selected by the optional "cursor" and
+        "direction" parameters.  Both come from the previous and next links.
+        Projects that the current user has joined are marked.
+        """
+        query = self.request.get('q').strip()
+        if query:
+            page_future = self._search_async(query)
+        else:
+            page_future = self._get_page_async()
+        (projects, previous_link, next_link), user_key = yield (
+            page_future, user_model.get_current_user_key_async())
+        self.values['memberships'] = (
+            yield collaborator_model.get_memberships_async(
+                user_key,
+                [curr_project.project_key for curr_project in projects]))
         links = []
         for curr_project in projects:
             project_id = curr_project.key.id()
-            links.append(self.uri_for(DisplayProject, project_id=project_id))
+            links.append(self.uri_for('DisplayProject', project_id=project_id))
         self.values['projects_and_links'] = zip(projects, links)
-        self.response.write(templates.render('list_projects.html', self.values))
+        self.values['query'] = query
+        self.values['previous_link'] = previous_link
+        self.values['next_link'] = next_link
+        self.stream_template('list_projects.html')
+
+    @ndb.tasklet
+    def _get_page_async(self):
+        """Returns a future for (projects, previous_link, next_link).
+
+        The projects are the requested page of all projects.
+        """
+        cursor = self.request.get('cursor') or None
+        backward = self.request.get('direction') == 'previous'
+        try:
+            projects, previous_cursor, next_cursor = (
+                yield project_model.get_page_async(cursor, backward))
+        except (datastore_errors.BadValueError,
+                datastore_errors.BadRequestError):
+            self.abort(400)
+        previous_link = next_link = None
+        if previous_cursor:
+            previous_link = self.uri_for(
+                'ListProjects', cursor=previous_cursor, direction='previous')
+        if next_cursor:
+            next_link = self.uri_for('ListProjects', cursor=next_cursor)
+        raise ndb.Return((projects, previous_link, next_link))
+
+    @ndb.tasklet
+    def _search_async(self, query):
+        """Returns a future for (projects, previous_link, next_link).
+
+        The projects are the requested page of projects that match the query.
+        """
+        try:
+            offset = int(self.request.get('offset') or 0)
+        except ValueError:
+            self.abort(400)
+        if offset < 0:
+            self.abort(400)
+        projects, previous_offset, next_offset = (
+            yield project_model.search_projects_async(query, offset))
+        previous_link = next_link = None
+        if previous_offset is not None:
+            previous_link = self.uri_for(
+                'ListProjects', q=query, offset=previous_offset)
+        if next_offset is not None:
+            next_link = self.uri_for(
+                'ListProjects', q=query, offset=next_offset)
+        raise ndb.Return((projects, previous_link, next_link))
 
 
 class NewProject(BaseHandler):
@@ -184,7 +390,7 @@ class NewProject(BaseHandler):
         """Renders the new project page in response to a GET request."""
         self.require_login()
         self.values['action'] = 'Create a New'
-        self.values['action_link'] = self.uri_for(NewProject)
+        self.values['action_link'] = self.uri_for('NewProject')
         self.response.write(templates.render('edit_project.html', self.values))
 
     def post(self):
@@ -194,7 +400,8 @@ class NewProject(BaseHandler):
         new_project = project_model.Project().populate(self.request)
         new_project.owner_key = current_user_key
         new_project_key = new_project.put()
-        self.redirect_to(DisplayProject, project_id=new_project_key.id())
+        page_cache.bump_versions(PROJECT_LIST_VERSION)
+        self.redirect_to('DisplayProject', project_id=new_project_key.id())
 
 
 class JoinProject(BaseHandler):
@@ -204,12 +411,12 @@ class JoinProject(BaseHandler):
         """Accepts a request to join a project."""
         self.require_login()
         current_user_key = user_model.get_current_user_key()
-        collaborator_model.Collaborator.get_or_insert(
-            current_user_key.id(),
-            user_key=current_user_key,
-            parent=ndb.Key(project_model.Project, int(project_id))
-        )
-        self.redirect_to(DisplayProject, project_id=project_id)
+        collaborator_model.add_collaborator(
+            current_user_key, ndb.Key(project_model.Project, int(project_id)))
+        page_cache.bump_versions(
+            *(project_page_versions(project_id) +
+              membership_versions(current_user_key.id())))
+        self.redirect_to('DisplayProject', project_id=project_id)
 
 
 class LeaveProject(BaseHandler):
@@ -219,11 +426,120 @@ class LeaveProject(BaseHandler):
         """Accepts a request to leave a project."""
         self.require_login()
         current_user_key = user_model.get_current_user_key()
-        collaborator = collaborator_model.get_collaborator(
+        collaborator_model.remove_collaborator(
             current_user_key, ndb.Key(project_model.Project, int(project_id)))
-        if collaborator:
-            collaborator.key.delete()
-        self.redirect_to(DisplayProject, project_id=project_id)
+        page_cache.bump_versions(
+            *(project_page_versions(project_id) +
+              membership_versions(current_user_key.id())))
+        self.redirect_to('DisplayProject', project_id=project_id)
+
+
+class Warmup(webapp2.RequestHandler):
+    """Handler for App Engine's warmup requests to new instances.
+
+    This does the work that would otherwise slow down an instance's first user
+    requests, and it reports how long each step took.
+    """
+
+    def get(self):
+        """Loads templates, the CSRF key ring, and the models."""
+        self.response.headers['Content-Type'] = 'text/plain'
+        steps = [
+            ('templates', templates.load_all_templates),
+            ('csrf_key_ring', csrf.load_key_ring),
+            ('models', warm_up_models),
+        ]
+        for step_name, step in steps:
+            start_time = time.time()
+            result = step()
+            elapsed_ms = (time.time() - start_time) * 1000
+            logging.info('Warmup step %s (%s) took %.1f ms',
+                         step_name, result, elapsed_ms)
+            self.response.write(
+                '%s: %.1f ms (%s)\n' % (step_name, elapsed_ms, result))
+
+
+class AdminMetrics(BaseHandler):
+    """The handler for the admin page with each route's latency metrics."""
+
+    @staticmethod
+    def _sort_by_total_time(route_metrics):
+        """Returns (route name, metrics) pairs, slowest total time first."""
+        return sorted(route_metrics.items(),
+                      key=lambda item: item[1].total_ms, reverse=True)
+
+    def get(self):
+        """Renders the metrics for this instance and for all instances."""
+        self.require_admin()
+        # Include this instance's latest requests in the rollup.
+        metrics.rollup()
+        route_names = list(self.app.router.build_routes)
+        route_names.append(metrics.UNMATCHED_ROUTE)
+        self.values['all_instances'] = self._sort_by_total_time(
+            metrics.get_rolled_up_metrics(route_names))
+        self.values['this_instance'] = self._sort_by_total_time(
+            metrics.get_instance_metrics())
+        self.values['status_groups'] = metrics.STATUS_GROUPS
+        self.values['infinity'] = float('inf')
+        self.values['max_bucket_ms'] = metrics.LATENCY_BUCKETS_MS[-1]
+        self.response.write(templates.render('admin_metrics.html', self.values))
+
+
+class AdminProfiles(BaseHandler):
+    """The handler for the admin page that lists the profiled requests."""
+
+    def get(self):
+        """Renders the latest profiles."""
+        self.require_admin()
+        self.values['profiles_and_links'] = [
+            (profile, self.uri_for('AdminProfile', profile_id=profile['id']))
+            for profile in profiler.list_profiles()]
+        self.values['query_parameter'] = profiler.QUERY_PARAMETER
+        self.response.write(
+            templates.render('admin_profiles.html', self.values))
+
+
+class AdminProfile(BaseHandler):
+    """The handler for the admin page with one request's profile."""
+
+    # The columns that the functions can be sorted by.
+    SORT_KEYS = ['cumtime', 'tottime', 'calls']
+
+    def get(self, profile_id):
+        """Renders the profile's functions, sorted by the sort parameter."""
+        self.require_admin()
+        profile = profiler.get_profile(profile_id)
+        if profile is None:
+            self.abort(404)
+        sort_key = self.request.get('sort')
+        if sort_key not in self.SORT_KEYS:
+            sort_key = self.SORT_KEYS[0]
+        self.values['profile'] = profile
+        self.values['functions'] = sorted(
+            profile['functions'], key=lambda row: row[sort_key], reverse=True)
+        self.values['sort_key'] = sort_key
+        self.values['profiles_link'] = self.uri_for('AdminProfiles')
+        self.response.write(
+            templates.render('admin_profile.html', self.values))
+
+
+def warm_up_models():
+    """Runs a tiny query for each model so the datastore path is initialized.
+
+    Returns:
+        The number of models that were queried.
+    """
+    models = [
+        collaborator_model.Collaborator,
+        collaborator_model.CollaboratorCount,
+        csrf.SecretKeyRing,
+        project_model.Project,
+        project_model.ProjectSummary,
+        user_model.User,
+    ]
+    ndb.Future.wait_all(
+        [model.query().fetch_async(1, keys_only=True) for model in models])
+    return len(models)
 
 
 def generate_logout_url():
@@ -0,0 +1,160 @@
+"""Bundles of static assets with content-hashed URLs.
+
+Pages load their CSS and JavaScript as a few bundles rather than one request
+per file.  scripts/build_assets.py concatenates and minifies each bundle's files
+into BUNDLE_PATH under a name with a hash of its contents (eg,
+site.3f2a9c01b4de.css), which app.yaml serves with far-future, immutable cache
+headers.  A changed file gets a new URL rather than a stale cached copy.
+
+Templates get a bundle's URLs with asset_urls:
+    {% for url in asset_urls('site.css') %}...{% endfor %}
+The built bundles are committed, since deploys use the repo as it is.  If they
+are missing or out of date (eg, while developing), this returns the URLs of the
+bundle's source files instead.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+
+STATIC_PATH = os.path.dirname(os.path.dirname(__file__)) + '/static'
+STATIC_URL = '/static'
+# Where scripts/build_assets.py writes the bundles.
+BUNDLE_PATH = STATIC_PATH + '/bundles'
+BUNDLE_URL = STATIC_URL + '/bundles'
+# A file in BUNDLE_PATH with each bundle's file name and the hashes of its
+# sources, used to detect sources that changed after the bundles were built.
+MANIFEST_NAME = 'manifest.json'
+# The files in each bundle, relative to STATIC_PATH, in the order they load.
+BUNDLES = {
+    'site.css': ['css/bootstrap.min.css', 'css/global.css'],
+    'site.js': [
+        'js/jquery-1.10.2.min.js',
+        'js/bootstrap.min.js',
+        'js/jquery.validate.min.js'],
+    'main.css': ['css/carousel.css', 'css/signin.css'],
+}
+# The number of hex digits of the content hash in bundle names.
+HASH_LENGTH = 12
+
+# The bundles' URLs, loaded from the manifest on first use.
+_URLS = {}
+
+
+def _hash_file(path):
+    """Returns the hex SHA-1 of the file's contents."""
+    with open(path, 'rb') as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+def get_source_hashes(bundle_name, static_path=STATIC_PATH):
+    """Returns a dict from each of the bundle's sources to its hash."""
+    return dict((source, _hash_file(os.path.join(static_path, source)))
+                for source in BUNDLES[bundle_name])
+
+
+def minify_css(css):
+    """Returns the CSS without comments or unneeded whitespace.
+
+    Comments that start with /*! (eg, licenses) are kept.  This is only meant
+    for simple stylesheets like ours: it would also change strings that contain
+    whitespace next to punctuation.
+    """
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    # Spaces before colons matter in selectors (eg, "a :hover"), but spaces
+    # after them don't.
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def build_bundle(bundle_name, static_path=STATIC_PATH):
+    """Returns the concatenated, minified contents of the bundle."""
+    contents = []
+    for source in BUNDLES[bundle_name]:
+        with open(os.path.join(static_path, source), 'rb') as source_file:
+            content = source_file.read()
+        is_minified = '.min.' in source
+        if source.endswith('.css') and not is_minified:
+            content = minify_css(content)
+        contents.append(content.strip())
+    # A semicolon keeps a script without a trailing one from running into the
+    # next.
+    separator = ';\n' if bundle_name.endswith('.js') else '\n'
+    return separator.join(contents) + '\n'
+
+
+def get_bundle_file_name(bundle_name, contents):
+    """Returns the bundle's file name, which includes its contents' hash."""
+    base, extension = os.path.splitext(bundle_name)
+    content_hash = hashlib.sha1(contents).hexdigest()[:HASH_LENGTH]
+    return '%s.%s%s' % (base, content_hash, extension)
+
+
+def build_bundles(bundle_path=BUNDLE_PATH, static_path=STATIC_PATH):
+    """Writes every bundle and the manifest to bundle_path.
+
+    Bundles left from earlier builds are removed.
+
+    Returns:
+        A dict from each bundle's name to its contents.
+    """
+    if not os.path.isdir(bundle_path):
+        os.makedirs(bundle_path)
+    for file_name in os.listdir(bundle_path):
+        os.remove(os.path.join(bundle_path, file_name))
+    manifest = {}
+    all_contents = {}
+    for bundle_name in BUNDLES:
+        contents = build_bundle(bundle_name, static_path)
+        file_name = get_bundle_file_name(bundle_name, contents)
+        with open(os.path.join(bundle_path, file_name), 'wb') as bundle:
+            bundle.write(contents)
+        manifest[bundle_name] = {
+            'file': file_name,
+            'sources': get_source_hashes(bundle_name, static_path),
+        }
+        all_contents[bundle_name] = contents
+    with open(os.path.join(bundle_path, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, separators=(',', ': '),
+                  sort_keys=True)
+    return all_contents
+
+
+def load_urls(bundle_path=BUNDLE_PATH, static_path=STATIC_PATH):
+    """Returns a dict from each bundle's name to the URLs that load it.
+
+    A bundle is loaded from its built file if the manifest shows that it was
+    built from the current sources, and from its sources otherwise.
+    """
+    try:
+        with open(os.path.join(bundle_path, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, ValueError):
+        manifest = {}
+    urls = {}
+    for bundle_name, sources in BUNDLES.items():
+        built = manifest.get(bundle_name)
+        is_current = built and built['sources'] == get_source_hashes(
+            bundle_name, static_path)
+        if is_current:
+            urls[bundle_name] = ['%s/%s' % (BUNDLE_URL, built['file'])]
+        else:
+            urls[bundle_name] = [
+                '%s/%s' % (STATIC_URL, source) for source in sources]
+    return urls
+
+
+def asset_urls(bundle_name):
+    """Returns the URLs that load the bundle with the provided name."""
+    if not _URLS:
+        _URLS.update(load_urls())
+    return _URLS[bundle_name]
+
+
+def flush_urls():
+    """Forgets the loaded bundle URLs (eg, after building the bundles)."""
+    _URLS.clear()
@@ -0,0 +1,86 @@
+"""Tests for the static asset bundles."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ctc.helpers import assets
+from ctc.helpers import templates
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class AssetsTests(testutil.CtcTestCase):
+
+    def setUp(self):
+        super(AssetsTests, self).setUp()
+        self.bundle_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.bundle_path)
+        assets.flush_urls()
+        super(AssetsTests, self).tearDown()
+
+    def test_minify_css(self):
+        css = '/*! license */\n/* comment */\na:hover,\nb {\n  color: red;\n}\n'
+        self.assertEqual(assets.minify_css(css),
+                         '/*! license */ a:hover,b{color:red}')
+
+    def test_unbuilt_bundles_load_sources(self):
+        urls = assets.load_urls(self.bundle_path)
+        self.assertEqual(urls['site.css'], [
+            '/static/css/bootstrap.min.css', '/static/css/global.css'])
+
+    def test_built_bundles(self):
+        all_contents = assets.build_bundles(self.bundle_path)
+        urls = assets.load_urls(self.bundle_path)
+        for bundle_name, contents in all_contents.items():
+            file_name = assets.get_bundle_file_name(bundle_name, contents)
+            self.assertEqual(urls[bundle_name],
+                             ['/static/bundles/' + file_name])
+            with open(os.path.join(self.bundle_path, file_name)) as bundle:
+                self.assertEqual(bundle.read(), contents)
+        self.assertIn('jQuery Validation', all_contents['site.js'])
+        self.assertIn('.plain-text{white-space:pre-wrap}',
+                      all_contents['site.css'])
+
+    def test_stale_bundles_load_sources(self):
+        assets.build_bundles(self.bundle_path)
+        manifest_path = os.path.join(self.bundle_path, assets.MANIFEST_NAME)
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        manifest['site.css']['sources']['css/global.css'] = 'old hash'
+        with open(manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        urls = assets.load_urls(self.bundle_path)
+        self.assertEqual(len(urls['site.css']), 2)
+        self.assertEqual(len(urls['site.js']), 1)
+
+    def test_rebuilding_removes_old_bundles(self):
+        old_bundle_path = os.path.join(self.bundle_path, 'site.0ld.css')
+        open(old_bundle_path, 'w').close()
+        assets.build_bundles(self.bundle_path)
+        self.assertFalse(os.path.exists(old_bundle_path))
+        self.assertEqual(len(os.listdir(self.bundle_path)),
+                         len(assets.BUNDLES) + 1)
+
+    def test_committed_bundles_are_current(self):
+        # Deploys use the committed bundles, so they have to be rebuilt
+        # whenever a source file changes.
+        for bundle_name, urls in assets.load_urls().items():
+            self.assertEqual(
+                len(urls), 1,
+                '%s is stale.  Run scripts/build_assets.py' % bundle_name)
+            self.assertTrue(urls[0].startswith(assets.BUNDLE_URL + '/'))
+
+    def test_templates_use_asset_urls(self):
+        page = templates.render('main.html')
+        for bundle_name in ['site.css', 'site.js', 'main.css']:
+            for url in assets.asset_urls(bundle_name):
+                self.assertIn(url, page)
+
+
+if __name__ == '__main__':
+    unittest.main()
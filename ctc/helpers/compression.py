@@ -0,0 +1,165 @@
+"""WSGI middleware that compresses text responses with gzip or deflate.
+
+The encoding is picked from the request's Accept-Encoding header.  Bodies are
+compressed as the app produces them, so a large page is never held in memory
+a second time.  Responses that are small, not text, or already encoded are
+passed through unchanged.
+"""
+
+import zlib
+
+
+# Bodies smaller than this fit in about one packet, so compressing them saves
+# less time than it costs.
+MIN_SIZE = 1400
+COMPRESSION_LEVEL = 6
+COMPRESSIBLE_TYPES = [
+    'text/', 'application/json', 'application/javascript',
+    'application/xml']
+# The window bits that make zlib write each encoding's format.
+_WINDOW_BITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+def choose_encoding(accept_encoding):
+    """Returns the best encoding that the client accepts, or None.
+
+    Args:
+        accept_encoding: the request's Accept-Encoding header, or None.
+    """
+    qualities = {}
+    for coding in (accept_encoding or '').split(','):
+        params = coding.strip().lower().split(';')
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[params[0].strip()] = quality
+    best_encoding = None
+    best_quality = 0.0
+    # gzip is preferred when the client accepts both equally.
+    for encoding in ['gzip', 'deflate']:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def _get_header(headers, name):
+    """Returns the value of the named header from a WSGI header list, or None.
+    """
+    name = name.lower()
+    for header_name, value in headers:
+        if header_name.lower() == name:
+            return value
+    return None
+
+
+def _is_compressible(status, headers):
+    """Returns whether the response could be compressed for some client."""
+    if not status.startswith('200') or _get_header(headers, 'Content-Encoding'):
+        return False
+    content_type = (_get_header(headers, 'Content-Type') or '').lower()
+    if not any(content_type.startswith(compressible_type)
+               for compressible_type in COMPRESSIBLE_TYPES):
+        return False
+    content_length = _get_header(headers, 'Content-Length')
+    return content_length is None or int(content_length) >= MIN_SIZE
+
+
+def _add_vary(headers):
+    """Adds Accept-Encoding to the Vary header."""
+    vary = _get_header(headers, 'Vary')
+    if not vary:
+        headers.append(('Vary', 'Accept-Encoding'))
+    elif 'accept-encoding' not in vary.lower():
+        headers[:] = [(name, value) for name, value in headers
+                      if name.lower() != 'vary']
+        headers.append(('Vary', vary + ', Accept-Encoding'))
+
+
+def _compress_chunk(compressor, data):
+    """Returns the compressed data, flushed so that clients can decode it now.
+
+    Without the flush, zlib would hold the data until it had a full block,
+    so the early chunks of a streamed page (eg, its <head>) would arrive late.
+    """
+    if not data:
+        return ''
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _weaken_etag(headers):
+    """Makes a strong ETag weak since the compressed body differs.
+
+    Conditional requests still match since If-None-Match compares ETags weakly.
+    """
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == 'etag' and not value.startswith('W/'):
+            headers[index] = (name, 'W/' + value)
+
+
+class CompressionMiddleware(object):
+    """Compresses an app's text responses for clients that accept it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        # The app calls start_response before it produces its body, so this
+        # records the compressor for the body to use.
+        state = {'compressor': None}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            """Adds the compression headers if the response is compressed."""
+            headers = list(headers)
+            if _is_compressible(status, headers):
+                # The response depends on Accept-Encoding even if this request
+                # doesn't accept compression.
+                _add_vary(headers)
+                if encoding:
+                    headers = [(name, value) for name, value in headers
+                               if name.lower() != 'content-length']
+                    headers.append(('Content-Encoding', encoding))
+                    _weaken_etag(headers)
+                    state['compressor'] = zlib.compressobj(
+                        COMPRESSION_LEVEL, zlib.DEFLATED,
+                        _WINDOW_BITS[encoding])
+            write = start_response(status, headers, exc_info)
+            if not state['compressor']:
+                return write
+            return lambda data: write(
+                _compress_chunk(state['compressor'], data))
+
+        app_iter = self.app(environ, compressing_start_response)
+        return self._compress(app_iter, state)
+
+    @staticmethod
+    def _compress(app_iter, state):
+        """Yields the body, compressed as the app produces it if necessary.
+
+        Apps may call start_response when their body is first iterated, so
+        state['compressor'] is only checked once there is data.  Each chunk is
+        compressed and sent as soon as the app produces it.
+        """
+        try:
+            for data in app_iter:
+                compressor = state['compressor']
+                if not compressor:
+                    yield data
+                    continue
+                compressed = _compress_chunk(compressor, data)
+                if compressed:
+                    yield compressed
+            if state['compressor']:
+                yield state['compressor'].flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
@@ -0,0 +1,109 @@
+"""Tests for the compression middleware."""
+
+import gzip
+import StringIO
+import unittest
+import zlib
+
+import webapp2
+
+from ctc.helpers import compression
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+def make_app(body, content_type='text/html', headers=None):
+    def app(_, start_response):
+        response_headers = [('Content-Type', content_type)]
+        response_headers += (headers or {}).items()
+        start_response('200 OK', response_headers)
+        # Send the body in a few pieces, like a streamed response.
+        return [body[:10], body[10:]]
+    return compression.CompressionMiddleware(app)
+
+
+def get(app, headers=None):
+    # webtest would decode the body, so this calls the app directly.
+    return webapp2.Request.blank('/', headers=headers).get_response(app)
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO.StringIO(data)).read()
+
+
+class CompressionTests(testutil.CtcTestCase):
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding(None), None)
+        self.assertEqual(compression.choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(
+            compression.choose_encoding('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(compression.choose_encoding('gzip;q=0, br'), None)
+        self.assertEqual(compression.choose_encoding('*'), 'gzip')
+        self.assertEqual(compression.choose_encoding('identity'), None)
+
+    def test_compresses_large_text(self):
+        body = 'hello world ' * 1000
+        app = make_app(body, headers={'ETag': '"abc"'})
+        response = get(app, {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+        self.assertLess(len(response.body), len(body))
+        self.assertEqual(gunzip(response.body), body)
+        response = get(app, {'Accept-Encoding': 'deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.body), body)
+
+    def test_chunks_are_sent_as_they_are_produced(self):
+        body = 'hello world ' * 1000
+        app = make_app(body)
+        environ = webapp2.Request.blank(
+            '/', headers={'Accept-Encoding': 'gzip'}).environ
+        chunks = list(app(environ, lambda *_: None))
+        # Each of the app's pieces can be decoded as soon as it arrives.
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(chunks[0]), body[:10])
+        self.assertEqual(decompressor.decompress(chunks[1]), body[10:])
+        self.assertEqual(decompressor.decompress(''.join(chunks[2:])), '')
+
+    def test_skips_uncompressible_responses(self):
+        body = 'hello world ' * 1000
+        # The client doesn't accept compression.
+        response = get(make_app(body))
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.body, body)
+        # The body isn't text.
+        response = get(
+            make_app(body, 'image/png'), {'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertNotIn('Vary', response.headers)
+        # The body is already compressed.
+        response = get(make_app(body, headers={'Content-Encoding': 'br'}),
+                       {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(response.body, body)
+        # The body is small.
+        small_app = make_app(
+            'hello', headers={'Content-Length': '5', 'Vary': 'Cookie'})
+        response = get(small_app, {'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.body, 'hello')
+
+    def test_webapp2_app(self):
+        class Handler(webapp2.RequestHandler):
+            def get(self):
+                self.response.headers['Vary'] = 'Cookie'
+                self.response.write('x' * compression.MIN_SIZE)
+
+        app = compression.CompressionMiddleware(
+            webapp2.WSGIApplication([('/', Handler)]))
+        response = get(app, {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Vary'], 'Cookie, Accept-Encoding')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gunzip(response.body), 'x' * compression.MIN_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Conditional GETs, so that clients can revalidate pages they already have.
+
+To let a handler answer conditional GETs, decorate its get():
+    @conditional_get.conditional(get_validators)
+where get_validators takes the same arguments as get() and returns a tuple of
+(etag, last_modified) for the page, or None if the page can't be validated.
+last_modified is a time in seconds, or None.  The validators should come from
+cheap, cached lookups, since they are checked before get() runs.  If the
+request's If-None-Match or If-Modified-Since header shows that the client's copy
+is current, the response is a 304 and get() never runs.
+"""
+
+import calendar
+import functools
+import hashlib
+import os
+import time
+
+from google.appengine.api import users
+
+
+# Last-Modified only has a resolution of seconds, so pages that changed within
+# the last second don't get one.  Otherwise, a change later in that same second
+# wouldn't be newer than the client's copy.
+LAST_MODIFIED_DELAY_SECONDS = 1
+# The request headers that validated pages depend on: their encoding (see
+# compression.py) and who is logged in.  304s must send the same Vary as the
+# 200s they stand in for, so both get it here.
+VARY_HEADERS = ['Accept-Encoding', 'Cookie']
+
+
+def make_etag(*parts):
+    """Returns a strong ETag that changes whenever any of the parts change.
+
+    The ETag also changes with each deployment, which can change the templates
+    and the asset URLs.
+    """
+    parts = (os.environ.get('CURRENT_VERSION_ID', ''),) + parts
+    return hashlib.sha1(
+        u'\0'.join(unicode(part) for part in parts).encode('utf-8')
+    ).hexdigest()
+
+
+def is_not_modified(request, etag, last_modified):
+    """Returns whether the client's copy of the page is current.
+
+    As in RFC 7232, If-Modified-Since is ignored if If-None-Match is present.
+
+    Args:
+        request: the webapp2 request.
+        etag: the page's current ETag.
+        last_modified: the page's last modification time in seconds, or None.
+    """
+    if request.if_none_match:
+        return etag in request.if_none_match
+    if last_modified is not None and request.if_modified_since:
+        modified_since = calendar.timegm(
+            request.if_modified_since.utctimetuple())
+        return int(last_modified) <= modified_since
+    return False
+
+
+def _set_validator_headers(response, etag, last_modified):
+    """Sets the ETag, Last-Modified, Cache-Control, and Vary headers."""
+    response.etag = etag
+    vary = list(response.vary or [])
+    vary += [header for header in VARY_HEADERS
+             if header.lower() not in [name.lower() for name in vary]]
+    response.vary = vary
+    if last_modified is not None:
+        response.last_modified = int(last_modified)
+    # Clients must revalidate every time.  Pages for logged in users include
+    # private information, so shared caches can't keep them at all.
+    response.cache_control.no_cache = True
+    if users.get_current_user():
+        response.cache_control.private = True
+
+
+def conditional(get_validators):
+    """Returns a decorator that answers a handler's GET with a 304 if it can.
+
+    Args:
+        get_validators: a function that takes the handler method's arguments and
+            returns (etag, last_modified) for the page, or None.
+    """
+    def decorator(method):
+        """Wraps method in the conditional GET checks."""
+
+        @functools.wraps(method)
+        def wrapper(handler, *args, **kwargs):
+            """Responds with a 304 if the client's copy of the page is current.
+            """
+            validators = get_validators(*args, **kwargs)
+            if validators is None:
+                return method(handler, *args, **kwargs)
+            etag, last_modified = validators
+            if (last_modified is not None and
+                    last_modified > time.time() - LAST_MODIFIED_DELAY_SECONDS):
+                last_modified = None
+            if is_not_modified(handler.request, etag, last_modified):
+                handler.response.status = 304
+                del handler.response.headers['Content-Type']
+                _set_validator_headers(handler.response, etag, last_modified)
+                return
+            method(handler, *args, **kwargs)
+            if handler.response.status_int == 200:
+                _set_validator_headers(handler.response, etag, last_modified)
+
+        return wrapper
+    return decorator
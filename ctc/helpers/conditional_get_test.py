@@ -0,0 +1,46 @@
+"""Tests for the conditional GET helper."""
+
+import unittest
+
+import webapp2
+
+from ctc.helpers import conditional_get
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class ConditionalGetTests(testutil.CtcTestCase):
+
+    def test_make_etag(self):
+        etag = conditional_get.make_etag([1, 2], 3, u'user\xe9')
+        self.assertEqual(
+            conditional_get.make_etag([1, 2], 3, u'user\xe9'), etag)
+        self.assertNotEqual(
+            conditional_get.make_etag([1, 3], 3, u'user\xe9'), etag)
+
+    def test_is_not_modified(self):
+        def make_request(headers):
+            return webapp2.Request.blank('/', headers=headers)
+
+        # Sun, 18 Oct 2026 07:00:00 GMT
+        last_modified = 1792306800
+        self.assertFalse(
+            conditional_get.is_not_modified(make_request({}), 'a', None))
+        self.assertTrue(conditional_get.is_not_modified(
+            make_request({'If-None-Match': '"b", "a"'}), 'a', None))
+        self.assertFalse(conditional_get.is_not_modified(
+            make_request({'If-None-Match': '"b"'}), 'a', None))
+        modified_since = {
+            'If-Modified-Since': 'Sun, 18 Oct 2026 07:00:00 GMT'}
+        self.assertTrue(conditional_get.is_not_modified(
+            make_request(modified_since), 'a', last_modified + 0.5))
+        self.assertFalse(conditional_get.is_not_modified(
+            make_request(modified_since), 'a', last_modified + 1))
+        # If-None-Match takes precedence over If-Modified-Since.
+        modified_since['If-None-Match'] = '"b"'
+        self.assertFalse(conditional_get.is_not_modified(
+            make_request(modified_since), 'a', last_modified))
+
+
+if __name__ == '__main__':
+    unittest.main()
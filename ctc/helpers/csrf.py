@@ -8,6 +8,13 @@ URL.  That means that you would need to POST to the same URL that the form lives
 at.  If that isn't the case, you need to specify a path:
     csrf.make_token(path)
 
+Tokens are signed with keys from a SecretKeyRing that each instance caches for
+KEY_RING_CACHE_SECONDS, so making and checking tokens doesn't touch the
+datastore.  To rotate keys, call csrf.rotate_key() (eg, from the interactive
+console).  The new key only starts signing tokens once every instance has had
+time to load it, and older keys keep validating the tokens they signed until
+those tokens expire, so forms that users have open keep working.
+
 Also, this module doesn't differentiate different HTTP mutator methods (POST,
 PUT, DELETE), so if you define multiple mutator methods at a given URL and want
 separate validation for them, you would need to modify this module.
@@ -26,6 +33,7 @@ requests won't succeed unless you have the proper CSRF token.
 """
 # Inspired by https://github.com/cyberphobia/xsrfutil
 
+import binascii
 import hashlib
 import hmac
 import os
@@ -36,11 +44,21 @@ import webapp2
 from google.appengine.api import users
 from google.appengine.ext import ndb
 
+from ctc.helpers import lazy
+from ctc.helpers import tracing
+
 
 SECRET_KEY_SIZE_BITS = 256
 SECRET_KEY_SIZE_BYTES = SECRET_KEY_SIZE_BITS / 8
 # One week in seconds.
 TOKEN_DURATION_SECONDS = 60*60*24*7
+# How long each instance caches the key ring.  This is also how long a new key
+# waits before it signs tokens so that every instance can validate them.
+KEY_RING_CACHE_SECONDS = 60*10
+KEY_RING_ID = 'csrf'
+# The id of the key that signed tokens before there was a key ring.  Those
+# tokens don't include a key id.
+LEGACY_KEY_ID = 'csrf'
 CSRF_ERROR_MESSAGE = ('Your request looks suspicious, so we rejected it.  This '
     'would happen if you loaded the form a week before submitting it, but '
     "other legitimate requests shouldn't trigger this error.  Email "
@@ -48,9 +66,58 @@ CSRF_ERROR_MESSAGE = ('Your request looks suspicious, so we rejected it.  This '
 
 
 class SecretKey(ndb.Model):
-    """A secret key for use with CSRF tokens."""
+    """A secret key for use with CSRF tokens.
+
+    Keys are stored in a SecretKeyRing.  Before there was a key ring, the only
+    key was stored on its own as SecretKey('csrf'), and that entity is only read
+    to carry the key over into the key ring.
+    """
 
     secret_key = ndb.BlobProperty(required=True)
+    key_id = ndb.StringProperty()
+    # The number of seconds since the Unix epoch when the key was added.
+    created_time = ndb.IntegerProperty(default=0)
+
+
+class SecretKeyRing(ndb.Model):
+    """All of the keys that CSRF tokens may be signed with, newest first."""
+
+    secret_keys = ndb.LocalStructuredProperty(SecretKey, repeated=True)
+
+    def get_active_key(self, now):
+        """Returns the SecretKey that new tokens should be signed with.
+
+        This is the newest key that has been in the key ring for
+        KEY_RING_CACHE_SECONDS, or the oldest key if none has.
+        """
+        for secret_key in self.secret_keys:
+            if secret_key.created_time + KEY_RING_CACHE_SECONDS <= now:
+                return secret_key
+        return self.secret_keys[-1]
+
+    def get_secret_key(self, key_id):
+        """Returns the secret bytes for the key with key_id, or None."""
+        for secret_key in self.secret_keys:
+            if secret_key.key_id == key_id:
+                return secret_key.secret_key
+        return None
+
+    def prune(self, now):
+        """Removes keys that can't have signed any unexpired tokens."""
+        kept_keys = self.secret_keys[:1]
+        for newer_key, older_key in zip(
+                self.secret_keys, self.secret_keys[1:]):
+            # The older key stopped signing tokens when the newer key became
+            # active.
+            retired_time = newer_key.created_time + KEY_RING_CACHE_SECONDS
+            if retired_time + TOKEN_DURATION_SECONDS < now:
+                break
+            kept_keys.append(older_key)
+        self.secret_keys = kept_keys
+
+
+# The key ring cached on this instance and when the cached copy expires.
+_KEY_RING_CACHE = {'key_ring': None, 'expiration_time': 0}
 
 
 class CsrfHandler(webapp2.RequestHandler):
@@ -60,7 +127,8 @@ class CsrfHandler(webapp2.RequestHandler):
     * All GET requests will have self.csrf_token, which they can embed in any
       forms for the same URL.  Also, this token will be put in
       self.values['csrf_token'], so if you use a templating system like Jinja2
-      that takes a dict of values, you can easily use this dict.
+      that takes a dict of values, you can easily use this dict.  The token is
+      a lazy.LazyValue, so it is only made if something uses it.
     * All mutator requests (POST, PUT, DELETE) will validate their CSRF token.
 
     Thus, an app that follows HTTP method conventions (GET, HEAD, OPTIONS, and
@@ -81,7 +149,7 @@ class CsrfHandler(webapp2.RequestHandler):
         """Make a CSRF token for GET requests and verify it for mutators."""
         method = self.request.method
         if method == 'GET':
-            self.csrf_token = make_token()
+            self.csrf_token = lazy.LazyValue(make_token)
             self.values['csrf_token'] = self.csrf_token
         if method == 'POST' or method == 'PUT' or method == 'DELETE':
             if not token_is_valid(self.request.get('csrf_token')):
@@ -89,17 +157,88 @@ class CsrfHandler(webapp2.RequestHandler):
         super(CsrfHandler, self).dispatch()
 
 
-def _get_secret_key():
-    """Returns the CSRF key, creating one in necessary."""
-    ndb_key = ndb.Key(SecretKey, 'csrf')
-    secret_key = ndb_key.get()
-    if secret_key:
-        return secret_key.secret_key
-    # The secret key wasn't found, so create it.
-    random_bytes = os.urandom(SECRET_KEY_SIZE_BYTES)
-    secret_key = SecretKey(secret_key=random_bytes, key=ndb_key)
-    secret_key.put()
-    return random_bytes
+def _new_secret_key(created_time):
+    """Returns a new SecretKey with random bytes and a random id."""
+    return SecretKey(
+        key_id=binascii.hexlify(os.urandom(4)),
+        secret_key=os.urandom(SECRET_KEY_SIZE_BYTES),
+        created_time=int(created_time))
+
+
+@ndb.transactional(xg=True)
+def _load_key_ring():
+    """Returns the key ring from the datastore, creating it if necessary."""
+    key_ring = ndb.Key(SecretKeyRing, KEY_RING_ID).get()
+    if key_ring:
+        return key_ring
+    # Carry over the legacy key so that its tokens stay valid.  Otherwise, the
+    # first key is active immediately.
+    legacy_key = ndb.Key(SecretKey, LEGACY_KEY_ID).get()
+    if legacy_key:
+        first_key = SecretKey(
+            key_id=LEGACY_KEY_ID, secret_key=legacy_key.secret_key)
+    else:
+        first_key = _new_secret_key(created_time=0)
+    key_ring = SecretKeyRing(id=KEY_RING_ID, secret_keys=[first_key])
+    key_ring.put()
+    return key_ring
+
+
+def _get_key_ring():
+    """Returns this instance's cached key ring, reloading it if it expired."""
+    now = time.time()
+    if now >= _KEY_RING_CACHE['expiration_time']:
+        _KEY_RING_CACHE['key_ring'] = _load_key_ring()
+        _KEY_RING_CACHE['expiration_time'] = now + KEY_RING_CACHE_SECONDS
+    return _KEY_RING_CACHE['key_ring']
+
+
+def load_key_ring():
+    """Loads the key ring into this instance's cache (eg, during warmup).
+
+    Returns:
+        The number of keys in the key ring.
+    """
+    return len(_get_key_ring().secret_keys)
+
+
+def flush_key_ring_cache():
+    """Makes the next token operation on this instance reload the key ring."""
+    _KEY_RING_CACHE['key_ring'] = None
+    _KEY_RING_CACHE['expiration_time'] = 0
+
+
+def rotate_key():
+    """Adds a new key to the key ring and removes keys that are no longer used.
+
+    The new key starts signing tokens after KEY_RING_CACHE_SECONDS, once every
+    instance has loaded it.  Tokens signed with older keys stay valid until they
+    expire.
+
+    Returns:
+        The id of the new key.
+    """
+    new_key = _new_secret_key(created_time=time.time())
+    _add_key(new_key)
+    flush_key_ring_cache()
+    return new_key.key_id
+
+
+@ndb.transactional(xg=True)
+def _add_key(new_key):
+    """Puts new_key at the front of the key ring and prunes old keys."""
+    key_ring = _load_key_ring()
+    key_ring.secret_keys.insert(0, new_key)
+    key_ring.prune(new_key.created_time)
+    key_ring.put()
+
+
+def _get_digest(secret_key, path, token_time):
+    """Returns the hex HMAC of the current user, path, and time."""
+    current_user_id = users.get_current_user().user_id()
+    digester = hmac.new(key=secret_key, digestmod=hashlib.sha256)
+    digester.update('%s %s %d' % (current_user_id, path, token_time))
+    return digester.hexdigest()
 
 
 def _tokens_are_equal(token1, token2):
@@ -127,6 +266,7 @@ def _tokens_are_equal(token1, token2):
     return not differences
 
 
+@tracing.traced
 def make_token(path=None, token_time=None):
     """Creates a CSRF token for the current user and the provided path and time.
 
@@ -137,23 +277,21 @@ def make_token(path=None, token_time=None):
             when this token was created.  Defaults to the current time.
 
     Returns:
-        A string CSRF token for use with validate_token.  It is hex encoded, and
-        the token will include the token_time after a space.  Returns None if
-        there is no user currently logged in.
+        A string CSRF token for use with validate_token.  It is the hex encoded
+        digest and the id of the key that signed it, separated by a dash, and
+        then the token_time after a space.  Returns None if there is no user
+        currently logged in.
     """
     if path is None:
         path = os.environ.get('PATH_INFO', '/')
     if token_time is None:
         token_time = time.time()
     token_time = int(token_time)
-    current_user = users.get_current_user()
-    if not current_user:
+    if not users.get_current_user():
         return None
-    current_user_id = current_user.user_id()
-    digester = hmac.new(key=_get_secret_key(), digestmod=hashlib.sha256)
-    digester.update('%s %s %d' % (current_user_id, path, token_time))
-    digest = digester.hexdigest()
-    token = '%s %d' % (digest, token_time)
+    secret_key = _get_key_ring().get_active_key(time.time())
+    digest = _get_digest(secret_key.secret_key, path, token_time)
+    token = '%s-%s %d' % (digest, secret_key.key_id, token_time)
     return token
 
 
@@ -162,7 +300,7 @@ def token_is_valid(token):
 
     This checks that there is a token which includes a timestamp that hasn't
     expired, that the user is logged in, and that the token is correct (it
-    hashes properly).
+    hashes properly with the key that it names).
 
     Args:
         token: a CSRF token generated using make_token()
@@ -176,12 +314,22 @@ def token_is_valid(token):
     # The token must include a time.
     if token.count(' ') != 1:
         return False
-    token_time = int(token.split()[-1])
+    signature, token_time = token.split()
+    try:
+        token_time = int(token_time)
+    except ValueError:
+        return False
     # The token must not have expired.
     if token_time + TOKEN_DURATION_SECONDS < time.time():
         return False
     # The user must be logged in.
     if not users.get_current_user():
         return False
-    correct_token = make_token(token_time=token_time)
-    return _tokens_are_equal(token, correct_token)
+    # Tokens from before the key ring don't name their key.
+    digest, _, key_id = signature.partition('-')
+    secret_key = _get_key_ring().get_secret_key(key_id or LEGACY_KEY_ID)
+    if secret_key is None:
+        return False
+    path = os.environ.get('PATH_INFO', '/')
+    correct_digest = _get_digest(secret_key, path, token_time)
+    return _tokens_are_equal(digest, correct_digest)
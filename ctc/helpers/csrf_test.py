@@ -6,6 +6,8 @@ import mock
 import webapp2
 import webtest
 
+from google.appengine.ext import ndb
+
 from ctc.helpers import csrf
 from ctc.testing import testutil
 
@@ -44,11 +46,53 @@ class CsrfTests(testutil.CtcTestCase):
         app = webapp2.WSGIApplication([('/', self.TestHandler)])
         self.testapp = webtest.TestApp(app)
 
-    def test_get_secret_key(self):
-        first_key = csrf._get_secret_key()
-        self.assertEqual(len(first_key), 32)
-        second_key = csrf._get_secret_key()
-        self.assertEqual(first_key, second_key)
+    # Key Ring
+
+    def test_key_ring_is_cached(self):
+        key_ring = csrf._get_key_ring()
+        self.assertEqual(len(key_ring.secret_keys), 1)
+        self.assertEqual(len(key_ring.secret_keys[0].secret_key), 32)
+        # The cached key ring shouldn't need the datastore.
+        ndb.Key(csrf.SecretKeyRing, csrf.KEY_RING_ID).delete()
+        self.assertIs(csrf._get_key_ring(), key_ring)
+        # Once the cache expires, it is reloaded.
+        self.time_mock.time.return_value = (
+            MOCKED_TIME + csrf.KEY_RING_CACHE_SECONDS)
+        self.assertIsNot(csrf._get_key_ring(), key_ring)
+
+    def test_legacy_key_is_carried_over(self):
+        self.login()
+        csrf.SecretKey(id=csrf.LEGACY_KEY_ID, secret_key='a' * 32).put()
+        # Tokens from before the key ring had no key id.
+        legacy_token = '%s %d' % (
+            csrf._get_digest('a' * 32, '/', MOCKED_TIME), MOCKED_TIME)
+        self.assertTrue(csrf.token_is_valid(legacy_token))
+        self.assertTrue(csrf.make_token().split()[0].endswith(
+            '-' + csrf.LEGACY_KEY_ID))
+
+    def test_rotate_key(self):
+        self.login()
+        old_token = csrf.make_token()
+        new_key_id = csrf.rotate_key()
+        # The new key isn't used until every instance could have loaded it.
+        self.assertEqual(csrf.make_token(), old_token)
+        self.time_mock.time.return_value = (
+            MOCKED_TIME + csrf.KEY_RING_CACHE_SECONDS)
+        new_token = csrf.make_token(token_time=MOCKED_TIME)
+        self.assertNotEqual(new_token, old_token)
+        self.assertTrue(new_token.split()[0].endswith('-' + new_key_id))
+        # Tokens signed with either key are valid.
+        self.assertTrue(csrf.token_is_valid(old_token))
+        self.assertTrue(csrf.token_is_valid(new_token))
+        # Rotating again after the old key's tokens have expired removes it.
+        self.time_mock.time.return_value = (
+            MOCKED_TIME + 2 * csrf.KEY_RING_CACHE_SECONDS +
+            csrf.TOKEN_DURATION_SECONDS)
+        csrf.rotate_key()
+        key_ids = [secret_key.key_id
+                   for secret_key in csrf._get_key_ring().secret_keys]
+        self.assertEqual(len(key_ids), 2)
+        self.assertIn(new_key_id, key_ids)
 
     def test_tokens_are_equal(self):
         # It should fail if the tokens aren't equal length.
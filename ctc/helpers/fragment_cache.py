@@ -0,0 +1,117 @@
+"""A Jinja2 extension for caching parts of templates.
+
+Use it in a template like:
+    {% cache project.key, project.updated_date %}
+        ...the expensive part of the template...
+    {% endcache %}
+The rendered fragment is stored under its template, its line, the key, and the
+version, so a fragment is re-rendered whenever its version changes (eg, when
+the project is updated).  Don't put anything that depends on the current user
+inside a cache block since every user will see the same fragment.
+
+Fragments are cached in a small per-instance LRU and never in memcache.  A
+cache block usually renders one row of a list, which takes less time than a
+memcache RPC, and a block can't fetch its fragment until the template reaches
+it, so a memcache tier would cost a serialized RPC per row on every new
+instance.
+"""
+
+import collections
+import threading
+
+import jinja2
+from jinja2 import ext
+from jinja2 import nodes
+
+
+# The number of fragments that each instance keeps in memory.
+LOCAL_CACHE_SIZE = 1000
+_KEY_PREFIX = 'fragment:'
+
+
+class LruCache(object):
+    """A thread-safe dict that forgets its least recently used items."""
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for key, or None if it isn't cached."""
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                # Move the item to the most recently used end.
+                self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """Caches the value, evicting the least recently used item if full."""
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """Removes all items."""
+        with self._lock:
+            self._items.clear()
+
+
+_LOCAL_CACHE = LruCache(LOCAL_CACHE_SIZE)
+
+
+def flush_local_cache():
+    """Empties this instance's in-memory fragment cache."""
+    _LOCAL_CACHE.clear()
+
+
+def _to_key_part(value):
+    """Returns a string that identifies value in a cache key."""
+    # ndb.Keys have a compact, unambiguous string form.
+    if hasattr(value, 'urlsafe'):
+        return value.urlsafe()
+    return unicode(value)
+
+
+def make_cache_key(name, key, version):
+    """Returns the cache key for a fragment.
+
+    Args:
+        name: a string identifying the cache block (its template and line).
+        key: an object identifying what the fragment is about.
+        version: an object that changes whenever the fragment should change.
+    """
+    return u'%s%s:%s:%s' % (
+        _KEY_PREFIX, name, _to_key_part(key), _to_key_part(version))
+
+
+class FragmentCacheExtension(ext.Extension):
+    """Adds the {% cache key, version %} ... {% endcache %} block tag."""
+
+    tags = set(['cache'])
+
+    def parse(self, parser):
+        """Parses a cache block into a call to _cache_support."""
+        lineno = next(parser.stream).lineno
+        name = nodes.Const('%s:%d' % (parser.name, lineno))
+        key = parser.parse_expression()
+        parser.stream.expect('comma')
+        version = parser.parse_expression()
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache_support', [name, key, version]),
+            [], [], body).set_lineno(lineno)
+
+    # Jinja2 calls this from compiled templates, so pylint: disable=R0201
+    def _cache_support(self, name, key, version, caller):
+        """Returns the cached fragment, rendering it with caller() if needed."""
+        cache_key = make_cache_key(name, key, version)
+        fragment = _LOCAL_CACHE.get(cache_key)
+        if fragment is None:
+            fragment = unicode(caller())
+            _LOCAL_CACHE.set(cache_key, fragment)
+        # The fragment was already escaped when it was rendered.
+        return jinja2.Markup(fragment)
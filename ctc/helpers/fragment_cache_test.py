@@ -0,0 +1,61 @@
+"""Tests for the fragment cache template extension."""
+
+import unittest
+
+from google.appengine.api import memcache
+
+from ctc.helpers import fragment_cache
+from ctc.helpers import templates
+from ctc.testing import testutil
+
+
+TEMPLATE = (
+    '{% cache key, version %}<b>{{ value }}</b>{% endcache %} {{ user }}')
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class FragmentCacheTests(testutil.CtcTestCase):
+
+    def setUp(self):
+        super(FragmentCacheTests, self).setUp()
+        self.template = templates.JINJA_ENVIRONMENT.from_string(TEMPLATE)
+
+    def render(self, value, version=1, user='user'):
+        return self.template.render(
+            key='key', version=version, value=value, user=user)
+
+    def test_cache_block(self):
+        self.assertEqual(self.render('first'), '<b>first</b> user')
+        # The fragment is reused until its version changes, but the rest of the
+        # template isn't cached.
+        self.assertEqual(self.render('second', user='other'),
+                         '<b>first</b> other')
+        self.assertEqual(self.render('second', version=2),
+                         '<b>second</b> user')
+
+    def test_fragments_are_escaped_once(self):
+        self.assertEqual(self.render('<i>'), '<b>&lt;i&gt;</b> user')
+        self.assertEqual(self.render('<i>'), '<b>&lt;i&gt;</b> user')
+
+    def test_fragments_are_cached_locally(self):
+        self.render('first')
+        # Fragments aren't stored in memcache, which would cost an RPC per
+        # block on new instances.
+        self.assertEqual(memcache.get_stats()['items'], 0)
+        fragment_cache.flush_local_cache()
+        self.assertEqual(self.render('second'), '<b>second</b> user')
+
+    def test_lru_cache(self):
+        cache = fragment_cache.LruCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        # Adding a third item evicts the least recently used one.
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Values that aren't computed until something uses them.
+
+Handlers put values in self.values for templates, but many pages never read
+some of them (eg, the CSRF token on pages without forms).  Wrapping an expensive
+value in a LazyValue defers the work until a template prints the value or
+tests its truthiness, so pages that don't use it never pay for it.
+
+A LazyValue is a stand-in for the real value rather than a special dict, so it
+stays lazy when Jinja2 copies the values into contexts for includes and imports.
+"""
+
+
+class LazyValue(object):
+    """A value that is computed by calling a function the first time it's used.
+
+    The function is called at most once, and its result is reused afterward.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._is_computed = False
+        self._value = None
+
+    def get(self):
+        """Returns the value, computing it if necessary."""
+        if not self._is_computed:
+            self._value = self._func(*self._args, **self._kwargs)
+            self._is_computed = True
+        return self._value
+
+    @property
+    def is_computed(self):
+        """Whether the value has been computed yet."""
+        return self._is_computed
+
+    def __nonzero__(self):
+        return bool(self.get())
+
+    def __str__(self):
+        return str(self.get())
+
+    def __unicode__(self):
+        return unicode(self.get())
+
+    def __eq__(self, other):
+        return self.get() == other
+
+    def __ne__(self, other):
+        return self.get() != other
+
+    def __hash__(self):
+        return hash(self.get())
+
+    def __repr__(self):
+        if self._is_computed:
+            return 'LazyValue(%r)' % (self._value,)
+        return 'LazyValue(<not computed>)'
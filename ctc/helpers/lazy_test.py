@@ -0,0 +1,31 @@
+"""Tests for the lazy value helper."""
+
+import unittest
+
+import mock
+
+from ctc.helpers import lazy
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class LazyValueTests(unittest.TestCase):
+
+    def test_computes_once_when_used(self):
+        func = mock.Mock(return_value='value')
+        value = lazy.LazyValue(func, 'arg', keyword='keyword')
+        self.assertFalse(value.is_computed)
+        self.assertFalse(func.called)
+        self.assertEqual(str(value), 'value')
+        self.assertEqual(unicode(value), u'value')
+        self.assertTrue(value.is_computed)
+        func.assert_called_once_with('arg', keyword='keyword')
+
+    def test_truthiness_and_equality(self):
+        self.assertFalse(lazy.LazyValue(lambda: None))
+        self.assertTrue(lazy.LazyValue(lambda: 'url'))
+        self.assertEqual(lazy.LazyValue(lambda: 'url'), 'url')
+        self.assertNotEqual(lazy.LazyValue(lambda: 'url'), 'other')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+"""Latency, status, and size metrics for each route.
+
+MetricsMiddleware times every request from when it reaches the app until the
+last of its body is sent, and records it under the name of the webapp2 route
+that handles it.  Requests that admins asked to profile are left out, since
+profiling slows them down.  Each instance keeps its own metrics since it
+started.  Every ROLLUP_SECONDS, each instance also adds what it recorded since
+its last rollup to counters in memcache, which add up to the metrics for all
+instances (until memcache evicts them).
+
+Latencies are counted in fixed buckets so that instances' histograms can be
+added together, so percentiles are the upper bound of the bucket that they fall
+in.
+"""
+
+import bisect
+import threading
+import time
+
+from google.appengine.api import memcache
+
+
+# The upper bounds of the latency buckets in ms.  The last bucket has no bound.
+LATENCY_BUCKETS_MS = [
+    5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000,
+    5000, 10000]
+# Statuses are counted in these groups so that the rollup has a fixed set of
+# counters.  Revalidated pages (304) are counted apart from redirects.
+STATUS_GROUPS = ['2xx', '304', '3xx', '4xx', '5xx']
+# The route name for requests that don't match any route.
+UNMATCHED_ROUTE = '(unmatched)'
+# The environ key that the route name is stored under once webapp2 matches it.
+ROUTE_NAME_KEY = 'ctc.route_name'
+# Middleware sets this environ key to leave a request out of the metrics, eg,
+# because it was profiled.
+SKIP_KEY = 'ctc.metrics.skip'
+# How often each instance adds its metrics to the memcache rollup.
+ROLLUP_SECONDS = 60
+_CACHE_PREFIX = 'metrics:'
+
+_LOCK = threading.Lock()
+# The metrics since this instance started, by route name.
+_INSTANCE_METRICS = {}
+# The metrics that haven't been added to the rollup yet, by route name.
+_PENDING_METRICS = {}
+_LAST_ROLLUP_TIME = [time.time()]
+
+
+def get_status_group(status_code):
+    """Returns the group in STATUS_GROUPS that the status code is counted in."""
+    if status_code == 304:
+        return '304'
+    return '%dxx' % (status_code / 100)
+
+
+class RouteMetrics(object):
+    """The requests, latencies, statuses, and response sizes for a route."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0
+        self.total_bytes = 0
+        # The number of requests in each latency bucket, plus one for the
+        # requests slower than the last bound.
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.statuses = dict.fromkeys(STATUS_GROUPS, 0)
+
+    def record(self, latency_ms, status_code, num_bytes):
+        """Records a request."""
+        self.count += 1
+        self.total_ms += int(latency_ms)
+        self.total_bytes += num_bytes
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        status_group = get_status_group(status_code)
+        if status_group in self.statuses:
+            self.statuses[status_group] += 1
+
+    def add(self, other):
+        """Adds another RouteMetrics' requests to these."""
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.total_bytes += other.total_bytes
+        for index, bucket_count in enumerate(other.buckets):
+            self.buckets[index] += bucket_count
+        for status_group, status_count in other.statuses.items():
+            self.statuses[status_group] += status_count
+
+    def percentile(self, fraction):
+        """Returns the upper bound in ms of the bucket with the percentile.
+
+        Args:
+            fraction: the percentile as a fraction, eg, 0.95 for p95.
+
+        Returns:
+            The bound in ms, None if there are no requests, or infinity if the
+            percentile is slower than the last bucket's bound.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        num_requests = 0
+        for index, bucket_count in enumerate(self.buckets):
+            num_requests += bucket_count
+            if num_requests >= rank:
+                break
+        if index == len(LATENCY_BUCKETS_MS):
+            return float('inf')
+        return LATENCY_BUCKETS_MS[index]
+
+    def mean_ms(self):
+        """Returns the mean latency in ms, or None if there are no requests."""
+        return self.total_ms / float(self.count) if self.count else None
+
+    def mean_bytes(self):
+        """Returns the mean response size, or None if there are no requests."""
+        return self.total_bytes / float(self.count) if self.count else None
+
+    def to_counters(self, route_name):
+        """Returns a dict from the route's memcache counter names to values."""
+        prefix = route_name + ':'
+        counters = {
+            prefix + 'count': self.count,
+            prefix + 'total_ms': self.total_ms,
+            prefix + 'total_bytes': self.total_bytes,
+        }
+        for index, bucket_count in enumerate(self.buckets):
+            counters[prefix + 'bucket:%d' % index] = bucket_count
+        for status_group, status_count in self.statuses.items():
+            counters[prefix + 'status:' + status_group] = status_count
+        return counters
+
+    @classmethod
+    def from_counters(cls, route_name, counters):
+        """Returns the RouteMetrics for the route's counters from to_counters.
+
+        Missing counters (eg, evicted ones) count as 0.
+        """
+        metrics = cls()
+        prefix = route_name + ':'
+        metrics.count = counters.get(prefix + 'count', 0)
+        metrics.total_ms = counters.get(prefix + 'total_ms', 0)
+        metrics.total_bytes = counters.get(prefix + 'total_bytes', 0)
+        metrics.buckets = [
+            counters.get(prefix + 'bucket:%d' % index, 0)
+            for index in range(len(metrics.buckets))]
+        metrics.statuses = dict(
+            (status_group, counters.get(prefix + 'status:' + status_group, 0))
+            for status_group in STATUS_GROUPS)
+        return metrics
+
+
+def record(route_name, latency_ms, status_code, num_bytes):
+    """Records a request to the named route in this instance's metrics."""
+    with _LOCK:
+        for all_metrics in [_INSTANCE_METRICS, _PENDING_METRICS]:
+            if route_name not in all_metrics:
+                all_metrics[route_name] = RouteMetrics()
+            all_metrics[route_name].record(latency_ms, status_code, num_bytes)
+
+
+def get_instance_metrics():
+    """Returns a dict from route name to this instance's RouteMetrics."""
+    with _LOCK:
+        instance_metrics = {}
+        for route_name, route_metrics in _INSTANCE_METRICS.items():
+            instance_metrics[route_name] = RouteMetrics()
+            instance_metrics[route_name].add(route_metrics)
+        return instance_metrics
+
+
+def rollup():
+    """Adds the metrics recorded since the last rollup to memcache."""
+    with _LOCK:
+        pending_metrics = dict(_PENDING_METRICS)
+        _PENDING_METRICS.clear()
+        _LAST_ROLLUP_TIME[0] = time.time()
+    counters = {}
+    for route_name, route_metrics in pending_metrics.items():
+        counters.update(route_metrics.to_counters(route_name))
+    if counters:
+        memcache.offset_multi(
+            counters, key_prefix=_CACHE_PREFIX, initial_value=0)
+
+
+def maybe_rollup(rollup_seconds):
+    """Runs rollup() if it hasn't run for rollup_seconds."""
+    if time.time() - _LAST_ROLLUP_TIME[0] >= rollup_seconds:
+        rollup()
+
+
+def get_rolled_up_metrics(route_names):
+    """Returns a dict from route name to RouteMetrics for all instances.
+
+    Routes without any rolled up requests are left out.
+    """
+    keys = []
+    for route_name in route_names:
+        keys.extend(RouteMetrics().to_counters(route_name))
+    counters = memcache.get_multi(keys, key_prefix=_CACHE_PREFIX)
+    rolled_up_metrics = {}
+    for route_name in route_names:
+        route_metrics = RouteMetrics.from_counters(route_name, counters)
+        if route_metrics.count:
+            rolled_up_metrics[route_name] = route_metrics
+    return rolled_up_metrics
+
+
+def reset():
+    """Forgets this instance's metrics (eg, between tests)."""
+    with _LOCK:
+        _INSTANCE_METRICS.clear()
+        _PENDING_METRICS.clear()
+        _LAST_ROLLUP_TIME[0] = time.time()
+
+
+def _dispatch_and_record_route(router, request, response):
+    """Dispatches the request like webapp2 and stores its route's name.
+
+    webapp2 sets request.route when it matches the request, so the name is
+    copied to the environ, where MetricsMiddleware can read it.
+    """
+    try:
+        return router.default_dispatcher(request, response)
+    finally:
+        if request.route:
+            request.environ[ROUTE_NAME_KEY] = (
+                request.route.name or request.route.template)
+
+
+class MetricsMiddleware(object):
+    """Records the metrics for each request to a webapp2 app."""
+
+    def __init__(self, app, router, rollup_seconds=ROLLUP_SECONDS):
+        """Initializes the middleware.
+
+        Args:
+            app: the WSGI app to record requests to.
+            router: the webapp2 router that routes the app's requests.  Its
+                dispatcher is replaced with one that stores the route's name.
+            rollup_seconds: how often to add the metrics to memcache, or None
+                to only keep them on each instance.
+        """
+        self.app = app
+        router.set_dispatcher(_dispatch_and_record_route)
+        self.rollup_seconds = rollup_seconds
+
+    def __call__(self, environ, start_response):
+        start_time = time.time()
+        state = {'status_code': 500}
+
+        def metrics_start_response(status, headers, exc_info=None):
+            """Records the response's status."""
+            state['status_code'] = int(status.split()[0])
+            return start_response(status, headers, exc_info)
+
+        app_iter = self.app(environ, metrics_start_response)
+        return self._finish(app_iter, environ, start_time, state)
+
+    def _finish(self, app_iter, environ, start_time, state):
+        """Yields the body and then records the request."""
+        num_bytes = 0
+        try:
+            for data in app_iter:
+                num_bytes += len(data)
+                yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            if not environ.get(SKIP_KEY):
+                latency_ms = (time.time() - start_time) * 1000
+                route_name = environ.get(ROUTE_NAME_KEY, UNMATCHED_ROUTE)
+                record(route_name, latency_ms, state['status_code'], num_bytes)
+            if self.rollup_seconds is not None:
+                maybe_rollup(self.rollup_seconds)
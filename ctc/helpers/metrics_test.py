@@ -0,0 +1,145 @@
+"""Tests for the per-route metrics."""
+
+import unittest
+
+import mock
+import webapp2
+
+from ctc.helpers import metrics
+from ctc.helpers import profiler
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class Handler(webapp2.RequestHandler):
+
+    def get(self):
+        self.response.write('x' * 100)
+
+    def post(self):
+        self.redirect('/page')
+
+
+def make_app(rollup_seconds=None, profile=False):
+    webapp = webapp2.WSGIApplication(
+        [webapp2.Route('/page', Handler, name='Page')])
+    wrapped_app = profiler.ProfilerMiddleware(webapp) if profile else webapp
+    return metrics.MetricsMiddleware(
+        wrapped_app, webapp.router, rollup_seconds)
+
+
+def get(app, path, **kwargs):
+    response = webapp2.Request.blank(path, **kwargs).get_response(app)
+    # The request is recorded once its body has been sent.
+    response.body  # pylint: disable=W0104
+    return response
+
+
+class RouteMetricsTests(testutil.CtcTestCase):
+
+    def test_record(self):
+        route_metrics = metrics.RouteMetrics()
+        route_metrics.record(3, 200, 100)
+        route_metrics.record(40.5, 304, 0)
+        route_metrics.record(20000, 500, 50)
+        self.assertEqual(route_metrics.count, 3)
+        self.assertEqual(route_metrics.total_ms, 20043)
+        self.assertEqual(route_metrics.mean_bytes(), 50)
+        self.assertEqual(route_metrics.statuses,
+                         {'2xx': 1, '304': 1, '3xx': 0, '4xx': 0, '5xx': 1})
+
+    def test_percentile(self):
+        route_metrics = metrics.RouteMetrics()
+        self.assertIsNone(route_metrics.percentile(0.5))
+        for latency_ms in range(1, 101):
+            route_metrics.record(latency_ms, 200, 0)
+        self.assertEqual(route_metrics.percentile(0.05), 5)
+        self.assertEqual(route_metrics.percentile(0.5), 50)
+        self.assertEqual(route_metrics.percentile(0.95), 100)
+        route_metrics.record(60000, 200, 0)
+        self.assertEqual(route_metrics.percentile(1), float('inf'))
+
+    def test_add(self):
+        route_metrics = metrics.RouteMetrics()
+        route_metrics.record(3, 200, 100)
+        other = metrics.RouteMetrics()
+        other.record(300, 404, 10)
+        route_metrics.add(other)
+        self.assertEqual(route_metrics.count, 2)
+        self.assertEqual(route_metrics.total_bytes, 110)
+        self.assertEqual(route_metrics.percentile(1), 300)
+        self.assertEqual(route_metrics.statuses['4xx'], 1)
+
+    def test_counters(self):
+        route_metrics = metrics.RouteMetrics()
+        route_metrics.record(3, 200, 100)
+        route_metrics.record(700, 302, 0)
+        counters = route_metrics.to_counters('Page')
+        copy = metrics.RouteMetrics.from_counters('Page', counters)
+        self.assertEqual(copy.to_counters('Page'), counters)
+        empty = metrics.RouteMetrics.from_counters('Other', counters)
+        self.assertEqual(empty.count, 0)
+
+
+class MetricsMiddlewareTests(testutil.CtcTestCase):
+
+    def test_records_route(self):
+        app = make_app()
+        get(app, '/page')
+        get(app, '/page', POST={})
+        get(app, '/missing')
+        instance_metrics = metrics.get_instance_metrics()
+        self.assertEqual(
+            sorted(instance_metrics), [metrics.UNMATCHED_ROUTE, 'Page'])
+        page_metrics = instance_metrics['Page']
+        self.assertEqual(page_metrics.count, 2)
+        self.assertEqual(page_metrics.statuses['2xx'], 1)
+        self.assertEqual(page_metrics.statuses['3xx'], 1)
+        self.assertGreaterEqual(page_metrics.total_bytes, 100)
+        unmatched = instance_metrics[metrics.UNMATCHED_ROUTE]
+        self.assertEqual(unmatched.statuses['4xx'], 1)
+
+    def test_requests_are_routed_once(self):
+        app = make_app()
+        with mock.patch.object(
+                webapp2.Router, 'match', autospec=True,
+                side_effect=webapp2.Router.match) as match:
+            get(app, '/page')
+        self.assertEqual(match.call_count, 1)
+        self.assertEqual(metrics.get_instance_metrics()['Page'].count, 1)
+
+    def test_profiled_requests_are_not_recorded(self):
+        app = make_app(profile=True)
+        self.login(is_admin=True)
+        get(app, '/page?profile=1')
+        self.assertEqual(metrics.get_instance_metrics(), {})
+        # Only admins' requests are profiled.
+        self.login()
+        get(app, '/page?profile=1')
+        self.assertEqual(metrics.get_instance_metrics()['Page'].count, 1)
+
+    def test_rollup(self):
+        app = make_app()
+        get(app, '/page')
+        self.assertEqual(metrics.get_rolled_up_metrics(['Page']), {})
+        metrics.rollup()
+        get(app, '/page')
+        metrics.rollup()
+        # Another instance's requests add to the same counters.
+        metrics.reset()
+        get(app, '/page')
+        metrics.rollup()
+        rolled_up = metrics.get_rolled_up_metrics(['Page', 'Other'])
+        self.assertEqual(rolled_up.keys(), ['Page'])
+        self.assertEqual(rolled_up['Page'].count, 3)
+        self.assertEqual(metrics.get_instance_metrics()['Page'].count, 1)
+
+    def test_rollup_seconds(self):
+        app = make_app(rollup_seconds=0)
+        get(app, '/page')
+        rolled_up = metrics.get_rolled_up_metrics(['Page'])
+        self.assertEqual(rolled_up['Page'].count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
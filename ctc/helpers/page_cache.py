@@ -0,0 +1,190 @@
+"""A memcache cache of the pages that logged-out users see.
+
+Logged-out users all see the same page for a given URL, so there is no need to
+run the queries and render the template for each of them.  To cache a handler's
+get() for logged-out users, decorate it:
+    @page_cache.cached_for_logged_out_users(get_version_names)
+where get_version_names takes the same arguments as get() and returns the names
+of the versions that the page depends on (eg, ['project:123']).
+
+Pages are invalidated by bumping their versions rather than deleting them:
+    page_cache.bump_versions('project:123')
+The cache key of a page includes the versions that were current before it was
+rendered, so a render that races with a write stores its stale page under a key
+that will never be read again.  Versions are also the time of their last bump in
+milliseconds, so they double as modification times (eg, for Last-Modified).
+
+When a page isn't cached, only one request renders it.  Other requests for the
+same page wait briefly for that render rather than all rendering it at once.
+"""
+
+import functools
+import os
+import time
+
+from google.appengine.api import memcache
+from google.appengine.api import users
+
+
+# How long a rendered page may be served.  Pages are normally replaced sooner by
+# version bumps, but writes that don't bump a version are stale at most this
+# long.
+CACHE_SECONDS = 60*60
+# How long one request may hold the right to render a page.
+RENDER_LOCK_SECONDS = 10
+# How long other requests wait for that render before rendering on their own.
+WAIT_SECONDS = 2
+POLL_SECONDS = 0.05
+# A response header saying whether the page came from the cache.
+CACHE_HEADER = 'X-Page-Cache'
+_KEY_PREFIX = 'page_cache:'
+# How many times bump_versions retries a compare-and-set that lost a race.
+_NUM_BUMP_RETRIES = 5
+
+
+def _version_key(name):
+    """Returns the memcache key for the version with the provided name."""
+    return '%sversion:%s' % (_KEY_PREFIX, name)
+
+
+def _initial_version():
+    """Returns the version for a name that has no version in memcache.
+
+    This is the current time in milliseconds rather than 0 so that a version
+    that memcache evicted doesn't start over and reuse old pages.
+    """
+    return int(time.time() * 1000)
+
+
+def get_modified_time(versions):
+    """Returns the time in seconds when the newest of the versions was bumped.
+
+    This can be later than the real modification (eg, if memcache evicted the
+    version), but never earlier.
+    """
+    return max(versions) / 1000.0
+
+
+def get_versions(names):
+    """Returns the current versions for the names, or None if memcache fails."""
+    version_keys = [_version_key(name) for name in names]
+    versions = memcache.get_multi(version_keys)
+    missing_keys = [key for key in version_keys if key not in versions]
+    if missing_keys:
+        memcache.add_multi(dict.fromkeys(missing_keys, _initial_version()))
+        versions.update(memcache.get_multi(missing_keys))
+    if len(versions) != len(version_keys):
+        return None
+    return [versions[key] for key in version_keys]
+
+
+def bump_versions(*names):
+    """Invalidates every cached page that depends on any of the names.
+
+    Each version is moved forward to the current time, or to one more than its
+    old value if that is later, so every bump changes it.  Versions are
+    updated with compare-and-set so that racing bumps can't overshoot.  If a
+    version is too contended to set, it is incremented instead, which still
+    changes it.
+    """
+    client = memcache.Client()
+    now = _initial_version()
+    pending_keys = [_version_key(name) for name in names]
+    for _ in range(_NUM_BUMP_RETRIES):
+        versions = client.get_multi(pending_keys, for_cas=True)
+        missing_keys = [key for key in pending_keys if key not in versions]
+        pending_keys = []
+        if missing_keys:
+            pending_keys += client.add_multi(
+                dict.fromkeys(missing_keys, now))
+        if versions:
+            pending_keys += client.cas_multi(
+                dict((key, max(now, version + 1))
+                     for key, version in versions.items()))
+        if not pending_keys:
+            return
+    client.offset_multi(dict.fromkeys(pending_keys, 1), initial_value=now)
+
+
+def _wait_for_page(cache_key):
+    """Waits for another request to render the page, returning None on timeout.
+    """
+    deadline = time.time() + WAIT_SECONDS
+    while time.time() < deadline:
+        time.sleep(POLL_SECONDS)
+        body = memcache.get(cache_key)
+        if body is not None:
+            return body
+    return None
+
+
+def get_or_render(cache_key, render):
+    """Returns the cached page, rendering and caching it if necessary.
+
+    Args:
+        cache_key: the memcache key for the page.
+        render: a function that renders the page and returns it, or returns
+            None if the page shouldn't be cached (eg, it was an error).
+
+    Returns:
+        A tuple of (body, was_cached) where body is the page and was_cached is
+        whether it came from the cache rather than render().
+    """
+    body = memcache.get(cache_key)
+    if body is not None:
+        return body, True
+    lock_key = cache_key + ':lock'
+    is_rendering = memcache.add(lock_key, True, time=RENDER_LOCK_SECONDS)
+    if not is_rendering:
+        body = _wait_for_page(cache_key)
+        if body is not None:
+            return body, True
+    try:
+        body = render()
+        if body is not None:
+            memcache.set(cache_key, body, time=CACHE_SECONDS)
+    finally:
+        if is_rendering:
+            memcache.delete(lock_key)
+    return body, False
+
+
+def cached_for_logged_out_users(get_version_names):
+    """Returns a decorator that caches a handler's GET for logged-out users.
+
+    Args:
+        get_version_names: a function that takes the handler method's arguments
+            and returns a list of the version names that the page depends on.
+    """
+    def decorator(method):
+        """Wraps method in the page cache."""
+
+        @functools.wraps(method)
+        def wrapper(handler, *args, **kwargs):
+            """Serves the page from the cache if the user is logged out."""
+            if handler.request.method != 'GET' or users.get_current_user():
+                return method(handler, *args, **kwargs)
+            versions = get_versions(get_version_names(*args, **kwargs))
+            if versions is None:
+                return method(handler, *args, **kwargs)
+            # Pages from other deployments may link to assets that are gone.
+            cache_key = '%spage:%s:%s:%s' % (
+                _KEY_PREFIX, os.environ.get('CURRENT_VERSION_ID', ''),
+                handler.request.path_qs,
+                ':'.join(str(version) for version in versions))
+
+            def render():
+                """Runs the handler, returning its page if it succeeded."""
+                method(handler, *args, **kwargs)
+                if handler.response.status_int != 200:
+                    return None
+                return handler.response.body
+
+            body, was_cached = get_or_render(cache_key, render)
+            handler.response.headers[CACHE_HEADER] = (
+                'hit' if was_cached else 'miss')
+            if was_cached:
+                handler.response.write(body)
+
+        return wrapper
+    return decorator
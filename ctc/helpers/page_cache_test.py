@@ -0,0 +1,94 @@
+"""Tests for the page cache helper."""
+
+import unittest
+
+import mock
+
+from google.appengine.api import memcache
+
+from ctc.helpers import page_cache
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+# Tests can test protected members, so pylint: disable=W0212
+class PageCacheTests(testutil.CtcTestCase):
+
+    def test_versions(self):
+        first_versions = page_cache.get_versions(['a', 'b'])
+        self.assertEqual(page_cache.get_versions(['a', 'b']), first_versions)
+        page_cache.bump_versions('a')
+        bumped_versions = page_cache.get_versions(['a', 'b'])
+        self.assertNotEqual(bumped_versions[0], first_versions[0])
+        self.assertEqual(bumped_versions[1], first_versions[1])
+
+    def test_versions_are_bump_times(self):
+        with mock.patch.object(page_cache.time, 'time', return_value=100):
+            versions = page_cache.get_versions(['a'])
+        self.assertEqual(page_cache.get_modified_time(versions), 100)
+        with mock.patch.object(page_cache.time, 'time', return_value=200):
+            page_cache.bump_versions('a')
+            page_cache.bump_versions('a')
+        # The second bump in the same millisecond still changes the version.
+        versions = page_cache.get_versions(['a'])
+        self.assertEqual(versions, [200001])
+        self.assertEqual(page_cache.get_modified_time(versions), 200.001)
+
+    def test_racing_bumps_dont_overshoot(self):
+        with mock.patch.object(page_cache.time, 'time', return_value=100):
+            page_cache.get_versions(['a'])
+        cas_multi = memcache.Client.cas_multi
+        calls = []
+
+        def racing_cas_multi(client, mapping, *args, **kwargs):
+            if not calls:
+                calls.append(mapping)
+                # Another request bumps the version first.
+                memcache.set(page_cache._version_key('a'), 200000)
+            return cas_multi(client, mapping, *args, **kwargs)
+
+        with mock.patch.object(page_cache.time, 'time', return_value=200):
+            with mock.patch.object(
+                    memcache.Client, 'cas_multi', racing_cas_multi):
+                page_cache.bump_versions('a')
+        # The bump is retried on the other request's version, so it isn't
+        # applied twice.
+        self.assertEqual(page_cache.get_versions(['a']), [200001])
+
+    def test_get_or_render(self):
+        render = mock.Mock(return_value='page')
+        self.assertEqual(page_cache.get_or_render('key', render),
+                         ('page', False))
+        self.assertEqual(page_cache.get_or_render('key', render),
+                         ('page', True))
+        self.assertEqual(render.call_count, 1)
+        # Pages that fail to render aren't cached.
+        render = mock.Mock(return_value=None)
+        page_cache.get_or_render('error', render)
+        page_cache.get_or_render('error', render)
+        self.assertEqual(render.call_count, 2)
+
+    def test_get_or_render_waits_for_other_render(self):
+        # Another request is already rendering the page.
+        memcache.add('key:lock', True)
+        render = mock.Mock(return_value='my page')
+
+        def finish_other_render(_):
+            memcache.set('key', 'their page')
+
+        with mock.patch.object(page_cache.time, 'sleep',
+                               side_effect=finish_other_render):
+            self.assertEqual(page_cache.get_or_render('key', render),
+                             ('their page', True))
+        self.assertFalse(render.called)
+
+    def test_get_or_render_renders_if_other_render_is_slow(self):
+        memcache.add('key:lock', True)
+        render = mock.Mock(return_value='my page')
+        with mock.patch.object(page_cache, 'WAIT_SECONDS', 0):
+            self.assertEqual(page_cache.get_or_render('key', render),
+                             ('my page', False))
+
+
+if __name__ == '__main__':
+    unittest.main()
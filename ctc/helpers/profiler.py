@@ -0,0 +1,189 @@
+"""Profiles single requests on demand for admins.
+
+An admin can profile any request by adding profile=1 to its query string or
+sending an X-Profile: 1 header.  ProfilerMiddleware runs that request under
+cProfile and saves its most expensive functions in memcache, keyed by the
+request's id, which it returns in the X-Profile-Id header.  The profiles are
+listed at /admin/profiles.
+
+A profiled response is sent all at once rather than streamed, so that the
+time spent rendering it is included.  Requests from anyone else are passed
+through untouched.
+
+cProfile and pstats are only imported once a request is profiled, since this
+module is imported by every new instance and almost no requests are profiled.
+"""
+
+import datetime
+import logging
+import os
+import sys
+import time
+import urlparse
+
+from google.appengine.api import memcache
+from google.appengine.api import users
+
+from ctc.helpers import metrics
+
+
+QUERY_PARAMETER = 'profile'
+REQUEST_HEADER = 'X-Profile'
+RESPONSE_HEADER = 'X-Profile-Id'
+# The number of functions kept from each profile, both by cumulative time and
+# by internal time.
+NUM_FUNCTIONS = 100
+# The number of profiles listed; older ones are forgotten.
+MAX_PROFILES = 50
+PROFILE_CACHE_SECONDS = 60 * 60 * 24
+_CACHE_PREFIX = 'profile:'
+_INDEX_KEY = 'profile_index'
+_NUM_INDEX_RETRIES = 5
+
+
+def is_requested(environ):
+    """Returns whether the request asks to be profiled."""
+    values = urlparse.parse_qs(environ.get('QUERY_STRING', '')).get(
+        QUERY_PARAMETER, [])
+    values.append(environ.get('HTTP_' + REQUEST_HEADER.upper().replace(
+        '-', '_'), ''))
+    return any(value not in ['', '0'] for value in values)
+
+
+def _get_profile_id():
+    """Returns an id for the current request.
+
+    App Engine's request log id is used when there is one so that the profile
+    can be matched with the request's logs.  (uuid isn't used since importing
+    it slows down every new instance.)
+    """
+    return os.environ.get('REQUEST_LOG_ID') or os.urandom(16).encode('hex')
+
+
+def _shorten_path(file_name):
+    """Returns the file name relative to the longest sys.path that contains it.
+    """
+    prefixes = [path.rstrip('/') + '/' for path in sys.path if path]
+    matches = [prefix for prefix in prefixes if file_name.startswith(prefix)]
+    if not matches:
+        return file_name
+    return file_name[len(max(matches, key=len)):]
+
+
+def summarize(profile, num_functions=NUM_FUNCTIONS):
+    """Returns the profile's most expensive functions.
+
+    Returns:
+        A list of dicts with each function's name, number of calls, internal
+        time (tottime), and cumulative time (cumtime) in seconds, sorted by
+        cumulative time.  The list has the num_functions functions with the
+        most cumulative time and the num_functions with the most internal time.
+    """
+    import pstats
+    functions = []
+    stats = pstats.Stats(profile).stats
+    for (file_name, line, name), (_, calls, tottime, cumtime, _) in (
+            stats.items()):
+        functions.append({
+            'function': '%s:%d(%s)' % (_shorten_path(file_name), line, name),
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        })
+    by_cumtime = sorted(functions, key=lambda row: row['cumtime'],
+                        reverse=True)
+    by_tottime = sorted(functions, key=lambda row: row['tottime'],
+                        reverse=True)
+    kept = set(id(row) for row in
+               by_cumtime[:num_functions] + by_tottime[:num_functions])
+    return [row for row in by_cumtime if id(row) in kept]
+
+
+def _add_to_index(entry):
+    """Adds a profile's entry to the front of the list of profiles."""
+    client = memcache.Client()
+    for _ in range(_NUM_INDEX_RETRIES):
+        index = client.gets(_INDEX_KEY)
+        if index is None:
+            if client.add(_INDEX_KEY, [entry], time=PROFILE_CACHE_SECONDS):
+                return
+            continue
+        index = [entry] + index[:MAX_PROFILES - 1]
+        if client.cas(_INDEX_KEY, index, time=PROFILE_CACHE_SECONDS):
+            return
+    logging.warning('Could not list profile %s', entry['id'])
+
+
+def save_profile(profile_id, environ, status, elapsed_seconds, profile):
+    """Saves the summarized profile of a request and lists it.
+
+    Returns:
+        The saved profile, a dict.
+    """
+    entry = {
+        'id': profile_id,
+        'method': environ.get('REQUEST_METHOD'),
+        'path': environ.get('PATH_INFO'),
+        'status': status,
+        'created': datetime.datetime.utcnow(),
+        'total_ms': elapsed_seconds * 1000,
+    }
+    saved_profile = dict(entry, functions=summarize(profile))
+    memcache.set(_CACHE_PREFIX + profile_id, saved_profile,
+                 time=PROFILE_CACHE_SECONDS)
+    _add_to_index(entry)
+    return saved_profile
+
+
+def get_profile(profile_id):
+    """Returns the saved profile with the id, or None if it is gone."""
+    return memcache.get(_CACHE_PREFIX + profile_id)
+
+
+def list_profiles():
+    """Returns the entries for the latest profiles, newest first.
+
+    Each entry is a dict with the profile's id, the request's method, path, and
+    status, when it was created, and how long it took in ms.
+    """
+    return memcache.get(_INDEX_KEY) or []
+
+
+class ProfilerMiddleware(object):
+    """Profiles the requests that admins ask to profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        if not is_requested(environ) or not users.is_current_user_admin():
+            return self.app(environ, start_response)
+        import cProfile
+        profile_id = _get_profile_id()
+        # Profiled requests are much slower than usual.
+        environ[metrics.SKIP_KEY] = True
+        state = {'status': None}
+
+        def profiling_start_response(status, headers, exc_info=None):
+            """Adds the profile's id to the response."""
+            state['status'] = status
+            headers = list(headers) + [(RESPONSE_HEADER, profile_id)]
+            return start_response(status, headers, exc_info)
+
+        profile = cProfile.Profile()
+        start_time = time.time()
+        profile.enable()
+        try:
+            app_iter = self.app(environ, profiling_start_response)
+            try:
+                body = list(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profile.disable()
+        save_profile(profile_id, environ, state['status'],
+                     time.time() - start_time, profile)
+        logging.info('Profiled %s %s as %s', environ.get('REQUEST_METHOD'),
+                     environ.get('PATH_INFO'), profile_id)
+        return body
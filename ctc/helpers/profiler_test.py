@@ -0,0 +1,91 @@
+"""Tests for profiling requests on demand."""
+
+import cProfile
+import unittest
+
+import webapp2
+
+from ctc.helpers import profiler
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+def slow_function():
+    return sum(range(1000))
+
+
+def app(_, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    # Like a streamed template, the work happens as the body is iterated.
+    for _ in range(3):
+        yield str(slow_function())
+
+
+def get(path, headers=None):
+    return webapp2.Request.blank(path, headers=headers).get_response(
+        profiler.ProfilerMiddleware(app))
+
+
+class ProfilerTests(testutil.CtcTestCase):
+
+    def test_is_requested(self):
+        self.assertFalse(profiler.is_requested({}))
+        self.assertFalse(profiler.is_requested({'QUERY_STRING': 'profile=0'}))
+        self.assertTrue(
+            profiler.is_requested({'QUERY_STRING': 'a=b&profile=1'}))
+        self.assertTrue(profiler.is_requested({'HTTP_X_PROFILE': '1'}))
+
+    def test_not_profiled_for_non_admins(self):
+        self.login()
+        response = get('/?profile=1')
+        self.assertEqual(response.body, '499500' * 3)
+        self.assertNotIn(profiler.RESPONSE_HEADER, response.headers)
+        self.assertEqual(profiler.list_profiles(), [])
+
+    def test_profiled_for_admins(self):
+        self.login(is_admin=True)
+        self.assertNotIn(profiler.RESPONSE_HEADER, get('/').headers)
+        response = get('/path?profile=1')
+        self.assertEqual(response.body, '499500' * 3)
+        profile_id = response.headers[profiler.RESPONSE_HEADER]
+        profile = profiler.get_profile(profile_id)
+        self.assertEqual(profile['path'], '/path')
+        self.assertEqual(profile['status'], '200 OK')
+        functions = dict((row['function'], row)
+                         for row in profile['functions'])
+        slow_function_names = [name for name in functions
+                               if name.endswith('(slow_function)')]
+        self.assertEqual(len(slow_function_names), 1)
+        self.assertEqual(functions[slow_function_names[0]]['calls'], 3)
+        self.assertEqual(
+            [entry['id'] for entry in profiler.list_profiles()], [profile_id])
+
+    def test_header_requests_profile(self):
+        self.login(is_admin=True)
+        response = get('/', headers={profiler.REQUEST_HEADER: '1'})
+        self.assertIn(profiler.RESPONSE_HEADER, response.headers)
+
+    def test_list_is_capped(self):
+        self.login(is_admin=True)
+        original_max_profiles = profiler.MAX_PROFILES
+        profiler.MAX_PROFILES = 2
+        try:
+            profile_ids = [
+                get('/?profile=1').headers[profiler.RESPONSE_HEADER]
+                for _ in range(3)]
+        finally:
+            profiler.MAX_PROFILES = original_max_profiles
+        self.assertEqual(
+            [entry['id'] for entry in profiler.list_profiles()],
+            profile_ids[:0:-1])
+
+    def test_summarize_keeps_expensive_functions(self):
+        profile = cProfile.Profile()
+        profile.runcall(slow_function)
+        functions = profiler.summarize(profile, num_functions=1)
+        self.assertLessEqual(len(functions), 2)
+        self.assertTrue(functions[0]['function'].endswith('(slow_function)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
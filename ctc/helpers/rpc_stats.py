@@ -0,0 +1,217 @@
+"""Counts the API calls (RPCs) that each request makes and how long they take.
+
+Hooks on App Engine's API proxy record every RPC, such as datastore gets and
+memcache lookups, made while a request is handled.  RpcStatsMiddleware logs a
+summary for each request and, for admins and the development server, adds it
+to the response in the X-RPC-Stats header, eg:
+    X-RPC-Stats: datastore_v3=3/12ms/45keys memcache=2/1ms/9keys user=1/0ms
+An RPC's time runs from when it is made until its result is collected, so RPCs
+that run in parallel overlap.
+
+ndb batches the gets that a request makes at the same time into one RPC, so a
+get per row costs about as many RPCs as one batch get.  The datastore and
+memcache stats also count the keys that the RPCs read or wrote (including each
+result of a datastore query), which do grow with the number of rows.
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.api import users
+
+
+HEADER = 'X-RPC-Stats'
+_HOOK_KEY = 'ctc_rpc_stats'
+
+_LOCAL = threading.local()
+# The API proxy that the hooks are installed on.  Tests replace the API proxy,
+# so the hooks are reinstalled whenever it changes.
+_HOOKED_APIPROXY = [None]
+
+
+class RpcStats(object):
+    """The number of RPCs and their total time in seconds for each service.
+
+    For the services in _KEY_COUNTERS, the number of keys that the RPCs read or
+    wrote is kept too.
+    """
+
+    def __init__(self):
+        self.counts = collections.defaultdict(int)
+        self.seconds = collections.defaultdict(float)
+        self.num_keys = collections.defaultdict(int)
+        # The start time of each RPC that hasn't finished, by the RPC's id.
+        self._start_times = {}
+
+    def start(self, rpc):
+        """Records that rpc was made."""
+        self._start_times[id(rpc)] = time.time()
+
+    def finish(self, service, rpc, num_keys=0):
+        """Records that rpc for the service finished.
+
+        RPCs that weren't started with these stats are ignored.  They were made
+        by an earlier request that didn't wait for them (eg, a query's
+        prefetch of its next batch) and finished while this one waited.
+
+        Args:
+            service: the name of the RPC's service, eg, 'datastore_v3'.
+            rpc: the RPC, as passed to start.
+            num_keys: the number of keys that the RPC read or wrote.
+        """
+        start_time = self._start_times.pop(id(rpc), None)
+        if start_time is None:
+            return
+        self.counts[service] += 1
+        self.num_keys[service] += num_keys
+        self.seconds[service] += time.time() - start_time
+
+    def summary(self):
+        """Returns a string like the example in the module docstring."""
+        service_summaries = []
+        for service, count in sorted(self.counts.items()):
+            service_summary = '%s=%d/%dms' % (
+                service, count, self.seconds[service] * 1000)
+            if service in _KEY_COUNTERS:
+                service_summary += '/%dkeys' % self.num_keys[service]
+            service_summaries.append(service_summary)
+        # Header values must be str, and some service names are unicode.
+        return str(' '.join(service_summaries))
+
+
+def parse_summary(summary):
+    """Returns a dict from each service in a summary to its number of RPCs."""
+    counts = {}
+    for service_stats in summary.split():
+        service, _, stats = service_stats.partition('=')
+        counts[service] = int(stats.split('/')[0])
+    return counts
+
+
+def parse_summary_keys(summary):
+    """Returns a dict from each service in a summary to its number of keys.
+
+    Services whose keys aren't counted are left out.
+    """
+    num_keys = {}
+    for service_stats in summary.split():
+        service, _, stats = service_stats.partition('=')
+        stats = stats.split('/')
+        if len(stats) > 2:
+            num_keys[service] = int(stats[2][:-len('keys')])
+    return num_keys
+
+
+def get_current_stats():
+    """Returns the RpcStats for the current request, or None."""
+    return getattr(_LOCAL, 'stats', None)
+
+
+def _count_datastore_keys(call, request, response):
+    """Returns the number of keys that a datastore call read or wrote."""
+    if call in ['Get', 'Delete']:
+        return request.key_size()
+    if call == 'Put':
+        return request.entity_size()
+    if call in ['RunQuery', 'Next']:
+        return response.result_size()
+    return 0
+
+
+# Only the request is needed, so pylint: disable=W0613
+def _count_memcache_keys(call, request, response):
+    """Returns the number of keys that a memcache call read or wrote."""
+    if call == 'Get':
+        return request.key_size()
+    if call in ['Set', 'Delete', 'BatchIncrement']:
+        return request.item_size()
+    if call == 'Increment':
+        return 1
+    return 0
+# pylint: enable=W0613
+
+
+# The function that counts each service's keys, by service name.
+_KEY_COUNTERS = {
+    'datastore_v3': _count_datastore_keys,
+    'memcache': _count_memcache_keys,
+}
+
+
+# The hooks must have the same arguments as the API proxy passes them, so
+# pylint: disable=W0613
+def _pre_call_hook(service, call, request, response, rpc=None):
+    """Records the start of an RPC."""
+    stats = get_current_stats()
+    if stats is not None:
+        stats.start(rpc or request)
+
+
+def _post_call_hook(service, call, request, response, rpc=None, error=None):
+    """Records the end of an RPC."""
+    stats = get_current_stats()
+    if stats is not None:
+        num_keys = 0
+        if service in _KEY_COUNTERS and not error:
+            num_keys = _KEY_COUNTERS[service](call, request, response)
+        stats.finish(service, rpc or request, num_keys)
+# pylint: enable=W0613
+
+
+def install_hooks():
+    """Installs the hooks on the current API proxy if they aren't already."""
+    apiproxy = apiproxy_stub_map.apiproxy
+    if _HOOKED_APIPROXY[0] is apiproxy:
+        return
+    apiproxy.GetPreCallHooks().Append(_HOOK_KEY, _pre_call_hook)
+    apiproxy.GetPostCallHooks().Append(_HOOK_KEY, _post_call_hook)
+    _HOOKED_APIPROXY[0] = apiproxy
+
+
+def _should_add_header():
+    """Returns whether the current response should include the stats header."""
+    is_dev = os.environ.get('SERVER_SOFTWARE', '').startswith('Development')
+    return is_dev or users.is_current_user_admin()
+
+
+class RpcStatsMiddleware(object):
+    """Records each request's RPCs, and logs and reports them.
+
+    The header includes the RPCs made before the app starts its response, and
+    the log includes all of them, including any made while streaming the body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        install_hooks()
+        stats = RpcStats()
+        _LOCAL.stats = stats
+
+        def stats_start_response(status, headers, exc_info=None):
+            """Adds the stats header for admins and in development."""
+            if _should_add_header():
+                headers = list(headers) + [(HEADER, stats.summary())]
+            return start_response(status, headers, exc_info)
+
+        app_iter = self.app(environ, stats_start_response)
+        return self._finish(environ, app_iter, stats)
+
+    @staticmethod
+    def _finish(environ, app_iter, stats):
+        """Yields the body and then logs the request's RPCs."""
+        try:
+            for data in app_iter:
+                yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            logging.info('RPCs for %s %s: %s', environ.get('REQUEST_METHOD'),
+                         environ.get('PATH_INFO'), stats.summary())
+            if get_current_stats() is stats:
+                _LOCAL.stats = None
@@ -0,0 +1,104 @@
+"""Tests for counting each request's RPCs."""
+
+import unittest
+
+import webapp2
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+from ctc.helpers import rpc_stats
+from ctc.models import user as user_model
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+def datastore_app(_, start_response):
+    user_model.User(email='user@codethechange.org').put()
+    ndb.get_context().clear_cache()
+    ndb.Key(user_model.User, 'missing').get()
+    memcache.get('key')
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return ['body']
+
+
+def batch_app(_, start_response):
+    keys = [ndb.Key(user_model.User, index) for index in range(1, 4)]
+    ndb.put_multi([user_model.User(key=key, email='user@codethechange.org')
+                   for key in keys])
+    user_model.User.query().fetch(keys_only=True)
+    ndb.get_context().clear_cache()
+    # Gets made at the same time are batched into one RPC.
+    ndb.Future.wait_all(
+        [key.get_async(use_memcache=False) for key in keys])
+    memcache.get_multi(['first', 'second'])
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return ['body']
+
+
+def get(app):
+    return webapp2.Request.blank('/').get_response(
+        rpc_stats.RpcStatsMiddleware(app))
+
+
+class RpcStatsTests(testutil.CtcTestCase):
+
+    def test_summary(self):
+        stats = rpc_stats.RpcStats()
+        self.assertEqual(stats.summary(), '')
+        for rpc in ['rpc', 'other rpc', 'another rpc', 'user rpc']:
+            stats.start(rpc)
+        stats.finish('memcache', 'rpc', 3)
+        stats.finish('datastore_v3', 'other rpc', 20)
+        stats.finish('datastore_v3', 'another rpc', 1)
+        stats.finish('user', 'user rpc')
+        # RPCs that an earlier request started aren't counted.
+        stats.finish('datastore_v3', 'earlier rpc', 5)
+        self.assertEqual(
+            rpc_stats.parse_summary(stats.summary()),
+            {'datastore_v3': 2, 'memcache': 1, 'user': 1})
+        self.assertEqual(
+            rpc_stats.parse_summary_keys(stats.summary()),
+            {'datastore_v3': 21, 'memcache': 3})
+        self.assertTrue(stats.summary().startswith('datastore_v3=2/'))
+
+    def test_parse_summary(self):
+        self.assertEqual(rpc_stats.parse_summary(''), {})
+        summary = 'datastore_v3=3/12ms/45keys memcache=2/1ms/9keys user=1/0ms'
+        self.assertEqual(
+            rpc_stats.parse_summary(summary),
+            {'datastore_v3': 3, 'memcache': 2, 'user': 1})
+        self.assertEqual(
+            rpc_stats.parse_summary_keys(summary),
+            {'datastore_v3': 45, 'memcache': 9})
+
+    def test_middleware_counts_rpcs(self):
+        response = get(datastore_app)
+        self.assertEqual(response.body, 'body')
+        counts = rpc_stats.parse_summary(response.headers[rpc_stats.HEADER])
+        self.assertEqual(counts['datastore_v3'], 2)
+        # ndb also checks memcache for the entities.
+        self.assertGreaterEqual(counts['memcache'], 1)
+        self.assertEqual(rpc_stats.get_current_stats(), None)
+
+    def test_middleware_counts_keys(self):
+        summary = get(batch_app).headers[rpc_stats.HEADER]
+        self.assertEqual(rpc_stats.parse_summary(summary)['datastore_v3'], 3)
+        # Three puts, three query results, and three gets.
+        num_keys = rpc_stats.parse_summary_keys(summary)
+        self.assertEqual(num_keys['datastore_v3'], 9)
+        self.assertGreaterEqual(num_keys['memcache'], 2)
+
+    def test_header_only_for_admins_in_production(self):
+        self.testbed.setup_env(
+            SERVER_SOFTWARE='Google App Engine/1.9.0', overwrite=True)
+        self.login()
+        response = get(datastore_app)
+        self.assertNotIn(rpc_stats.HEADER, response.headers)
+        self.login(is_admin=True)
+        response = get(datastore_app)
+        self.assertIn(rpc_stats.HEADER, response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
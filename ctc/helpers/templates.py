@@ -1,18 +1,162 @@
-"""An interface between the server and the templating system."""
+"""An interface between the server and the templating system.
 
+Compiling templates is a large part of the first request to each route on a new
+instance, so templates can be compiled ahead of time into Python modules with
+scripts/compile_templates.py.  The compiled templates are committed so that
+every deploy has them.  If they match the templates in TEMPLATE_PATH and were
+compiled by the running version of Jinja2, they are loaded with a ModuleLoader.
+Otherwise, templates are compiled on demand, and their bytecode is shared
+between instances through memcache.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
 import os
 
+from google.appengine.api import memcache
 import jinja2
 
+from ctc.helpers import assets
+from ctc.helpers import tracing
+
 
 TEMPLATE_PATH = os.path.dirname(os.path.dirname(__file__)) + '/views'
+# Where scripts/compile_templates.py writes the compiled templates.
+COMPILED_TEMPLATE_PATH = (
+    os.path.dirname(os.path.dirname(__file__)) + '/compiled_views')
+# A file in COMPILED_TEMPLATE_PATH with the Jinja2 version that compiled the
+# templates and the hash of each compiled template's source, used to detect
+# templates that changed after they were compiled.
+MANIFEST_NAME = 'manifest.json'
+EXTENSIONS = [
+    'jinja2.ext.autoescape',
+    'ctc.helpers.fragment_cache.FragmentCacheExtension']
+# How long compiled bytecode is kept in memcache.
+BYTECODE_CACHE_SECONDS = 60*60*24
+# Streamed pages are sent in chunks of about this many characters.
+STREAM_CHUNK_SIZE = 8*1024
+# Ends a streamed page that fails to render after its status has been sent.
+STREAM_ERROR_MARKER = (
+    '<p class="alert alert-danger">Sorry, the rest of this page could not be '
+    'loaded.</p>')
+
+
+class MemcacheBytecodeCache(jinja2.BytecodeCache):
+    """Shares compiled template bytecode between instances through memcache.
+
+    Buckets include a checksum of the template source, so changed templates get
+    a new bucket.
+    """
+
+    def load_bytecode(self, bucket):
+        """Loads the bucket's bytecode from memcache if it is there."""
+        bytecode = memcache.get('jinja2_bytecode:' + bucket.key)
+        if bytecode is not None:
+            bucket.bytecode_from_string(bytecode)
+
+    def dump_bytecode(self, bucket):
+        """Saves the bucket's bytecode to memcache."""
+        memcache.set('jinja2_bytecode:' + bucket.key,
+                     bucket.bytecode_to_string(), time=BYTECODE_CACHE_SECONDS)
+
+
+def list_templates():
+    """Returns the names of all templates."""
+    # The compiled templates' ModuleLoader can't list templates, so this always
+    # lists the source templates.
+    return jinja2.FileSystemLoader(TEMPLATE_PATH).list_templates()
+
+
+def load_all_templates():
+    """Loads and compiles every template so later renders don't have to.
+
+    Returns:
+        The number of templates loaded.
+    """
+    template_names = list_templates()
+    for template_name in template_names:
+        JINJA_ENVIRONMENT.get_template(template_name)
+    return len(template_names)
+
+
+def get_template_hashes(template_path=TEMPLATE_PATH):
+    """Returns a dict from each template's name to a hash of its source."""
+    loader = jinja2.FileSystemLoader(template_path)
+    hashes = {}
+    for template_name in loader.list_templates():
+        with open(os.path.join(template_path, template_name)) as template:
+            hashes[template_name] = hashlib.sha1(template.read()).hexdigest()
+    return hashes
+
+
+def load_manifest(compiled_path=COMPILED_TEMPLATE_PATH):
+    """Returns the compiled templates' manifest, or None if there isn't one."""
+    try:
+        with open(os.path.join(compiled_path, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except (IOError, ValueError):
+        return None
+
+
+def compiled_templates_are_current(
+        compiled_path=COMPILED_TEMPLATE_PATH, template_path=TEMPLATE_PATH):
+    """Returns whether compiled_path has every template, compiled from source.
+
+    Compiled templates only work with the version of Jinja2 that compiled them,
+    so they also have to be compiled by the running version.
+    """
+    manifest = load_manifest(compiled_path)
+    return bool(manifest) and (
+        manifest.get('jinja2_version') == jinja2.__version__ and
+        manifest.get('templates') == get_template_hashes(template_path))
+
+
+def make_environment(use_compiled_templates=True,
+                     compiled_path=COMPILED_TEMPLATE_PATH):
+    """Returns a Jinja2 environment for rendering the templates.
+
+    Args:
+        use_compiled_templates: whether to load the compiled templates in
+            compiled_path if they are current.
+        compiled_path: the directory with the compiled templates.
+    """
+    if use_compiled_templates and compiled_templates_are_current(compiled_path):
+        # The manifest shows that every template was compiled.  The
+        # ModuleLoader isn't wrapped in a ChoiceLoader with the source as a
+        # fallback, since ChoiceLoader asks each loader for its source, which a
+        # ModuleLoader can't provide in Jinja2 2.6.
+        loader = jinja2.ModuleLoader(compiled_path)
+    else:
+        loader = jinja2.FileSystemLoader(TEMPLATE_PATH)
+    environment = jinja2.Environment(
+        loader=loader,
+        extensions=EXTENSIONS,
+        autoescape=True,
+        bytecode_cache=MemcacheBytecodeCache())
+    environment.globals['asset_urls'] = assets.asset_urls
+    return environment
+
 
-JINJA_ENVIRONMENT = jinja2.Environment(
-    loader=jinja2.FileSystemLoader(TEMPLATE_PATH),
-    extensions=['jinja2.ext.autoescape'],
-    autoescape=True)
+def compile_templates(compiled_path=COMPILED_TEMPLATE_PATH):
+    """Compiles every template into a Python module in compiled_path.
+
+    This also writes the manifest that make_environment checks.
+    """
+    environment = make_environment(use_compiled_templates=False)
+    environment.compile_templates(compiled_path, zip=None)
+    with open(os.path.join(compiled_path, MANIFEST_NAME), 'w') as manifest:
+        json.dump(
+            {'jinja2_version': jinja2.__version__,
+             'templates': get_template_hashes()},
+            manifest, indent=2, separators=(',', ': '), sort_keys=True)
 
 
+JINJA_ENVIRONMENT = make_environment()
+
+
+@tracing.traced
 def render(template_name, template_values=None):
     """Renders the template with the provided name and values.
 
@@ -25,3 +169,74 @@ def render(template_name, template_values=None):
     """
     template_values = template_values or {}
     return JINJA_ENVIRONMENT.get_template(template_name).render(template_values)
+
+
+def _chunk(pieces, chunk_size):
+    """Joins a template's output into UTF-8 chunks of about chunk_size.
+
+    The chunk with the end of the <head> is sent right away so that browsers
+    can start fetching the page's CSS and JavaScript.
+    """
+    buffered = []
+    buffered_size = 0
+    is_head_sent = False
+    for piece in pieces:
+        buffered.append(piece)
+        buffered_size += len(piece)
+        ends_head = not is_head_sent and '</head>' in piece
+        if ends_head or buffered_size >= chunk_size:
+            is_head_sent = is_head_sent or ends_head
+            yield u''.join(buffered).encode('utf-8')
+            buffered = []
+            buffered_size = 0
+    if buffered:
+        yield u''.join(buffered).encode('utf-8')
+
+
+def _traced_chunks(chunks):
+    """Yields the chunks in a span, which includes the time to send them."""
+    with tracing.span('templates.stream'):
+        for chunk in chunks:
+            yield chunk
+
+
+def _end_on_error(chunks, template_name):
+    """Yields the chunks, ending with STREAM_ERROR_MARKER if rendering fails.
+
+    By now, the response's status and first chunk have been sent, so the
+    error can't become a 500.  It is logged instead, and the page ends with a
+    message rather than being silently cut off.
+    """
+    try:
+        for chunk in chunks:
+            yield chunk
+    # Any error in a template ends the page, so pylint: disable=W0703
+    except Exception:
+        logging.exception('Error while streaming %s', template_name)
+        yield STREAM_ERROR_MARKER
+
+
+def stream(template_name, template_values=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Renders the template as it is read, in chunks for a response body.
+
+    The first chunk (which ends with the <head>) is rendered right away, so
+    errors in it fail the request like any other handler error.  The rest is
+    rendered after the handler returns, so its values can't depend on anything
+    that only exists during the handler (eg, uri_for).  Errors in the rest are
+    logged and end the page with STREAM_ERROR_MARKER.
+
+    Args:
+      template_name: a string with the filename of the Jinja2 template.
+      template_values: a dict with the values to be used in the template.
+      chunk_size: about how many characters to render per chunk.
+
+    Returns:
+      An iterator of UTF-8 encoded strings with the rendered template.
+    """
+    template_values = template_values or {}
+    # The template is loaded now so that a missing template fails the request.
+    template = JINJA_ENVIRONMENT.get_template(template_name)
+    chunks = _chunk(template.generate(template_values), chunk_size)
+    first_chunks = list(itertools.islice(chunks, 1))
+    return itertools.chain(
+        first_chunks, _traced_chunks(_end_on_error(chunks, template_name)))
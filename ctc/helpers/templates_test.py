@@ -0,0 +1,126 @@
+"""Tests for the templates helper."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import jinja2
+import mock
+
+from google.appengine.api import memcache
+
+from ctc.helpers import templates
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+# Tests can test protected members, so pylint: disable=W0212
+class TemplatesTests(testutil.CtcTestCase):
+
+    def setUp(self):
+        super(TemplatesTests, self).setUp()
+        self.compiled_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.compiled_path)
+        super(TemplatesTests, self).tearDown()
+
+    def test_render(self):
+        self.assertIn('Code the Change', templates.render('main.html'))
+
+    def test_stream(self):
+        values = {'projects_and_links': [], 'memberships': {}}
+        chunks = list(templates.stream('list_projects.html', values))
+        self.assertEqual(''.join(chunks).decode('utf-8'),
+                         templates.render('list_projects.html', values))
+        # The head is sent on its own.
+        self.assertIn('</head>', chunks[0])
+        self.assertNotIn('main-content', chunks[0])
+
+    def test_stream_errors(self):
+        def fail():
+            raise ValueError('broken')
+        page = templates.JINJA_ENVIRONMENT.from_string(
+            '{% if head %}{{ fail() }}{% endif %}<head></head>{{ fail() }}')
+        with mock.patch.object(templates.JINJA_ENVIRONMENT, 'get_template',
+                               return_value=page):
+            # Errors in the first chunk are raised before anything is sent.
+            with self.assertRaises(ValueError):
+                templates.stream('page.html', {'head': True, 'fail': fail})
+            # Later errors are logged and end the page.
+            with mock.patch.object(templates.logging, 'exception') as log:
+                chunks = list(templates.stream('page.html', {'fail': fail}))
+        self.assertEqual(chunks,
+                         ['<head></head>', templates.STREAM_ERROR_MARKER])
+        self.assertTrue(log.called)
+
+    def test_stream_chunks(self):
+        pieces = [u'<head></head>', u'a' * 5, u'b' * 5, u'\xe9']
+        self.assertEqual(list(templates._chunk(pieces, 8)),
+                         ['<head></head>', 'a' * 5 + 'b' * 5, '\xc3\xa9'])
+
+    def test_load_all_templates(self):
+        template_names = templates.list_templates()
+        self.assertIn('main.html', template_names)
+        self.assertEqual(templates.load_all_templates(), len(template_names))
+
+    def test_compiled_templates(self):
+        self.assertFalse(
+            templates.compiled_templates_are_current(self.compiled_path))
+        templates.compile_templates(self.compiled_path)
+        self.assertTrue(
+            templates.compiled_templates_are_current(self.compiled_path))
+        environment = templates.make_environment(
+            compiled_path=self.compiled_path)
+        self.assertIsInstance(environment.loader, jinja2.ModuleLoader)
+        compiled_page = environment.get_template('main.html').render()
+        self.assertEqual(compiled_page, templates.render('main.html'))
+        # Templates that extend others and use extensions load too.
+        values = {'projects_and_links': [], 'memberships': {}}
+        compiled_page = environment.get_template(
+            'list_projects.html').render(values)
+        self.assertEqual(compiled_page,
+                         templates.render('list_projects.html', values))
+
+    def test_stale_compiled_templates_are_ignored(self):
+        templates.compile_templates(self.compiled_path)
+        manifest_path = os.path.join(
+            self.compiled_path, templates.MANIFEST_NAME)
+        with open(manifest_path) as manifest:
+            compiled = json.load(manifest)
+        compiled['templates']['main.html'] = 'stale'
+        with open(manifest_path, 'w') as manifest:
+            json.dump(compiled, manifest)
+        environment = templates.make_environment(
+            compiled_path=self.compiled_path)
+        self.assertIsInstance(environment.loader, jinja2.FileSystemLoader)
+
+    def test_templates_compiled_by_another_jinja2_are_ignored(self):
+        templates.compile_templates(self.compiled_path)
+        with mock.patch.object(jinja2, '__version__', '0.1'):
+            self.assertFalse(
+                templates.compiled_templates_are_current(self.compiled_path))
+
+    def test_committed_templates_are_current(self):
+        # Deploys use the committed compiled templates, so they have to be
+        # recompiled whenever a template changes.
+        manifest = templates.load_manifest()
+        self.assertIsNotNone(manifest, 'Run scripts/compile_templates.py')
+        self.assertEqual(manifest['templates'], templates.get_template_hashes(),
+                         'Run scripts/compile_templates.py')
+
+    def test_bytecode_is_cached_in_memcache(self):
+        environment = templates.make_environment(use_compiled_templates=False)
+        environment.get_template('csrf.html')
+        self.assertGreater(memcache.get_stats()['items'], 0)
+        # Another instance loads the bytecode rather than compiling.
+        environment = templates.make_environment(use_compiled_templates=False)
+        hits = memcache.get_stats()['hits']
+        environment.get_template('csrf.html')
+        self.assertGreater(memcache.get_stats()['hits'], hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+"""Trace spans for each request, with a log of the slow requests' spans.
+
+Model functions and template rendering are decorated with @traced, and any
+block of code can be timed with:
+    with tracing.span('name'):
+        ...
+While TracingMiddleware handles a request, each traced call becomes a span
+under the span that was running when it was called, so each request builds a
+tree of spans.  A traced function that returns a future (eg, a tasklet) is
+timed until its future is done.  Code that a tasklet runs after its first yield
+runs from the event loop, so its spans go under whichever span is running then.
+
+If a request takes longer than the middleware's threshold, its span tree is
+logged as one line of JSON, eg:
+    Slow request: {"method": "GET", "ms": 812.4, "path": "/dashboard",
+        "rpcs": "datastore_v3=3/601ms", "spans": {"name": "request", ...}}
+Sibling spans with the same name are combined into one with the number of
+calls, so a fan-out of many small calls shows up as one span with many calls.
+Tracing does nothing outside of a request, so scripts and tests don't need it.
+"""
+
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+from ctc.helpers import rpc_stats
+
+
+# Requests that take longer than this have their spans logged.
+SLOW_REQUEST_MS = 500
+
+_LOCAL = threading.local()
+
+
+class Span(object):
+    """A named, timed part of a request, and the spans within it."""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.start_time = time.time()
+        self.end_time = None
+        self.children = []
+        if parent:
+            parent.children.append(self)
+
+    def finish(self, *_):
+        """Records that the span finished.  Ignores any arguments (futures)."""
+        if self.end_time is None:
+            self.end_time = time.time()
+
+    def get_ms(self):
+        """Returns how long the span took in ms, or None if it isn't done."""
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+
+class Trace(object):
+    """The spans for one request."""
+
+    def __init__(self):
+        self.root = Span('request')
+        # The spans that are running, innermost last.
+        self.stack = [self.root]
+
+    def start_span(self, name):
+        """Starts a span under the innermost running span and returns it."""
+        new_span = Span(name, self.stack[-1])
+        self.stack.append(new_span)
+        return new_span
+
+    def end_span(self, ended_span):
+        """Stops the span from being the parent of new spans."""
+        if ended_span in self.stack:
+            self.stack.remove(ended_span)
+
+
+def get_current_trace():
+    """Returns the Trace for the current request, or None."""
+    return getattr(_LOCAL, 'trace', None)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Returns a context manager that times its block as a span."""
+    trace = get_current_trace()
+    if not trace:
+        yield None
+        return
+    block_span = trace.start_span(name)
+    try:
+        yield block_span
+    finally:
+        trace.end_span(block_span)
+        block_span.finish()
+
+
+def traced(function):
+    """Decorates a function so that each call is a span of the request.
+
+    The span is named after the function's module and name, eg,
+    'project.get_by_owner_async'.
+    """
+    name = '%s.%s' % (function.__module__.rsplit('.', 1)[-1], function.__name__)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        """Calls the function in a span."""
+        trace = get_current_trace()
+        if not trace:
+            return function(*args, **kwargs)
+        function_span = trace.start_span(name)
+        result = None
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            trace.end_span(function_span)
+            # Futures are duck typed so that this doesn't need to import ndb.
+            if (hasattr(result, 'add_immediate_callback') and
+                    not result.done()):
+                result.add_immediate_callback(function_span.finish)
+            else:
+                function_span.finish()
+        return result
+
+    return wrapper
+
+
+def summarize_spans(spans):
+    """Returns a dict for spans with the same name and their children.
+
+    The dict has the spans' name, their total time in ms, the number of calls
+    if there are more than one, the number of unfinished spans if any, and
+    their children, with same-named children combined.
+    """
+    finished_ms = [span_ms for span_ms in (each.get_ms() for each in spans)
+                   if span_ms is not None]
+    summary = {'name': spans[0].name, 'ms': round(sum(finished_ms), 1)}
+    if len(spans) > 1:
+        summary['calls'] = len(spans)
+    if len(finished_ms) < len(spans):
+        summary['unfinished'] = len(spans) - len(finished_ms)
+    children_by_name = collections.OrderedDict()
+    for parent in spans:
+        for child in parent.children:
+            children_by_name.setdefault(child.name, []).append(child)
+    if children_by_name:
+        summary['children'] = [summarize_spans(children)
+                               for children in children_by_name.values()]
+    return summary
+
+
+class TracingMiddleware(object):
+    """Traces each request and logs the span trees of slow requests."""
+
+    def __init__(self, app, threshold_ms=SLOW_REQUEST_MS):
+        """Initializes the middleware.
+
+        Args:
+            app: the WSGI app to trace.
+            threshold_ms: requests that take longer than this are logged.
+        """
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, environ, start_response):
+        trace = Trace()
+        _LOCAL.trace = trace
+        app_iter = self.app(environ, start_response)
+        return self._finish(environ, app_iter, trace)
+
+    def _finish(self, environ, app_iter, trace):
+        """Yields the body and then logs the trace if the request was slow."""
+        try:
+            for data in app_iter:
+                yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            trace.root.finish()
+            if get_current_trace() is trace:
+                _LOCAL.trace = None
+            if trace.root.get_ms() > self.threshold_ms:
+                self._log(environ, trace)
+
+    @staticmethod
+    def _log(environ, trace):
+        """Logs the request's spans as one line of JSON."""
+        # Only slow requests need json, so new instances don't import it.
+        import json
+        stats = rpc_stats.get_current_stats()
+        record = {
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'ms': round(trace.root.get_ms(), 1),
+            'rpcs': stats.summary() if stats else None,
+            'spans': summarize_spans([trace.root]),
+        }
+        logging.warning('Slow request: %s', json.dumps(record, sort_keys=True))
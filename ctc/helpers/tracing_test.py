@@ -0,0 +1,120 @@
+"""Tests for request tracing."""
+
+import json
+import unittest
+
+import mock
+
+from google.appengine.ext import ndb
+
+from ctc.helpers import tracing
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+@tracing.traced
+def inner():
+    return 'inner'
+
+
+@tracing.traced
+def outer(num_calls):
+    with tracing.span('block'):
+        return [inner() for _ in range(num_calls)]
+
+
+@tracing.traced
+@ndb.tasklet
+def tasklet():
+    yield ndb.sleep(0.01)
+    raise ndb.Return('done')
+
+
+@tracing.traced
+def fails():
+    raise ValueError()
+
+
+def make_app(handle):
+    def app(_, start_response):
+        handle()
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return ['body']
+    return app
+
+
+def call(app):
+    return ''.join(app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/path'},
+                       lambda status, headers, exc_info=None: None))
+
+
+class TracingTests(testutil.CtcTestCase):
+
+    def test_untraced_outside_of_requests(self):
+        self.assertIsNone(tracing.get_current_trace())
+        self.assertEqual(outer(2), ['inner', 'inner'])
+
+    def test_span_tree(self):
+        trace = tracing.Trace()
+        with mock.patch.object(tracing, 'get_current_trace',
+                               return_value=trace):
+            outer(3)
+            inner()
+        trace.root.finish()
+        summary = tracing.summarize_spans([trace.root])
+        self.assertEqual(summary['name'], 'request')
+        outer_summary, inner_summary = summary['children']
+        self.assertEqual(outer_summary['name'], 'tracing_test.outer')
+        self.assertNotIn('calls', outer_summary)
+        block_summary = outer_summary['children'][0]
+        self.assertEqual(block_summary['name'], 'block')
+        self.assertEqual(block_summary['children'][0]['calls'], 3)
+        self.assertEqual(inner_summary['name'], 'tracing_test.inner')
+        self.assertEqual(trace.stack, [trace.root])
+
+    def test_future_spans_last_until_done(self):
+        trace = tracing.Trace()
+        with mock.patch.object(tracing, 'get_current_trace',
+                               return_value=trace):
+            future = tasklet()
+            tasklet_span = trace.root.children[0]
+            self.assertIsNone(tasklet_span.get_ms())
+            self.assertEqual(trace.stack, [trace.root])
+            self.assertEqual(future.get_result(), 'done')
+        self.assertGreaterEqual(tasklet_span.get_ms(), 10)
+
+    def test_failed_spans_finish(self):
+        trace = tracing.Trace()
+        with mock.patch.object(tracing, 'get_current_trace',
+                               return_value=trace):
+            self.assertRaises(ValueError, fails)
+        self.assertIsNotNone(trace.root.children[0].get_ms())
+        self.assertEqual(trace.stack, [trace.root])
+
+    def test_unfinished_spans(self):
+        root = tracing.Span('request')
+        tracing.Span('pending', root)
+        summary = tracing.summarize_spans([root])
+        self.assertEqual(summary['children'][0]['unfinished'], 1)
+
+    @mock.patch.object(tracing.logging, 'warning')
+    def test_logs_slow_requests(self, mock_warning):
+        app = tracing.TracingMiddleware(
+            make_app(lambda: outer(2)), threshold_ms=-1)
+        self.assertEqual(call(app), 'body')
+        self.assertEqual(mock_warning.call_count, 1)
+        record = json.loads(mock_warning.call_args[0][1])
+        self.assertEqual(record['path'], '/path')
+        self.assertEqual(record['spans']['children'][0]['name'],
+                         'tracing_test.outer')
+        self.assertIsNone(tracing.get_current_trace())
+
+    @mock.patch.object(tracing.logging, 'warning')
+    def test_fast_requests_not_logged(self, mock_warning):
+        app = tracing.TracingMiddleware(make_app(lambda: outer(2)))
+        call(app)
+        self.assertFalse(mock_warning.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,50 +1,304 @@
 """A model for the relationship between a user and a project."""
+from google.appengine.api import memcache
 from google.appengine.ext import ndb
 
+from ctc.helpers import tracing
+from ctc.models import project as project_model
 from ctc.models import user as user_model
 
 
+# The id of each project's CollaboratorCount.
+COUNT_ID = 'count'
+# How long a collaborator count may be served from memcache.
+COUNT_CACHE_SECONDS = 60 * 10
+# After a count changes, how long to stop readers from re-caching the count so
+# that a reader that read the count before the change can't cache a stale value.
+COUNT_CACHE_LOCK_SECONDS = 5
+
+
+# The number of collaborators to update per batch in migrations.
+MIGRATION_BATCH_SIZE = 100
+
+
 class Collaborator(ndb.Model):
     """A model for relationship between a user and a project."""
     user_key = ndb.KeyProperty(required=True, kind=user_model.User)
     created_date = ndb.DateTimeProperty(required=True, auto_now_add=True)
+    # Copied from the user so that listing a project's collaborators doesn't
+    # need a get per user.  Kept in sync by update_collaborator_profiles.
+    email = ndb.StringProperty()
+    name = ndb.StringProperty()
 
     def _pre_put_hook(self):
         """Raises an exception if a new collaborator does not have a parent."""
         assert self.key.parent(), "No parent project for this collaborator."
 
+    def copy_profile(self, user):
+        """Copies the user's profile fields, returning whether any changed."""
+        if self.email == user.email and self.name == user.name:
+            return False
+        self.email = user.email
+        self.name = user.name
+        return True
+
+
+class CollaboratorCount(ndb.Model):
+    """The number of collaborators on a project.
+
+    The count is a child of its project, keyed by COUNT_ID, so it is in the
+    same entity group as the project's Collaborators.  Every join or leave
+    writes a Collaborator in that group anyway, so a join and the count update
+    are one single-group write.
+    """
+    count = ndb.IntegerProperty(required=True, default=0, indexed=False)
+
+
+def _collaborator_key(user_key, project_key):
+    """Returns the key of the user's Collaborator for the project.
+
+    Collaborators are keyed by their user's id under their project, so a user
+    can only collaborate once on each project.
+    """
+    return ndb.Key(Collaborator, user_key.id(), parent=project_key)
+
+
+def _count_key(project_key):
+    """Returns the key of the project's CollaboratorCount."""
+    return ndb.Key(CollaboratorCount, COUNT_ID, parent=project_key)
+
+
+def _count_cache_key(project_key):
+    """Returns the memcache key for the project's collaborator count."""
+    return 'collaborator_count:%s' % project_key.id()
+
+
+def _invalidate_count(project_key):
+    """Removes the cached count once the current transaction commits."""
+    def invalidate():
+        """Deletes the count and briefly locks it against stale re-adds."""
+        memcache.delete(
+            _count_cache_key(project_key), seconds=COUNT_CACHE_LOCK_SECONDS)
+    ndb.get_context().call_on_commit(invalidate)
+
+
+def _update_count(project_key, delta):
+    """Adds delta to the project's count.  Must be run in a transaction."""
+    count_key = _count_key(project_key)
+    collaborator_count = count_key.get() or CollaboratorCount(key=count_key)
+    collaborator_count.count += delta
+    collaborator_count.put()
+    _invalidate_count(project_key)
+
+
+# The user is in another entity group, so this needs an XG transaction.
+@ndb.transactional(xg=True)
+def add_collaborator(user_key, project_key):
+    """Makes the user a collaborator on the project and updates the count.
+
+    This does nothing if the user is already collaborating on the project.
+
+    Returns:
+        The user's Collaborator for the project.
+    """
+    collaborator_key = _collaborator_key(user_key, project_key)
+    collaborator = collaborator_key.get()
+    if not collaborator:
+        collaborator = Collaborator(key=collaborator_key, user_key=user_key)
+        collaborator.copy_profile(user_key.get())
+        collaborator.put()
+        _update_count(project_key, 1)
+    return collaborator
+
+
+@ndb.transactional
+def remove_collaborator(user_key, project_key):
+    """Removes the user from the project, if present, and updates the count."""
+    collaborator = get_collaborator(user_key, project_key)
+    if collaborator:
+        collaborator.key.delete()
+        _update_count(project_key, -1)
+
+
+def update_collaborator_profiles(user):
+    """Copies the user's email and name onto all of their Collaborators.
+
+    Returns:
+        The keys of the projects whose Collaborators changed.
+    """
+    query = Collaborator.query(Collaborator.user_key == user.key)
+    changed_collaborators = [collaborator for collaborator in query.fetch()
+                             if collaborator.copy_profile(user)]
+    ndb.put_multi(changed_collaborators)
+    return [collaborator.key.parent() for collaborator in changed_collaborators]
+
+
+def migrate_collaborator_profiles(batch_size=MIGRATION_BATCH_SIZE):
+    """Copies users' emails and names onto all existing Collaborators.
+
+    This pages through every Collaborator with one batch get of users and one
+    batch put per page.  It is meant to be run once from the remote API shell
+    or interactive console, and it is safe to run again.
+
+    Returns:
+        The number of collaborators that were updated.
+    """
+    num_updated = 0
+    cursor = None
+    more = True
+    while more:
+        collaborators, cursor, more = Collaborator.query().fetch_page(
+            batch_size, start_cursor=cursor)
+        collaborating_users = ndb.get_multi(
+            [collaborator.user_key for collaborator in collaborators])
+        changed = [
+            collaborator for collaborator, user
+            in zip(collaborators, collaborating_users)
+            if user and collaborator.copy_profile(user)]
+        ndb.put_multi(changed)
+        num_updated += len(changed)
+    return num_updated
+
+
+@ndb.transactional
+def repair_collaborator_count(project_key):
+    """Recomputes the project's count from its Collaborator entities.
+
+    The ancestor query runs inside the transaction, so a concurrent join or
+    leave either lands before the recount or retries after it.
+
+    Returns:
+        The repaired count.
+    """
+    count = Collaborator.query(ancestor=project_key).count()
+    CollaboratorCount(key=_count_key(project_key), count=count).put()
+    _invalidate_count(project_key)
+    return count
+
+
+def backfill_collaborator_counts(project_keys):
+    """Repairs the collaborator counts for every provided project.
+
+    This is meant to be run from the remote API shell or interactive console,
+    for example with Project.query().iter(keys_only=True).
+
+    Args:
+        project_keys: an iterable of Project keys.
+
+    Returns:
+        The number of projects that were repaired.
+    """
+    num_repaired = 0
+    for project_key in project_keys:
+        repair_collaborator_count(project_key)
+        num_repaired += 1
+    return num_repaired
+
+
+@tracing.traced
+def get_collaborator_async(user_key, project_key):
+    """Returns a future for the user's collaboration on the project, or None."""
+    return _collaborator_key(user_key, project_key).get_async()
+
 
 def get_collaborator(user_key, project_key):
     """Returns a collaboration if the user is collaborating on the project."""
-    query = Collaborator.query(ancestor=project_key).filter(
-        Collaborator.user_key == user_key)
-    collaborator = query.fetch(limit=1)
-    return collaborator[0] if collaborator else None
+    return get_collaborator_async(user_key, project_key).get_result()
 
 
-def get_projects(user_key):
-    """Returns a list of all projects that the user is contributing to."""
+@tracing.traced
+@ndb.tasklet
+def get_memberships_async(user_key, project_keys):
+    """Returns a future for whether the user collaborates on each project.
+
+    This is a single batch get, no matter how many projects there are.
+
+    Args:
+        user_key: the user's key, or None if the user is not logged in.
+        project_keys: a list of project keys.
+
+    Returns:
+        A future for a dict from each project key to True if the user is
+        collaborating on that project and False otherwise.
+    """
+    if not user_key:
+        raise ndb.Return(dict.fromkeys(project_keys, False))
+    collaborators = yield ndb.get_multi_async(
+        [_collaborator_key(user_key, project_key)
+         for project_key in project_keys])
+    raise ndb.Return(dict(
+        (project_key, collaborator is not None)
+        for project_key, collaborator in zip(project_keys, collaborators)))
+
+
+def get_memberships(user_key, project_keys):
+    """Returns a dict from each project key to whether the user collaborates."""
+    return get_memberships_async(user_key, project_keys).get_result()
+
+
+@tracing.traced
+@ndb.tasklet
+def get_projects_async(user_key):
+    """Returns a future for summaries of the projects the user contributes to.
+
+    This only needs the keys of the user's collaborations, since their parents
+    are the projects, so it uses a keys-only query and one batch get.
+    """
     query = Collaborator.query(Collaborator.user_key == user_key)
     query = query.order(-Collaborator.created_date)
-    collaborators = query.fetch()
-    futures = [collaborator.key.parent().get_async()
-               for collaborator in collaborators]
-    ndb.Future.wait_all(futures)
-    return [future.get_result() for future in futures]
+    collaborator_keys = yield query.fetch_async(keys_only=True)
+    summaries = yield ndb.get_multi_async(
+        [ndb.Key(project_model.ProjectSummary, collaborator_key.parent().id())
+         for collaborator_key in collaborator_keys])
+    # Skip projects that have been deleted.
+    raise ndb.Return([summary for summary in summaries if summary])
+
+
+def get_projects(user_key):
+    """Returns ProjectSummaries of all projects that the user contributes to."""
+    return get_projects_async(user_key).get_result()
+
+
+@tracing.traced
+@ndb.tasklet
+def get_collaborator_count_async(project_key):
+    """Returns a future for the number of collaborators on a given project.
+
+    The count is a single get of the project's CollaboratorCount, cached in
+    memcache.
+    """
+    context = ndb.get_context()
+    cache_key = _count_cache_key(project_key)
+    count = yield context.memcache_get(cache_key)
+    if count is None:
+        collaborator_count = yield _count_key(project_key).get_async()
+        count = collaborator_count.count if collaborator_count else 0
+        # Use add rather than set so that a recently-invalidated count stays
+        # locked.
+        yield context.memcache_add(cache_key, count, time=COUNT_CACHE_SECONDS)
+    raise ndb.Return(count)
 
 
 def get_collaborator_count(project_key):
     """Counts the number of collaborators for a given project."""
+    return get_collaborator_count_async(project_key).get_result()
+
+
+@tracing.traced
+@ndb.tasklet
+def get_collaborator_emails_async(project_key):
+    """Returns a future for the emails of all collaborating users.
+
+    This is one projection query on the emails copied onto the Collaborators.
+    """
     query = Collaborator.query(ancestor=project_key)
-    return query.count()
+    query = query.order(Collaborator.created_date)
+    collaborators = yield query.fetch_async(projection=[Collaborator.email])
+    # Collaborators that migrate_collaborator_profiles hasn't reached yet have
+    # no email.
+    raise ndb.Return([collaborator.email for collaborator in collaborators
+                      if collaborator.email])
 
 
 def get_collaborator_emails(project_key):
     """Returns the emails of all collaborating users."""
-    query = Collaborator.query(ancestor=project_key)
-    query = query.order(Collaborator.created_date)
-    collaborators = query.fetch()
-    futures = [collaborator.user_key.get_async()
-               for collaborator in collaborators]
-    ndb.Future.wait_all(futures)
-    return [future.get_result().email for future in futures]
+    return get_collaborator_emails_async(project_key).get_result()
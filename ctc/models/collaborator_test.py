@@ -3,6 +3,7 @@
 import unittest
 
 from ctc.models import collaborator as collaborator_model
+from ctc.models import project as project_model
 from ctc.models import user as user_model
 from ctc.testing import model_helpers
 from ctc.testing import testutil
@@ -17,10 +18,13 @@ class CollaboratorTests(testutil.CtcTestCase):
         self.another_user_key = user_model.User(
             email='another@codethechange.org').put()
         self.project = model_helpers.create_project(owner_key=self.user_key)
+        # Collaborators are keyed by their user's id.
         self.collaborator = collaborator_model.Collaborator(
-            user_key=self.user_key, parent=self.project.key)
+            id=self.user_key.id(), user_key=self.user_key,
+            parent=self.project.key)
         self.another_collaborator = collaborator_model.Collaborator(
-            user_key=self.another_user_key, parent=self.project.key)
+            id=self.another_user_key.id(), user_key=self.another_user_key,
+            parent=self.project.key)
 
     def test_get_collaborator(self):
         self.assertEqual(collaborator_model.get_collaborator(
@@ -31,30 +35,136 @@ class CollaboratorTests(testutil.CtcTestCase):
                 self.user_key, self.project.key),
             self.collaborator)
 
+    def test_get_memberships(self):
+        other_project = model_helpers.create_project(owner_key=self.user_key)
+        project_keys = [self.project.key, other_project.key]
+        self.assertEqual(
+            collaborator_model.get_memberships(None, project_keys),
+            {self.project.key: False, other_project.key: False})
+        self.collaborator.put()
+        self.assertEqual(
+            collaborator_model.get_memberships(self.user_key, project_keys),
+            {self.project.key: True, other_project.key: False})
+        self.assertEqual(
+            collaborator_model.get_memberships(self.user_key, []), {})
+
     def test_get_projects(self):
         self.assertEqual(collaborator_model.get_projects(self.user_key), [])
         self.collaborator.put()
         self.assertEqual(
-            collaborator_model.get_projects(self.user_key), [self.project])
+            [summary.project_key
+             for summary in collaborator_model.get_projects(self.user_key)],
+            [self.project.key])
+
+    def test_get_projects_async(self):
+        other_project = model_helpers.create_project(owner_key=self.user_key)
+        collaborator_model.add_collaborator(self.user_key, self.project.key)
+        collaborator_model.add_collaborator(self.user_key, other_project.key)
+        future = collaborator_model.get_projects_async(self.user_key)
+        # Ordered by most recently joined.
+        self.assertEqual(
+            [summary.project_key for summary in future.get_result()],
+            [other_project.key, self.project.key])
+        # Deleted projects are skipped.
+        project_model.delete_project(other_project.key)
+        self.assertEqual(
+            [summary.project_key
+             for summary in collaborator_model.get_projects(self.user_key)],
+            [self.project.key])
 
     def test_get_emails(self):
+        collaborator_model.add_collaborator(self.user_key, self.project.key)
+        collaborator_model.add_collaborator(
+            self.another_user_key, self.project.key)
+        self.assertEqual(
+            collaborator_model.get_collaborator_emails(self.project.key),
+            ['user@codethechange.org', 'another@codethechange.org'])
+
+    def test_update_collaborator_profiles(self):
+        collaborator = collaborator_model.add_collaborator(
+            self.user_key, self.project.key)
+        self.assertEqual(collaborator.email, 'user@codethechange.org')
+        self.assertEqual(collaborator.name, '')
+        user = self.user_key.get()
+        user.name = 'New Name'
+        user.put()
+        self.assertEqual(
+            collaborator_model.update_collaborator_profiles(user),
+            [self.project.key])
+        self.assertEqual(collaborator.key.get().name, 'New Name')
+        # Nothing changes if the profile is already up to date.
+        self.assertEqual(
+            collaborator_model.update_collaborator_profiles(user), [])
+
+    def test_migrate_collaborator_profiles(self):
+        # Collaborators from before profiles were copied have no email.
         self.collaborator.put()
         self.another_collaborator.put()
+        self.assertEqual(
+            collaborator_model.get_collaborator_emails(self.project.key), [])
+        self.assertEqual(
+            collaborator_model.migrate_collaborator_profiles(batch_size=1), 2)
         self.assertEqual(
             collaborator_model.get_collaborator_emails(self.project.key),
             ['user@codethechange.org', 'another@codethechange.org'])
+        # Running it again doesn't change anything.
+        self.assertEqual(
+            collaborator_model.migrate_collaborator_profiles(), 0)
 
     def test_get_collaborator_count(self):
-        self.collaborator.put()
-        self.another_collaborator.put()
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 0)
+        collaborator_model.add_collaborator(self.user_key, self.project.key)
+        collaborator_model.add_collaborator(
+            self.another_user_key, self.project.key)
         self.assertEqual(
             collaborator_model.get_collaborator_count(self.project.key),
             2)
-        self.another_collaborator.key.delete()
+        # The count is kept with the project's Collaborators.
+        self.assertEqual(
+            collaborator_model.CollaboratorCount.query(
+                ancestor=self.project.key).count(),
+            1)
+        collaborator_model.remove_collaborator(
+            self.another_user_key, self.project.key)
         self.assertEqual(
             collaborator_model.get_collaborator_count(self.project.key),
             1)
 
+    def test_add_and_remove_collaborator(self):
+        collaborator = collaborator_model.add_collaborator(
+            self.user_key, self.project.key)
+        self.assertEqual(collaborator.key.id(), self.user_key.id())
+        self.assertEqual(collaborator.key.parent(), self.project.key)
+        # Adding the same user again shouldn't change the count.
+        collaborator_model.add_collaborator(self.user_key, self.project.key)
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 1)
+        collaborator_model.remove_collaborator(self.user_key, self.project.key)
+        self.assertIsNone(collaborator_model.get_collaborator(
+            self.user_key, self.project.key))
+        # Removing a user who isn't collaborating shouldn't change the count.
+        collaborator_model.remove_collaborator(self.user_key, self.project.key)
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 0)
+
+    def test_repair_collaborator_count(self):
+        # Collaborators put directly bypass the counter.
+        self.collaborator.put()
+        self.another_collaborator.put()
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 0)
+        self.assertEqual(
+            collaborator_model.backfill_collaborator_counts([self.project.key]),
+            1)
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 2)
+        # Repairing is idempotent.
+        self.assertEqual(
+            collaborator_model.repair_collaborator_count(self.project.key), 2)
+        self.assertEqual(
+            collaborator_model.get_collaborator_count(self.project.key), 2)
+
     def test_put_collaborator_requires_parent(self):
         bad_collaborator = collaborator_model.Collaborator(
             user_key=self.user_key)
@@ -1,15 +1,29 @@
 """A model for one project."""
 
+from google.appengine.datastore import datastore_query
 from google.appengine.ext import ndb
+from ctc.helpers import tracing
+from ctc.models import search
 from ctc.models import user as user_model
 
 
 SETTABLE_FIELDS = [
     'name', 'overview', 'organization_name', 'organization_contact',
     'organization_mission', 'details', 'collaboration_link', 'code_link']
+# The number of projects shown on one page of the projects list.
+PAGE_SIZE = 20
+# The number of characters of a project's overview kept in its summary.
+SUMMARY_OVERVIEW_LENGTH = 300
+# The number of projects per batch in backfill_summaries and
+# backfill_search_index.
+BACKFILL_BATCH_SIZE = 100
 
 class Project(ndb.Model):
-    """A model for one project."""
+    """A model for one project.
+
+    Projects are deleted with delete_project_async, which also deletes their
+    summaries and search index.
+    """
     # TODO(samking): String and text properties means that they have to be
     # defined, but they can still be the empty string.  We probably want to
     # require that there is actual text.  We might want to use a pre-put-hook
@@ -50,9 +64,225 @@ class Project(ndb.Model):
             setattr(self, field, request.get(field))
         return self
 
+    @ndb.tasklet
+    def _put_async(self, **ctx_options):
+        """Puts the project with its summary and search index.
+
+        They are written alongside the project rather than from a post-put
+        hook, since synchronous writes in a hook nest in the event loop and
+        overflow the stack when many projects are put at once.  A new project's
+        summary and index are written once the project has an id.
+        """
+        is_new = not (self.key and self.key.id())
+        # The super call prepares the project (eg, sets updated_date) before
+        # it returns, so the summary sees the values that are saved.
+        project_future = super(Project, self)._put_async(**ctx_options)
+        if is_new:
+            project_key = yield project_future
+            yield (ProjectSummary.from_project(self).put_async(**ctx_options),
+                   search.index_project_async(self, is_new=True))
+        else:
+            project_key, _, _ = yield (
+                project_future,
+                ProjectSummary.from_project(self).put_async(**ctx_options),
+                search.index_project_async(self))
+        raise ndb.Return(project_key)
+    # ndb.Model binds put_async to its own _put_async, and put_multi calls
+    # put_async.
+    put_async = _put_async
+
+
+class ProjectSummary(ndb.Model):
+    """The parts of a project that are shown in lists of projects.
+
+    Lists load summaries rather than Projects so that they don't fetch and
+    decode every project's large text fields.  A summary has the same id as its
+    project and is rewritten whenever the project is put.
+    """
+    name = ndb.StringProperty(required=True)
+    # Truncated to SUMMARY_OVERVIEW_LENGTH characters.
+    overview = ndb.TextProperty(required=True)
+    organization_name = ndb.StringProperty(required=True)
+    collaboration_link = ndb.TextProperty()
+    code_link = ndb.TextProperty()
+    updated_date = ndb.DateTimeProperty(required=True)
+    owner_key = ndb.KeyProperty(required=True, kind=user_model.User)
+
+    @classmethod
+    def from_project(cls, project):
+        """Returns a new summary of the project with the project's id."""
+        overview = project.overview
+        if len(overview) > SUMMARY_OVERVIEW_LENGTH:
+            overview = overview[:SUMMARY_OVERVIEW_LENGTH].rstrip() + '...'
+        return cls(
+            id=project.key.id(), name=project.name, overview=overview,
+            organization_name=project.organization_name,
+            collaboration_link=project.collaboration_link,
+            code_link=project.code_link, updated_date=project.updated_date,
+            owner_key=project.owner_key)
+
+    @property
+    def project_key(self):
+        """The key of the summarized Project."""
+        return ndb.Key(Project, self.key.id())
+
+
+@tracing.traced
+@ndb.tasklet
+def get_by_owner_async(owner_key):
+    """Returns a future for summaries of all projects owned by the user."""
+    query = ProjectSummary.query(ProjectSummary.owner_key == owner_key)
+    query = query.order(-ProjectSummary.updated_date)
+    summaries = yield query.fetch_async()
+    raise ndb.Return(summaries)
+
 
 def get_by_owner(owner_key):
-    """Returns a list of all projects owned by the provided user."""
-    query = Project.query(Project.owner_key == owner_key)
-    query = query.order(-Project.updated_date)
-    return query.fetch()
+    """Returns a list of ProjectSummaries for all projects owned by the user."""
+    return get_by_owner_async(owner_key).get_result()
+
+
+@tracing.traced
+@ndb.tasklet
+def get_page_async(cursor=None, backward=False, page_size=PAGE_SIZE):
+    """Returns a future for one page of project summaries.  See get_page."""
+    start_cursor = datastore_query.Cursor(urlsafe=cursor) if cursor else None
+    query = ProjectSummary.query()
+    if not backward:
+        query = query.order(ProjectSummary.updated_date, ProjectSummary.key)
+        projects, end_cursor, more = yield query.fetch_page_async(
+            page_size, start_cursor=start_cursor)
+        next_cursor = end_cursor.urlsafe() if more and end_cursor else None
+        raise ndb.Return((projects, cursor, next_cursor))
+    # Walk the reversed query from the cursor and flip the results back.
+    query = query.order(-ProjectSummary.updated_date, -ProjectSummary.key)
+    projects, end_cursor, more = yield query.fetch_page_async(
+        page_size, start_cursor=start_cursor and start_cursor.reversed())
+    projects.reverse()
+    previous_cursor = (
+        end_cursor.reversed().urlsafe() if more and end_cursor else None)
+    raise ndb.Return((projects, previous_cursor, cursor))
+
+
+def get_page(cursor=None, backward=False, page_size=PAGE_SIZE):
+    """Returns a page of ProjectSummaries, from least to most recently updated.
+
+    Paging uses datastore cursors, so each page costs the same no matter how
+    many projects exist.
+
+    Args:
+        cursor: a urlsafe cursor string from a previous call, or None to get the
+            first page.
+        backward: if True, returns the page that ends at the cursor rather than
+            the page that starts at it.
+        page_size: the maximum number of projects to return.
+
+    Returns:
+        A tuple of (summaries, previous_cursor, next_cursor).  The cursors are
+        urlsafe strings that can be passed back into this function (with
+        backward=True for previous_cursor), or None if there is no such page.
+
+    Raises:
+        datastore_errors.BadValueError if the cursor is malformed.
+    """
+    return get_page_async(cursor, backward, page_size).get_result()
+
+
+@tracing.traced
+@ndb.tasklet
+def search_projects_async(query, offset=0, page_size=PAGE_SIZE):
+    """Returns a future for one page of search results.  See search_projects."""
+    project_keys, more = yield search.search_async(query, offset, page_size)
+    summaries = yield ndb.get_multi_async(
+        [ndb.Key(ProjectSummary, project_key.id())
+         for project_key in project_keys])
+    previous_offset = max(0, offset - page_size) if offset else None
+    next_offset = offset + page_size if more else None
+    raise ndb.Return((
+        [summary for summary in summaries if summary], previous_offset,
+        next_offset))
+
+
+def search_projects(query, offset=0, page_size=PAGE_SIZE):
+    """Returns a page of ProjectSummaries for projects that match the query.
+
+    Projects match if they contain every word in the query, and the best
+    matches come first (see search.py).  Only the search index and the page's
+    summaries are read, never the Projects.
+
+    Args:
+        query: the words to search for.
+        offset: the number of results to skip.
+        page_size: the maximum number of projects to return.
+
+    Returns:
+        A tuple of (summaries, previous_offset, next_offset).  The offsets can
+        be passed back into this function, or are None if there is no such
+        page.
+    """
+    return search_projects_async(query, offset, page_size).get_result()
+
+
+@ndb.tasklet
+def delete_project_async(project_key):
+    """Returns a future for deleting the project, its summary, and its index.
+
+    They are deleted in parallel rather than from a post-delete hook, since
+    synchronous deletes in a hook nest in the event loop, like the writes in
+    Project._put_async, and overflow the stack when many projects are deleted
+    at once.
+    """
+    yield (project_key.delete_async(),
+           ndb.Key(ProjectSummary, project_key.id()).delete_async(),
+           search.unindex_project_async(project_key))
+
+
+def delete_project(project_key):
+    """Deletes the project, its summary, and its search index."""
+    delete_project_async(project_key).get_result()
+
+
+def backfill_summaries(batch_size=BACKFILL_BATCH_SIZE):
+    """Writes a ProjectSummary for every Project.
+
+    Summaries are normally written when projects are put, so this is only
+    needed for projects saved before summaries existed.  It is meant to be run
+    from the remote API shell or interactive console, and it is safe to run
+    again.
+
+    Returns:
+        The number of summaries written.
+    """
+    num_written = 0
+    cursor = None
+    more = True
+    while more:
+        projects, cursor, more = Project.query().fetch_page(
+            batch_size, start_cursor=cursor)
+        ndb.put_multi(
+            [ProjectSummary.from_project(project) for project in projects])
+        num_written += len(projects)
+    return num_written
+
+
+def backfill_search_index(batch_size=BACKFILL_BATCH_SIZE):
+    """Indexes every Project for search.
+
+    Projects are normally indexed when they are put, so this is only needed for
+    projects saved before search existed.  Like backfill_summaries, it is safe
+    to run again.
+
+    Returns:
+        The number of projects indexed.
+    """
+    num_indexed = 0
+    cursor = None
+    more = True
+    while more:
+        projects, cursor, more = Project.query().fetch_page(
+            batch_size, start_cursor=cursor)
+        for future in [search.index_project_async(project)
+                       for project in projects]:
+            future.check_success()
+        num_indexed += len(projects)
+    return num_indexed
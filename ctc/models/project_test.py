@@ -2,7 +2,10 @@
 
 import unittest
 
+from google.appengine.ext import ndb
+
 from ctc.models import project as project_model
+from ctc.models import search
 from ctc.models import user as user_model
 from ctc.testing import model_helpers
 from ctc.testing import testutil
@@ -40,9 +43,136 @@ class ProjectTests(testutil.CtcTestCase):
             email='nottheowner@codethechange.org').put()
         model_helpers.create_project(owner_key=other_user)
         # Ordered by most recent.  Doesn't include the other user's project.
-        expected_projects = [project2, project1]
-        actual_projects = project_model.get_by_owner(user_key)
-        self.assertEqual(expected_projects, actual_projects)
+        expected_keys = [project2.key, project1.key]
+        actual_keys = [summary.project_key
+                       for summary in project_model.get_by_owner(user_key)]
+        self.assertEqual(expected_keys, actual_keys)
+
+    def test_get_page(self):
+        self.assertEqual(project_model.get_page(), ([], None, None))
+        keys = [model_helpers.create_project().key for _ in range(5)]
+
+        def page_keys(page):
+            """Returns the project keys of a page of summaries."""
+            return [summary.project_key for summary in page]
+
+        # The first page has no previous page.
+        page, previous_cursor, next_cursor = project_model.get_page(
+            page_size=2)
+        self.assertEqual(page_keys(page), keys[:2])
+        self.assertIsNone(previous_cursor)
+        # Paging forward picks up where the last page left off.
+        page, previous_cursor, next_cursor = project_model.get_page(
+            next_cursor, page_size=2)
+        self.assertEqual(page_keys(page), keys[2:4])
+        self.assertIsNotNone(previous_cursor)
+        page, _, last_cursor = project_model.get_page(
+            next_cursor, page_size=2)
+        self.assertEqual(page_keys(page), keys[4:])
+        self.assertIsNone(last_cursor)
+        # Paging backward returns the earlier page in the same order.
+        page, first_cursor, _ = project_model.get_page(
+            previous_cursor, backward=True, page_size=2)
+        self.assertEqual(page_keys(page), keys[:2])
+        self.assertIsNone(first_cursor)
+
+    def test_summary_is_kept_in_sync(self):
+        project = model_helpers.create_project(
+            name='hello', overview='x' * (
+                project_model.SUMMARY_OVERVIEW_LENGTH + 10))
+        summary = ndb.Key(project_model.ProjectSummary, project.key.id()).get()
+        self.assertEqual(summary.name, 'hello')
+        self.assertEqual(summary.updated_date, project.updated_date)
+        self.assertEqual(summary.project_key, project.key)
+        # Long overviews are truncated.
+        self.assertEqual(
+            summary.overview,
+            'x' * project_model.SUMMARY_OVERVIEW_LENGTH + '...')
+        project.name = 'goodbye'
+        project.put()
+        self.assertEqual(summary.key.get().name, 'goodbye')
+        project_model.delete_project(project.key)
+        self.assertIsNone(summary.key.get())
+
+    def test_put_multi_many_projects(self):
+        # Projects used to put their summaries from a hook, which overflowed
+        # the stack for this many projects.
+        owner_key = user_model.User(email='owner@codethechange.org').put()
+        projects = [
+            project_model.Project(
+                name='project%d' % index, overview='garden',
+                organization_name='', organization_contact='',
+                organization_mission='', details='', collaboration_link='',
+                owner_key=owner_key)
+            for index in range(200)]
+        keys = ndb.put_multi(projects)
+        self.assertEqual(
+            sorted(summary.project_key for summary in
+                   project_model.ProjectSummary.query().fetch()),
+            sorted(keys))
+        self.assertEqual(
+            len(project_model.search_projects('garden', page_size=300)[0]),
+            200)
+
+    def test_delete_many_projects_in_a_tasklet(self):
+        # Projects used to delete their summaries and index synchronously from
+        # a hook, which blocked the tasklet that deleted them and overflowed
+        # the stack for this many projects.
+        keys = [model_helpers.create_project(overview='garden').key
+                for _ in range(200)]
+
+        @ndb.tasklet
+        def delete_all():
+            futures = [project_model.delete_project_async(key) for key in keys]
+            # Nothing has been deleted until the tasklet yields.
+            self.assertFalse(any(future.done() for future in futures))
+            yield futures
+
+        delete_all().get_result()
+        self.assertEqual(ndb.get_multi(keys), [None] * 200)
+        self.assertEqual(project_model.ProjectSummary.query().count(), 0)
+        self.assertEqual(search.ProjectToken.query().count(), 0)
+
+    def test_backfill_summaries(self):
+        projects = [model_helpers.create_project() for _ in range(3)]
+        ndb.delete_multi(project_model.ProjectSummary.query().fetch(
+            keys_only=True))
+        self.assertEqual(project_model.backfill_summaries(batch_size=2), 3)
+        self.assertEqual(
+            sorted(summary.project_key for summary in
+                   project_model.ProjectSummary.query().fetch()),
+            sorted(project.key for project in projects))
+
+    def test_search_projects(self):
+        self.assertEqual(project_model.search_projects('garden'),
+                         ([], None, None))
+        best = model_helpers.create_project(name='garden', overview='garden')
+        middle = model_helpers.create_project(name='garden')
+        worst = model_helpers.create_project(overview='garden')
+        model_helpers.create_project(name='food bank')
+        page, previous_offset, next_offset = project_model.search_projects(
+            'garden', page_size=2)
+        self.assertEqual([summary.project_key for summary in page],
+                         [best.key, middle.key])
+        self.assertIsNone(previous_offset)
+        self.assertEqual(next_offset, 2)
+        page, previous_offset, next_offset = project_model.search_projects(
+            'garden', offset=next_offset, page_size=2)
+        self.assertEqual([summary.project_key for summary in page],
+                         [worst.key])
+        self.assertEqual(previous_offset, 0)
+        self.assertIsNone(next_offset)
+
+    def test_backfill_search_index(self):
+        projects = [model_helpers.create_project(name='garden')
+                    for _ in range(3)]
+        ndb.delete_multi(search.ProjectToken.query().fetch(keys_only=True))
+        self.assertEqual(project_model.search_projects('garden')[0], [])
+        self.assertEqual(project_model.backfill_search_index(batch_size=2), 3)
+        self.assertEqual(
+            sorted(summary.project_key for summary in
+                   project_model.search_projects('garden')[0]),
+            sorted(project.key for project in projects))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,207 @@
+"""An inverted index of the words in projects, for searching them.
+
+Each normalized word (token) in a project's name, overview, organization name,
+and details is stored as a ProjectToken under the project, with a score for how
+well the project matches it.  Searching queries the tokens rather than the
+projects, so it only reads the index entries for the query's words and the
+summaries for one page of results.
+
+The index is updated whenever a project is put and by
+project.delete_project_async.
+"""
+
+import collections
+import math
+import re
+
+from google.appengine.ext import ndb
+
+from ctc.helpers import tracing
+
+
+# The fields that are indexed and how much a word in each counts towards a
+# project's score.
+FIELD_WEIGHTS = [
+    ('name', 3.0),
+    ('organization_name', 2.0),
+    ('overview', 1.5),
+    ('details', 1.0),
+]
+# Words too common to be worth indexing.
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'our', 'that', 'the', 'their',
+    'this', 'to', 'was', 'we', 'were', 'will', 'with'])
+# Suffixes that are removed from words, with what they are replaced by.  Only
+# the first matching suffix is removed.
+SUFFIXES = [('ies', 'y'), ('ing', ''), ('ed', ''), ('s', '')]
+# Words that end in these aren't plurals, eg, "class" and "campus".
+NOT_PLURAL_ENDINGS = ('ss', 'us', 'is')
+# Suffixes are only removed if at least this many letters are left.
+MIN_STEM_LENGTH = 3
+# Longer runs of letters and digits aren't words (eg, hashes or URLs), and
+# the datastore can't index strings over 1500 bytes, so they are dropped.
+MAX_TOKEN_LENGTH = 64
+# The most results that a one-word search can return.
+MAX_RESULTS = 1000
+# A multi-word search reads at most this many matches for each word, and its
+# results are among the top matches of the word with the fewest matches.
+MAX_CANDIDATES = 200
+# Words in a query after this many are ignored, which bounds a search's cost.
+MAX_QUERY_TOKENS = 5
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+class ProjectToken(ndb.Model):
+    """A token in a project, whose id is the token and parent is the project.
+    """
+    # The same as the id, so that tokens can be queried and sorted by score.
+    token = ndb.StringProperty(required=True)
+    score = ndb.FloatProperty(required=True)
+
+
+def normalize(word):
+    """Returns a lowercase word without common suffixes.
+
+    This is much lighter than a real stemmer: it makes plurals and most verb
+    forms match their base words (eg, "gardens" and "gardening" both become
+    "garden"), and it doesn't matter if a word is changed into a non-word, since
+    queries are normalized the same way.
+    """
+    word = word.lower()
+    for suffix, replacement in SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        if suffix == 's' and word.endswith(NOT_PLURAL_ENDINGS):
+            return word
+        if len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)] + replacement
+        return word
+    return word
+
+
+def tokenize(text):
+    """Returns the normalized tokens in the text, in order."""
+    return [normalize(word) for word in _WORD_RE.findall((text or '').lower())
+            if word not in STOP_WORDS and len(word) <= MAX_TOKEN_LENGTH]
+
+
+def get_token_scores(project):
+    """Returns a dict from each token in the project to its score.
+
+    Each occurrence of a token adds its field's weight, with diminishing
+    returns for repeats so that long descriptions don't outweigh names.
+    """
+    scores = collections.defaultdict(float)
+    for field, weight in FIELD_WEIGHTS:
+        counts = collections.Counter(tokenize(getattr(project, field)))
+        for token, count in counts.items():
+            scores[token] += weight * (1 + math.log(count))
+    return scores
+
+
+@ndb.tasklet
+def index_project_async(project, is_new=False):
+    """Returns a future for updating the project's tokens to match its fields.
+
+    Only the tokens that were added, removed, or rescored are written.
+
+    Args:
+        project: the project, which must have a complete key.
+        is_new: whether the project was just created, in which case it has no
+            tokens to read.
+    """
+    scores = get_token_scores(project)
+    old_tokens = []
+    if not is_new:
+        old_tokens = yield ProjectToken.query(
+            ancestor=project.key).fetch_async()
+    to_delete = [old_token.key for old_token in old_tokens
+                 if old_token.token not in scores]
+    unchanged = set(old_token.token for old_token in old_tokens
+                    if scores.get(old_token.token) == old_token.score)
+    to_put = [ProjectToken(parent=project.key, id=token, token=token,
+                           score=score)
+              for token, score in scores.items() if token not in unchanged]
+    yield ndb.delete_multi_async(to_delete) + ndb.put_multi_async(to_put)
+
+
+@ndb.tasklet
+def unindex_project_async(project_key):
+    """Returns a future for removing all of the project's tokens."""
+    token_keys = yield ProjectToken.query(ancestor=project_key).fetch_async(
+        keys_only=True)
+    yield ndb.delete_multi_async(token_keys)
+
+
+def _query_token(token):
+    """Returns a query for the token's entries, best matches first."""
+    return ProjectToken.query(ProjectToken.token == token).order(
+        -ProjectToken.score)
+
+
+@tracing.traced
+@ndb.tasklet
+def search_async(query, offset=0, limit=20):
+    """Returns a future for the keys of the projects that best match the query.
+
+    Projects match if they contain all of the query's tokens, and they are
+    ranked by the sum of their scores for those tokens.  A one-word search
+    only reads the requested page of the index.  A multi-word search reads up
+    to MAX_CANDIDATES matches for each word at once, takes the matches of the
+    word with the fewest as candidates, and checks the candidates that the
+    other words' matches didn't reach by key.  The results are exact unless
+    every word has more than MAX_CANDIDATES matches, in which case they are
+    limited to the candidates.
+
+    Args:
+        query: the words to search for.
+        offset: the number of results to skip.
+        limit: the most keys to return.
+
+    Returns:
+        A future for a tuple of (project_keys, has_more), where has_more is
+        whether there are more results after these.
+    """
+    tokens = list(collections.OrderedDict.fromkeys(tokenize(query)))
+    tokens = tokens[:MAX_QUERY_TOKENS]
+    end = offset + limit
+    if not tokens:
+        raise ndb.Return(([], False))
+    if len(tokens) == 1:
+        if offset >= MAX_RESULTS:
+            raise ndb.Return(([], False))
+        # The index is already sorted by score, so only this page is read.
+        token_keys = yield _query_token(tokens[0]).fetch_async(
+            min(end + 1, MAX_RESULTS), keys_only=True)
+        project_keys = [token_key.parent() for token_key in token_keys]
+        raise ndb.Return((project_keys[offset:end], len(project_keys) > end))
+    # Projection queries only read the index, not the tokens' entities.
+    matches = yield [
+        _query_token(token).fetch_async(
+            MAX_CANDIDATES + 1, projection=[ProjectToken.score])
+        for token in tokens]
+    scores = [dict((match.key.parent(), match.score) for match in
+                   token_matches[:MAX_CANDIDATES])
+              for token_matches in matches]
+    candidates = min(scores, key=len).keys()
+    unchecked = [
+        ndb.Key(ProjectToken, token, parent=project_key)
+        for token, token_matches, token_scores in zip(tokens, matches, scores)
+        if len(token_matches) > MAX_CANDIDATES
+        for project_key in candidates if project_key not in token_scores]
+    checked = yield ndb.get_multi_async(unchecked)
+    scores_by_token = dict(zip(tokens, scores))
+    for project_token in checked:
+        if project_token:
+            scores_by_token[project_token.token][
+                project_token.key.parent()] = project_token.score
+    totals = dict(
+        (project_key, sum(token_scores[project_key]
+                          for token_scores in scores))
+        for project_key in candidates
+        if all(project_key in token_scores for token_scores in scores))
+    ranked = sorted(totals, key=lambda project_key: (
+        -totals[project_key], project_key.id()))
+    raise ndb.Return((ranked[offset:end], len(ranked) > end))
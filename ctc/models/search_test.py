@@ -0,0 +1,140 @@
+"""Tests for the project search index."""
+
+import unittest
+
+import mock
+
+from ctc.models import project as project_model
+from ctc.models import search
+from ctc.testing import model_helpers
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class SearchTests(testutil.CtcTestCase):
+
+    def get_tokens(self, project):
+        return dict(
+            (project_token.token, project_token.score) for project_token in
+            search.ProjectToken.query(ancestor=project.key).fetch())
+
+    def test_normalize(self):
+        self.assertEqual(search.normalize('Gardens'), 'garden')
+        self.assertEqual(search.normalize('gardening'), 'garden')
+        self.assertEqual(search.normalize('tracked'), 'track')
+        self.assertEqual(search.normalize('libraries'), 'library')
+        self.assertEqual(search.normalize('library'), 'library')
+        # Words that only look like they have a suffix are kept.
+        self.assertEqual(search.normalize('class'), 'class')
+        self.assertEqual(search.normalize('campus'), 'campus')
+        self.assertEqual(search.normalize('bus'), 'bus')
+        self.assertEqual(search.normalize('sing'), 'sing')
+        self.assertEqual(search.normalize('red'), 'red')
+
+    def test_tokenize(self):
+        self.assertEqual(
+            search.tokenize('The Community-Gardens of  Palo Alto, 2014!'),
+            ['community', 'garden', 'palo', 'alto', '2014'])
+        self.assertEqual(search.tokenize(''), [])
+        self.assertEqual(search.tokenize(None), [])
+
+    def test_long_words_are_dropped(self):
+        long_word = 'a' * (search.MAX_TOKEN_LENGTH + 1)
+        self.assertEqual(search.tokenize(long_word + ' garden'), ['garden'])
+        # A project with a run of letters too long to index can be saved.
+        project = model_helpers.create_project(
+            name='garden', overview='', organization_name='',
+            details='x' * 1600)
+        self.assertEqual(self.get_tokens(project).keys(), ['garden'])
+
+    def test_get_token_scores(self):
+        project = model_helpers.create_project(
+            name='Garden', overview='garden gardens', organization_name='',
+            details='map')
+        scores = search.get_token_scores(project)
+        self.assertEqual(sorted(scores), ['garden', 'map'])
+        # Repeated words count for less than separate fields.
+        self.assertGreater(scores['garden'], 3.0 + 1.5)
+        self.assertLess(scores['garden'], 3.0 + 1.5 * 2)
+        self.assertEqual(scores['map'], 1.0)
+
+    def test_index_is_kept_in_sync(self):
+        project = model_helpers.create_project(
+            name='garden', overview='map', organization_name='parks',
+            details='')
+        self.assertEqual(sorted(self.get_tokens(project)),
+                         ['garden', 'map', 'park'])
+        project.name = 'library'
+        project.overview = 'map map'
+        project.put()
+        tokens = self.get_tokens(project)
+        self.assertEqual(sorted(tokens), ['library', 'map', 'park'])
+        self.assertEqual(tokens['map'], search.get_token_scores(project)['map'])
+        project_model.delete_project(project.key)
+        self.assertEqual(self.get_tokens(project), {})
+
+    def test_search(self):
+        garden = model_helpers.create_project(
+            name='Community Garden', overview='A map of plots')
+        map_project = model_helpers.create_project(
+            name='Transit Map', overview='Maps for the community')
+        model_helpers.create_project(name='Food Bank')
+        self.assertEqual(search.search_async('').get_result(), ([], False))
+        self.assertEqual(search.search_async('the').get_result(), ([], False))
+        self.assertEqual(search.search_async('nothing').get_result(),
+                         ([], False))
+        # The project with the word in its name ranks first.
+        self.assertEqual(search.search_async('maps').get_result(),
+                         ([map_project.key, garden.key], False))
+        self.assertEqual(search.search_async('community').get_result(),
+                         ([garden.key, map_project.key], False))
+        # Every word must match.
+        self.assertEqual(search.search_async('garden map').get_result(),
+                         ([garden.key], False))
+        self.assertEqual(search.search_async('garden food').get_result(),
+                         ([], False))
+        # Repeated words don't change anything.
+        self.assertEqual(search.search_async('map maps').get_result(),
+                         ([map_project.key, garden.key], False))
+
+    def test_search_pages(self):
+        keys = [model_helpers.create_project(name='garden').key
+                for _ in range(5)]
+        # Ties are broken by id.
+        self.assertEqual(
+            search.search_async('garden', limit=2).get_result(),
+            (keys[:2], True))
+        self.assertEqual(
+            search.search_async('garden', offset=2, limit=2).get_result(),
+            (keys[2:4], True))
+        self.assertEqual(
+            search.search_async('garden', offset=4, limit=2).get_result(),
+            (keys[4:], False))
+        self.assertEqual(
+            search.search_async('garden name', offset=1, limit=2).get_result(),
+            (keys[1:3], True))
+
+    @mock.patch.object(search, 'MAX_CANDIDATES', 2)
+    def test_search_checks_candidates_by_key(self):
+        most_garden = model_helpers.create_project(
+            name='garden garden', overview='map', organization_name='',
+            details='')
+        model_helpers.create_project(
+            name='garden', overview='', organization_name='', details='')
+        river = model_helpers.create_project(
+            name='map map', overview='garden', organization_name='',
+            details='river')
+        model_helpers.create_project(
+            name='map', overview='', organization_name='', details='')
+        # River has one match, so its match is checked for garden by key,
+        # even though it isn't among garden's best matches.
+        self.assertEqual(search.search_async('river garden').get_result(),
+                         ([river.key], False))
+        # Both words have more matches than are read, so the results are
+        # limited to garden's best matches.
+        self.assertEqual(search.search_async('garden map').get_result(),
+                         ([most_garden.key], False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """A model for one user."""
 from google.appengine.ext import ndb
 from google.appengine.api import users
+from ctc.helpers import tracing
 
 
 class User(ndb.Model):
@@ -28,22 +29,31 @@ class User(ndb.Model):
             setattr(self, field, request.get(field))
         return self
 
-def get_current_user_key():
+
+@tracing.traced
+@ndb.tasklet
+def get_current_user_key_async():
     """Gets the ndb.Key for the current user, creating it if necessary.
 
-    Returns None if the user is not logged in.
+    Returns:
+        A future for the key, which is None if the user is not logged in.
     """
-    local_user_object = None
-    user_id = None
     appengine_user = users.get_current_user()
-    if appengine_user:
-        user_id = appengine_user.user_id()
-        local_user_object = User.get_by_id(user_id)
+    user_id = appengine_user.user_id() if appengine_user else None
     # The user is not logged in.
     if not user_id:
-        return None
+        raise ndb.Return(None)
+    local_user_object = yield User.get_by_id_async(user_id)
     # The user is logged in but isn't in the datastore.
     if not local_user_object:
         local_user_object = User(id=user_id, email=appengine_user.email())
-        local_user_object.put()
-    return local_user_object.key
+        yield local_user_object.put_async()
+    raise ndb.Return(local_user_object.key)
+
+
+def get_current_user_key():
+    """Gets the ndb.Key for the current user, creating it if necessary.
+
+    Returns None if the user is not logged in.
+    """
+    return get_current_user_key_async().get_result()
@@ -1,38 +1,65 @@
-"""The server, which handles all routing logic."""
+"""The server, which handles all routing logic.
+
+Handlers are given by their dotted paths rather than imported here, and webapp2
+imports each one the first time a request is routed to it.  Importing the
+handlers pulls in the models, the CSRF helper, and Jinja2, so a new instance
+only pays for them when its first request needs them.  Run
+scripts/benchmark_startup.py to check how long importing this module takes.
+"""
 import os
 
 import webapp2
 
-from ctc import handlers
+from ctc.helpers import compression
+from ctc.helpers import metrics
+from ctc.helpers import profiler
+from ctc.helpers import rpc_stats
+from ctc.helpers import tracing
 
 
 IS_DEV = (
     'SERVER_SOFTWARE' in os.environ and
     os.environ['SERVER_SOFTWARE'].startswith('Development'))
+# The module with all of the handlers.
+HANDLERS_MODULE = 'ctc.handlers'
 
 
-def named_route(path, handler):
+def named_route(path, handler_name):
     """Returns a webapp2 route with a name populated.
 
     Args:
         path: the string path to handle.
-        handler: a class that will be used as the handler and as the name.
+        handler_name: the name of the handler's class in HANDLERS_MODULE, which
+            is also used as the route's name (eg, for uri_for).
 
     Returns:
         The corresponding webapp2 handler.
     """
-    return webapp2.Route(path, handler=handler, name=handler)
-
-
-APP = webapp2.WSGIApplication([
-    named_route(r'/', handlers.MainPage),
-    named_route(r'/projects', handlers.ListProjects),
-    named_route(r'/project/<project_id:\d+>', handlers.DisplayProject),
-    named_route(r'/project/<project_id:\d+>/edit', handlers.EditProject),
-    named_route(r'/project/<project_id:\d+>/join', handlers.JoinProject),
-    named_route(r'/project/<project_id:\d+>/leave', handlers.LeaveProject),
-    named_route(r'/project/new', handlers.NewProject),
-    named_route(r'/dashboard', handlers.DisplayDashboard),
-    named_route(r'/user/<user_id:\d+>', handlers.DisplayUser),
-    named_route(r'/user/<user_id:\d+>/edit', handlers.EditUser)
+    return webapp2.Route(
+        path, handler='%s.%s' % (HANDLERS_MODULE, handler_name),
+        name=handler_name)
+
+
+WEBAPP = webapp2.WSGIApplication([
+    named_route(r'/', 'MainPage'),
+    named_route(r'/projects', 'ListProjects'),
+    named_route(r'/project/<project_id:\d+>', 'DisplayProject'),
+    named_route(r'/project/<project_id:\d+>/edit', 'EditProject'),
+    named_route(r'/project/<project_id:\d+>/join', 'JoinProject'),
+    named_route(r'/project/<project_id:\d+>/leave', 'LeaveProject'),
+    named_route(r'/project/new', 'NewProject'),
+    named_route(r'/dashboard', 'DisplayDashboard'),
+    named_route(r'/user/<user_id:\d+>', 'DisplayUser'),
+    named_route(r'/user/<user_id:\d+>/edit', 'EditUser'),
+    named_route(r'/_ah/warmup', 'Warmup'),
+    named_route(r'/admin/metrics', 'AdminMetrics'),
+    named_route(r'/admin/profiles', 'AdminProfiles'),
+    named_route(r'/admin/profiles/<profile_id:[\w-]+>', 'AdminProfile'),
 ], debug=IS_DEV)
+# The app that app.yaml serves.  The metrics include the time to compress, and
+# the slow request log includes the RPCs.
+APP = metrics.MetricsMiddleware(
+    compression.CompressionMiddleware(
+        rpc_stats.RpcStatsMiddleware(
+            tracing.TracingMiddleware(profiler.ProfilerMiddleware(WEBAPP)))),
+    WEBAPP.router)
@@ -0,0 +1,33 @@
+"""Tests for the server's routing."""
+
+import os
+import subprocess
+import sys
+import unittest
+
+import webapp2
+
+from ctc import server
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class ServerTests(testutil.CtcTestCase):
+
+    def test_import_does_not_import_handlers(self):
+        # This test's process already imported the handlers, so check a new one.
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys; from ctc import server; '
+            'print server.HANDLERS_MODULE in sys.modules'], env=env)
+        self.assertEqual(output.strip(), 'False')
+
+    def test_routes_name_handlers(self):
+        for route in server.WEBAPP.router.build_routes.values():
+            handler = webapp2.import_string(route.handler)
+            self.assertEqual(handler.__name__, route.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""Generates large, realistic datasets of users, projects, and collaborators.
+
+Entities are written in batches with ndb.put_multi_async, and a few batches
+are written at once.  The same seed always generates the same users, projects,
+and teams.  Team sizes follow a power law, so a few projects have most of the
+collaborators, like real projects.
+
+In tests, call generate() after the testbed is set up.  On a local dev server,
+run it from the interactive console (http://localhost:8000/console):
+    from ctc.testing import data_generator
+    data_generator.generate(10000, 2000, 50000, stream=True)
+With stream=True, entities are generated as they are written and nothing is
+kept afterwards, so the dataset never has to fit in memory.
+"""
+
+import collections
+import random
+
+from google.appengine.ext import ndb
+
+from ctc.models import collaborator as collaborator_model
+from ctc.models import project as project_model
+from ctc.models import user as user_model
+
+
+# The number of entities per put_multi_async.
+BATCH_SIZE = 500
+# The number of batches that may be written at once.
+MAX_PENDING_BATCHES = 4
+# The project at index i gets a share of the collaborators proportional to
+# 1 / (i + 1) ** POPULARITY_EXPONENT.
+POPULARITY_EXPONENT = 1.1
+# Generated users have numeric ids like real users, starting here.
+FIRST_USER_ID = 1000000
+# Words for generated project names and descriptions.
+WORDS = [
+    'animal', 'app', 'budget', 'campaign', 'children', 'city', 'clinic',
+    'community', 'data', 'database', 'donor', 'education', 'energy', 'event',
+    'food', 'garden', 'health', 'housing', 'library', 'literacy', 'map',
+    'medical', 'mentor', 'network', 'outreach', 'park', 'platform', 'portal',
+    'recycling', 'river', 'school', 'shelter', 'student', 'tracker', 'transit',
+    'tutoring', 'vaccine', 'volunteer', 'water', 'website', 'youth']
+
+
+class GeneratedData(object):
+    """What generate() wrote.
+
+    Attributes:
+        num_users, num_projects, num_collaborators: the number of each written.
+        user_keys: the users' keys, in order.
+        project_keys: the projects' keys, in order.
+        owner_keys: the key of each project's owner, in the same order.
+        memberships: a dict from each user's key to the keys of the projects
+            that the user collaborates on.
+    The lists and dict are empty if the data was streamed.
+    """
+
+    def __init__(self):
+        self.num_users = 0
+        self.num_projects = 0
+        self.num_collaborators = 0
+        self.user_keys = []
+        self.project_keys = []
+        self.owner_keys = []
+        self.memberships = collections.defaultdict(list)
+
+
+class _BatchWriter(object):
+    """Puts entities in batches, with up to max_pending batches at once."""
+
+    def __init__(self, batch_size, max_pending=MAX_PENDING_BATCHES):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.batch = []
+        self.pending = collections.deque()
+
+    def put(self, entity):
+        """Adds the entity to the current batch, writing it if it is full."""
+        self.batch.append(entity)
+        if len(self.batch) >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self):
+        """Starts writing the current batch."""
+        if len(self.pending) >= self.max_pending:
+            self._wait_for_oldest_batch()
+        self.pending.append(ndb.put_multi_async(self.batch))
+        self.batch = []
+
+    def _wait_for_oldest_batch(self):
+        """Waits for the oldest pending batch, raising any error it had."""
+        for future in self.pending.popleft():
+            future.check_success()
+
+    def flush(self):
+        """Writes the current batch and waits for every batch to finish."""
+        if self.batch:
+            self._write_batch()
+        while self.pending:
+            self._wait_for_oldest_batch()
+
+
+def get_user_key(index):
+    """Returns the key of the generated user with the index."""
+    return ndb.Key(user_model.User, str(FIRST_USER_ID + index))
+
+
+def make_user(index):
+    """Returns the generated user with the index."""
+    user_key = get_user_key(index)
+    return user_model.User(
+        key=user_key, email='user%s@example.com' % user_key.id(),
+        name='User %d' % index)
+
+
+def make_project(rng, project_key, owner_key):
+    """Returns a project with random words in its name and descriptions."""
+    def words(num_words):
+        """Returns a string of random words."""
+        return ' '.join(rng.choice(WORDS) for _ in range(num_words))
+    organization = words(2).title()
+    return project_model.Project(
+        key=project_key, name=words(3).title(), overview=words(40),
+        organization_name=organization,
+        organization_contact='contact@example.com',
+        organization_mission=words(20), details=words(80),
+        collaboration_link='http://example.com/collaborate',
+        code_link='http://example.com/code', owner_key=owner_key)
+
+
+def get_team_sizes(num_users, num_projects, num_collaborators):
+    """Yields the number of collaborators on each project.
+
+    The sizes add up to about num_collaborators.  No team is larger than
+    num_users, since each user only collaborates once on a project.
+    """
+    total_weight = sum((index + 1) ** -POPULARITY_EXPONENT
+                       for index in xrange(num_projects))
+    for index in xrange(num_projects):
+        share = (index + 1) ** -POPULARITY_EXPONENT / total_weight
+        yield min(num_users, int(round(num_collaborators * share)))
+
+
+def generate(num_users, num_projects, num_collaborators, seed=0,
+             stream=False):
+    """Writes a generated dataset to the datastore.
+
+    The ndb caches are turned off while writing so that they don't fill up with
+    the generated entities.
+
+    Args:
+        num_users: the number of users.
+        num_projects: the number of projects, each owned by a random user.
+        num_collaborators: about how many collaborators to add across all
+            projects.
+        seed: the seed for the random choices.
+        stream: if True, don't keep the keys in the returned GeneratedData.
+
+    Returns:
+        A GeneratedData describing what was written.
+    """
+    rng = random.Random(seed)
+    data = GeneratedData()
+    context = ndb.get_context()
+    context.set_cache_policy(False)
+    context.set_memcache_policy(False)
+    try:
+        writer = _BatchWriter(BATCH_SIZE)
+        for index in xrange(num_users):
+            writer.put(make_user(index))
+            if not stream:
+                data.user_keys.append(get_user_key(index))
+        data.num_users = num_users
+        writer.flush()
+
+        first_id, _ = project_model.Project.allocate_ids(max(num_projects, 1))
+        team_sizes = get_team_sizes(num_users, num_projects, num_collaborators)
+        for index, team_size in enumerate(team_sizes):
+            project_key = ndb.Key(project_model.Project, first_id + index)
+            owner_key = get_user_key(rng.randrange(num_users))
+            writer.put(make_project(rng, project_key, owner_key))
+            # Each user only collaborates once on a project.
+            for user_index in rng.sample(xrange(num_users), team_size):
+                user = make_user(user_index)
+                collaborator = collaborator_model.Collaborator(
+                    parent=project_key, id=user.key.id(), user_key=user.key)
+                collaborator.copy_profile(user)
+                writer.put(collaborator)
+                if not stream:
+                    data.memberships[user.key].append(project_key)
+            writer.put(collaborator_model.CollaboratorCount(
+                id=collaborator_model.COUNT_ID, parent=project_key,
+                count=team_size))
+            data.num_collaborators += team_size
+            if not stream:
+                data.project_keys.append(project_key)
+                data.owner_keys.append(owner_key)
+        data.num_projects = num_projects
+        writer.flush()
+    finally:
+        context.set_cache_policy(None)
+        context.set_memcache_policy(None)
+    return data
@@ -0,0 +1,84 @@
+"""Tests for the dataset generator."""
+
+import unittest
+
+from ctc.models import collaborator as collaborator_model
+from ctc.models import project as project_model
+from ctc.models import user as user_model
+from ctc.testing import data_generator
+from ctc.testing import testutil
+
+
+# Tests don't need docstrings, so pylint: disable=C0111
+class DataGeneratorTests(testutil.CtcTestCase):
+
+    def test_generate(self):
+        data = data_generator.generate(20, 10, 50)
+        self.assertEqual(data.num_users, 20)
+        self.assertEqual(user_model.User.query().count(), 20)
+        self.assertEqual(project_model.Project.query().count(), 10)
+        self.assertEqual(project_model.ProjectSummary.query().count(), 10)
+        self.assertEqual(
+            collaborator_model.Collaborator.query().count(),
+            data.num_collaborators)
+        self.assertAlmostEqual(data.num_collaborators, 50, delta=10)
+        self.assertEqual(len(data.project_keys), 10)
+        self.assertEqual(len(data.owner_keys), 10)
+        for user_key, project_keys in data.memberships.items():
+            summaries = collaborator_model.get_projects(user_key)
+            self.assertEqual(
+                sorted(summary.project_key for summary in summaries),
+                sorted(project_keys))
+
+    def test_counts_and_profiles(self):
+        data = data_generator.generate(30, 5, 40)
+        for project_key in data.project_keys:
+            collaborators = collaborator_model.Collaborator.query(
+                ancestor=project_key).fetch()
+            self.assertEqual(
+                collaborator_model.get_collaborator_count(project_key),
+                len(collaborators))
+            for collaborator in collaborators:
+                user = collaborator.user_key.get()
+                self.assertEqual(collaborator.email, user.email)
+                self.assertEqual(collaborator.name, user.name)
+
+    def test_team_sizes_follow_power_law(self):
+        team_sizes = list(data_generator.get_team_sizes(1000, 100, 2000))
+        self.assertEqual(team_sizes, sorted(team_sizes, reverse=True))
+        self.assertGreater(team_sizes[0], 10 * team_sizes[-1])
+        # No team is larger than the number of users.
+        self.assertEqual(max(data_generator.get_team_sizes(3, 2, 100)), 3)
+
+    def test_deterministic(self):
+        first = data_generator.generate(10, 5, 20, seed=3)
+        first_names = [key.get().name for key in first.project_keys]
+        first_teams = dict(first.memberships)
+        self.tearDown()
+        self.setUp()
+        second = data_generator.generate(10, 5, 20, seed=3)
+        self.assertEqual(
+            [key.get().name for key in second.project_keys], first_names)
+        self.assertEqual(dict(second.memberships), first_teams)
+
+    def test_stream(self):
+        data = data_generator.generate(10, 5, 20, stream=True)
+        self.assertEqual(data.project_keys, [])
+        self.assertEqual(data.memberships, {})
+        self.assertEqual(project_model.Project.query().count(), 5)
+        self.assertEqual(
+            collaborator_model.Collaborator.query().count(),
+            data.num_collaborators)
+
+    def test_small_batches(self):
+        original_batch_size = data_generator.BATCH_SIZE
+        data_generator.BATCH_SIZE = 3
+        try:
+            data_generator.generate(20, 4, 30)
+        finally:
+            data_generator.BATCH_SIZE = original_batch_size
+        self.assertEqual(user_model.User.query().count(), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
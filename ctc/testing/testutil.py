@@ -5,8 +5,13 @@ import unittest
 
 import webtest
 
+from google.appengine.ext import ndb
 from google.appengine.ext import testbed
 
+from ctc.helpers import csrf
+from ctc.helpers import fragment_cache
+from ctc.helpers import metrics
+from ctc.helpers import rpc_stats
 from ctc.models import user as user_model
 
 
@@ -19,16 +24,27 @@ class CtcTestCase(unittest.TestCase):
         self.testbed.activate()
         self.logged_in_user = None
         # Only some stubs are initialized because we had trouble with some
-        # testing environments.
+        # testing environments.  Memcache is needed for cached counts (and
+        # ndb's own caching).
         self.testbed.init_datastore_v3_stub()
         self.testbed.init_user_stub()
+        self.testbed.init_memcache_stub()
+        # Each test has a fresh datastore, so it needs a fresh key ring and
+        # fragment cache.  It also starts without any recorded metrics.
+        csrf.flush_key_ring_cache()
+        fragment_cache.flush_local_cache()
+        metrics.reset()
 
     def tearDown(self):
         super(CtcTestCase, self).tearDown()
         self.testbed.deactivate()
 
-    def login(self):
-        """Creates a user, logs in, and returns the user."""
+    def login(self, is_admin=False):
+        """Creates a user, logs in, and returns the user.
+
+        Args:
+            is_admin: whether the user is logged in as an admin.
+        """
         if not self.logged_in_user:
             self.logged_in_user = user_model.User(
                 id='12345', email='test@codethechange.org')
@@ -36,23 +52,62 @@ class CtcTestCase(unittest.TestCase):
         self.testbed.setup_env(
             USER_EMAIL='test@codethechange.org',
             USER_ID=self.logged_in_user.key.id(),
+            USER_IS_ADMIN='1' if is_admin else '0',
             overwrite=True)
         return self.logged_in_user
 
     def logout(self):
         """Clears the currently logged in user."""
-        self.testbed.setup_env(USER_EMAIL='', USER_ID='', overwrite=True)
+        self.testbed.setup_env(
+            USER_EMAIL='', USER_ID='', USER_IS_ADMIN='0', overwrite=True)
+
+    def assert_max_rpcs(self, response, max_datastore_rpcs,
+                        max_datastore_keys, max_memcache_keys):
+        """Asserts that the request stayed within its RPC budgets.
+
+        ndb batches gets into one RPC, so a get per row only shows up in the
+        number of keys.
+
+        Args:
+            response: the webtest response for the request.
+            max_datastore_rpcs: the number of datastore RPCs that the request
+                may make.
+            max_datastore_keys: the number of keys that the request may get,
+                put, or delete, including each result of its queries.
+            max_memcache_keys: the number of keys that the request may read or
+                write in memcache.
+        """
+        summary = response.headers[rpc_stats.HEADER]
+        rpc_counts = rpc_stats.parse_summary(summary)
+        num_keys = rpc_stats.parse_summary_keys(summary)
+        budgets = [
+            ('datastore RPCs', rpc_counts.get('datastore_v3', 0),
+             max_datastore_rpcs),
+            ('datastore keys', num_keys.get('datastore_v3', 0),
+             max_datastore_keys),
+            ('memcache keys', num_keys.get('memcache', 0), max_memcache_keys),
+        ]
+        for name, used, budget in budgets:
+            self.assertLessEqual(
+                used, budget, '%s used %d %s, more than %d: %s' % (
+                    response.request.path_qs, used, name, budget, summary))
 
 
 class TestApp(webtest.TestApp):
-    """A test app for sending requests to handlers that sets PATH_INFO."""
+    """A test app for sending requests to handlers that sets PATH_INFO.
+
+    Like App Engine, each request starts with an empty ndb in-context cache, so
+    tests see the datastore RPCs that a real request would make.
+    """
 
     def post(self, path, *args, **kwargs):
         """Adds PATH_INFO to the environment and sends a POST."""
         os.environ['PATH_INFO'] = path
+        ndb.get_context().clear_cache()
         return super(TestApp, self).post(path, *args, **kwargs)
 
     def get(self, path, *args, **kwargs):
         """Adds PATH_INFO to the environment and sends a GET."""
         os.environ['PATH_INFO'] = path
+        ndb.get_context().clear_cache()
         return super(TestApp, self).get(path, *args, **kwargs)
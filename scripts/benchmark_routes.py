@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""Measures each route's latency, datastore RPCs, and size at our data sizes.
+
+This seeds the testbed's datastore stub with a generated dataset of users,
+projects, and collaborators (see ctc/testing/data_generator.py), then replays a
+weighted mix of requests to ctc.server.APP as anonymous and logged in users.
+It prints the latency percentiles, datastore RPCs, and response size for each
+route and writes them to a JSON file, so that results from two commits can be
+diffed or compared with --compare.
+
+The stub is much slower than the real datastore, so latencies are only
+comparable between runs on the same machine.  RPC counts and sizes don't depend
+on the machine.
+
+Usage: scripts/benchmark_routes.py [--dataset small|medium|large]
+    [--requests N] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import bisect
+import json
+import random
+import subprocess
+import time
+
+# To support running this file from the root, pylint: disable=F0401
+import common
+# pylint: enable=F0401
+
+
+# The number of each entity in each dataset.  The number of collaborators is
+# approximate (see ctc/testing/data_generator.py).
+DATASETS = {
+    'small': {'users': 500, 'projects': 200, 'collaborators': 2000},
+    'medium': {'users': 5000, 'projects': 2000, 'collaborators': 50000},
+    'large': {'users': 50000, 'projects': 10000, 'collaborators': 500000},
+}
+# Each request in the mix: (route name, relative weight, whether the user is
+# logged in).  SearchProjects is ListProjects with a search query.
+ROUTE_MIX = [
+    ('MainPage', 10, False),
+    ('ListProjects', 20, False),
+    ('ListProjects', 10, True),
+    ('SearchProjects', 5, False),
+    ('DisplayProject', 25, False),
+    ('DisplayProject', 15, True),
+    ('DisplayDashboard', 8, True),
+    ('DisplayUser', 5, True),
+    ('EditProject', 2, True),
+    ('JoinProject', 3, True),
+    ('LeaveProject', 2, True),
+]
+# Requests that warm the caches before anything is measured.
+NUM_WARMUP_REQUESTS = 50
+PERCENTILES = [50, 95, 99]
+
+
+class WeightedChooser(object):
+    """Chooses indexes at random in proportion to their weights."""
+
+    def __init__(self, weights, rng):
+        self.rng = rng
+        self.cumulative_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            self.cumulative_weights.append(total)
+
+    def choose(self):
+        """Returns a random index."""
+        point = self.rng.random() * self.cumulative_weights[-1]
+        return bisect.bisect_right(self.cumulative_weights, point)
+
+
+def popularity_weights(num_items):
+    """Returns the weights for viewing num_items projects.
+
+    The projects with the most collaborators get the most views.
+    """
+    from ctc.testing import data_generator
+    return [1.0 / (index + 1) ** data_generator.POPULARITY_EXPONENT
+            for index in range(num_items)]
+
+
+class Dataset(object):
+    """The ids in a generated dataset that are needed to build requests."""
+
+    def __init__(self, data, rng):
+        self.user_ids = [key.id() for key in data.user_keys]
+        self.project_ids = [key.id() for key in data.project_keys]
+        self.project_owner_ids = [key.id() for key in data.owner_keys]
+        # Each user's projects, for building leave requests.
+        self.memberships = dict(
+            (user_key.id(), [project_key.id() for project_key in project_keys])
+            for user_key, project_keys in data.memberships.items())
+        self.num_collaborators = data.num_collaborators
+        self.project_chooser = WeightedChooser(
+            popularity_weights(len(self.project_ids)), rng)
+
+    def choose_project_id(self):
+        """Returns a project id, with popular projects more likely."""
+        return self.project_ids[self.project_chooser.choose()]
+
+
+class Replayer(object):
+    """Sends the mix of requests and records the measurements for each."""
+
+    def __init__(self, app, dataset, test_bed, rng):
+        self.app = app
+        self.dataset = dataset
+        self.testbed = test_bed
+        self.rng = rng
+        self.route_chooser = WeightedChooser(
+            [weight for _, weight, _ in ROUTE_MIX], rng)
+        # Measurements for each route and login state.
+        self.results = {}
+
+    def _log_in(self, user_id):
+        """Makes the following requests come from the user, or logs out."""
+        self.testbed.setup_env(
+            USER_EMAIL='user%s@example.com' % user_id if user_id else '',
+            USER_ID=user_id or '', USER_IS_ADMIN='0', overwrite=True)
+
+    def _build_request(self, route_name, user_id):
+        """Returns (method, path) for a request to the route."""
+        dataset = self.dataset
+        if route_name == 'MainPage':
+            return 'GET', '/'
+        if route_name == 'ListProjects':
+            return 'GET', '/projects'
+        if route_name == 'SearchProjects':
+            from ctc.testing import data_generator
+            words = self.rng.sample(
+                data_generator.WORDS, self.rng.randint(1, 2))
+            return 'GET', '/projects?q=' + '+'.join(words)
+        if route_name == 'DisplayDashboard':
+            return 'GET', '/dashboard'
+        if route_name == 'DisplayUser':
+            return 'GET', '/user/%s' % user_id
+        if route_name == 'EditProject':
+            index = self.rng.randrange(len(dataset.project_ids))
+            self._log_in(dataset.project_owner_ids[index])
+            return 'GET', '/project/%d/edit' % dataset.project_ids[index]
+        if route_name == 'JoinProject':
+            return 'POST', '/project/%d/join' % dataset.choose_project_id()
+        if route_name == 'LeaveProject':
+            # Leave one of the user's projects if the user has any.
+            project_ids = dataset.memberships.get(user_id)
+            project_id = (self.rng.choice(project_ids) if project_ids
+                          else dataset.choose_project_id())
+            return 'POST', '/project/%d/leave' % project_id
+        return 'GET', '/project/%d' % dataset.choose_project_id()
+
+    def send(self, record=True):
+        """Sends one random request and records it unless record is False."""
+        from ctc.helpers import csrf
+        from ctc.helpers import rpc_stats
+        route_name, _, is_logged_in = ROUTE_MIX[self.route_chooser.choose()]
+        user_id = self.rng.choice(self.dataset.user_ids) if is_logged_in else ''
+        self._log_in(user_id)
+        method, path = self._build_request(route_name, user_id)
+        start_time = time.time()
+        if method == 'POST':
+            response = self.app.post(
+                path, {'csrf_token': csrf.make_token(path)}, status='*')
+        else:
+            response = self.app.get(path, status='*')
+        num_bytes = len(response.body)
+        latency_ms = (time.time() - start_time) * 1000
+        if not record:
+            return
+        rpc_counts = rpc_stats.parse_summary(
+            response.headers.get(rpc_stats.HEADER, ''))
+        key = '%s (%s)' % (
+            route_name, 'logged in' if is_logged_in else 'anonymous')
+        result = self.results.setdefault(
+            key, {'latencies_ms': [], 'datastore_rpcs': [], 'bytes': [],
+                  'statuses': {}})
+        result['latencies_ms'].append(latency_ms)
+        result['datastore_rpcs'].append(rpc_counts.get('datastore_v3', 0))
+        result['bytes'].append(num_bytes)
+        status = str(response.status_int)
+        result['statuses'][status] = result['statuses'].get(status, 0) + 1
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of the values."""
+    values = sorted(values)
+    rank = max(0, int(round(percent / 100.0 * len(values))) - 1)
+    return values[rank]
+
+
+def mean(values):
+    """Returns the mean of the values."""
+    return sum(values) / float(len(values))
+
+
+def summarize(results):
+    """Returns a dict from each route to its summarized measurements."""
+    summaries = {}
+    for key, result in results.items():
+        summary = {
+            'requests': len(result['latencies_ms']),
+            'mean_ms': round(mean(result['latencies_ms']), 2),
+            'mean_datastore_rpcs': round(mean(result['datastore_rpcs']), 2),
+            'max_datastore_rpcs': max(result['datastore_rpcs']),
+            'mean_bytes': int(mean(result['bytes'])),
+            'statuses': result['statuses'],
+        }
+        for percent in PERCENTILES:
+            summary['p%d_ms' % percent] = round(
+                percentile(result['latencies_ms'], percent), 2)
+        summaries[key] = summary
+    return summaries
+
+
+def get_commit():
+    """Returns the current git commit, or None if it isn't known."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=common.get_project_dir(),
+            stderr=subprocess.STDOUT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summaries(summaries, baseline=None):
+    """Prints a table of the summaries, with changes from the baseline."""
+    print '%-32s %6s %9s %9s %9s %7s %9s' % (
+        'Route', 'Reqs', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'RPCs',
+        'Bytes')
+    for key in sorted(summaries):
+        summary = summaries[key]
+        print '%-32s %6d %9.1f %9.1f %9.1f %7.2f %9d' % (
+            key, summary['requests'], summary['p50_ms'], summary['p95_ms'],
+            summary['p99_ms'], summary['mean_datastore_rpcs'],
+            summary['mean_bytes'])
+        old = (baseline or {}).get(key)
+        if old:
+            print '%-32s %6s %9s %+9.1f %9s %+7.2f %+9d' % (
+                '  vs. baseline', '', '', summary['p95_ms'] - old['p95_ms'],
+                '', summary['mean_datastore_rpcs'] -
+                old['mean_datastore_rpcs'],
+                summary['mean_bytes'] - old['mean_bytes'])
+
+
+def benchmark_routes(dataset_sizes, num_requests, seed):
+    """Seeds a dataset, replays the requests, and returns the results."""
+    from google.appengine.ext import testbed
+    from ctc import server
+    from ctc.testing import data_generator
+    from ctc.testing import testutil
+    test_bed = testbed.Testbed()
+    test_bed.activate()
+    test_bed.init_datastore_v3_stub()
+    test_bed.init_user_stub()
+    test_bed.init_memcache_stub()
+    try:
+        start_time = time.time()
+        data = data_generator.generate(
+            dataset_sizes['users'], dataset_sizes['projects'],
+            dataset_sizes['collaborators'], seed=seed)
+        rng = random.Random(seed)
+        dataset = Dataset(data, rng)
+        seed_seconds = time.time() - start_time
+        print 'Seeded %d users, %d projects, and %d collaborators in %.1f s' % (
+            len(dataset.user_ids), len(dataset.project_ids),
+            dataset.num_collaborators, seed_seconds)
+        replayer = Replayer(testutil.TestApp(server.APP), dataset, test_bed,
+                            rng)
+        for _ in range(NUM_WARMUP_REQUESTS):
+            replayer.send(record=False)
+        for _ in range(num_requests):
+            replayer.send()
+        return {
+            'commit': get_commit(),
+            'dataset': dict(dataset_sizes,
+                            collaborators=dataset.num_collaborators),
+            'seed': seed,
+            'routes': summarize(replayer.results),
+        }
+    finally:
+        test_bed.deactivate()
+
+
+def main():
+    """Runs the benchmark with the command line's options."""
+    parser = argparse.ArgumentParser(
+        description='Benchmarks every route against a seeded dataset.')
+    parser.add_argument('--dataset', choices=sorted(DATASETS),
+                        default='small')
+    for entity in ['users', 'projects', 'collaborators']:
+        parser.add_argument('--' + entity, type=int,
+                            help='overrides the dataset\'s number of ' + entity)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_routes.json')
+    parser.add_argument('--compare', help='a previous output to compare with')
+    args = parser.parse_args()
+    dataset_sizes = dict(DATASETS[args.dataset])
+    for entity in dataset_sizes:
+        if getattr(args, entity) is not None:
+            dataset_sizes[entity] = getattr(args, entity)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['routes']
+    results = benchmark_routes(dataset_sizes, args.requests, args.seed)
+    print_summaries(results['routes'], baseline)
+    with open(args.output, 'w') as output:
+        # The separators avoid trailing spaces, which would clutter diffs.
+        json.dump(results, output, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+        output.write('\n')
+    print 'Wrote %s' % args.output
+
+
+if __name__ == '__main__':
+    common.fix_app_engine_path()
+    main()
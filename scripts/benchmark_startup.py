@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Measures how long a new instance takes to import the app and serve "/".
+
+Each run happens in a new Python process so that nothing is imported yet, like
+on a new instance.  The script prints the median times and exits with an error
+if importing ctc.server takes longer than the budget, so that an import that
+slows down every cold start is caught before it is deployed.
+
+Usage: scripts/benchmark_startup.py [budget in ms]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+# To support running this file from the root, pylint: disable=F0401
+import common
+# pylint: enable=F0401
+
+
+NUM_RUNS = 10
+# The most that the median import of ctc.server may take.  Importing it only
+# imports webapp2 since the handlers are loaded on the first request, so this
+# leaves room for slower machines but not for importing the handlers.
+IMPORT_BUDGET_MS = 100
+# Tells the script to take a single measurement in this process.
+MEASURE_FLAG = '--measure'
+
+
+def measure_startup():
+    """Imports the server, serves "/", and prints the times in ms as JSON."""
+    start_time = time.time()
+    from ctc import server
+    import_ms = (time.time() - start_time) * 1000
+    # The testbed and webtest aren't part of a real instance's startup, so they
+    # are imported after the import is timed.
+    import webtest
+    from google.appengine.ext import testbed
+    test_bed = testbed.Testbed()
+    test_bed.activate()
+    test_bed.init_datastore_v3_stub()
+    test_bed.init_user_stub()
+    test_bed.init_memcache_stub()
+    app = webtest.TestApp(server.APP)
+    start_time = time.time()
+    app.get('/')
+    first_request_ms = (time.time() - start_time) * 1000
+    test_bed.deactivate()
+    print json.dumps({'import': import_ms, 'first_request': first_request_ms})
+
+
+def median(values):
+    """Returns the median of the values."""
+    return sorted(values)[len(values) / 2]
+
+
+def benchmark_startup(budget_ms):
+    """Prints the median startup times and returns whether they're in budget."""
+    runs = []
+    for _ in range(NUM_RUNS):
+        output = subprocess.check_output(
+            [sys.executable, os.path.realpath(__file__), MEASURE_FLAG])
+        runs.append(json.loads(output.splitlines()[-1]))
+    import_ms = median([run['import'] for run in runs])
+    first_request_ms = median([run['first_request'] for run in runs])
+    print 'import ctc.server: %8.1f ms (budget %.0f ms)' % (
+        import_ms, budget_ms)
+    print 'first request to /: %7.1f ms' % first_request_ms
+    if import_ms > budget_ms:
+        print 'Importing ctc.server is over budget.'
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    common.fix_app_engine_path()
+    os.chdir(common.get_project_dir())
+    if MEASURE_FLAG in sys.argv:
+        measure_startup()
+    else:
+        budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_MS
+        sys.exit(0 if benchmark_startup(budget) else 1)
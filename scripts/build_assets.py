@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""Builds the content-hashed static asset bundles.
+
+Run this whenever a file in a bundle changes, and commit its output in
+ctc/static/bundles so that deploys include it.  The tests fail if the committed
+bundles are stale.  Pages only load the bundles if they were built from the
+current files in ctc/static, so stale bundles are ignored rather than served.
+
+This prints the size of each bundle before and after bundling, and gzipped,
+which is roughly what clients download.
+"""
+
+import gzip
+import os
+import StringIO
+
+# To support running this file from the root, pylint: disable=F0401
+import common
+# pylint: enable=F0401
+
+
+def gzipped_size(contents):
+    """Returns the number of bytes in the gzipped contents."""
+    buffer_ = StringIO.StringIO()
+    gzip_file = gzip.GzipFile(fileobj=buffer_, mode='wb', compresslevel=9)
+    gzip_file.write(contents)
+    gzip_file.close()
+    return len(buffer_.getvalue())
+
+
+def build_assets():
+    """Writes the bundles to ctc/static/bundles and prints their sizes."""
+    common.fix_app_engine_path()
+    # The app can only be imported once the path is fixed.
+    from ctc.helpers import assets
+    all_contents = assets.build_bundles()
+    print '%-10s %7s %12s %12s %12s' % (
+        'Bundle', 'Files', 'Source (B)', 'Bundled (B)', 'Gzipped (B)')
+    for bundle_name, contents in sorted(all_contents.items()):
+        sources = assets.BUNDLES[bundle_name]
+        source_size = sum(
+            os.path.getsize(os.path.join(assets.STATIC_PATH, source))
+            for source in sources)
+        print '%-10s %7d %12d %12d %12d' % (
+            bundle_name, len(sources), source_size, len(contents),
+            gzipped_size(contents))
+    print 'Built bundles in %s' % assets.BUNDLE_PATH
+
+
+if __name__ == '__main__':
+    build_assets()
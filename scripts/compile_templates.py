@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""Compiles the Jinja2 templates into Python modules for faster cold starts.
+
+Run this whenever a template changes, and commit its output in
+ctc/compiled_views so that deploys include it.  The tests fail if the committed
+templates are stale.  The server only loads the compiled templates if they were
+compiled from the current templates by the running version of Jinja2, so stale
+ones are ignored rather than served.  Compile them with the SDK's Jinja2, the
+version that app.yaml pins, since that is the one production runs.
+"""
+
+# To support running this file from the root, pylint: disable=F0401
+import common
+# pylint: enable=F0401
+
+
+def compile_templates():
+    """Writes the compiled templates to ctc/compiled_views."""
+    common.fix_app_engine_path()
+    # The app can only be imported once the path is fixed.
+    from ctc.helpers import templates
+    templates.compile_templates()
+    print 'Compiled templates to %s' % templates.COMPILED_TEMPLATE_PATH
+
+
+if __name__ == '__main__':
+    compile_templates()
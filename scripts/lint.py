@@ -16,7 +16,10 @@ def get_files_to_lint():
     """Returns a list of all python files in the project's directory."""
     project_dir = common.get_project_dir()
     files_to_lint = []
-    for root, _, filenames in os.walk(project_dir):
+    for root, dirnames, filenames in os.walk(project_dir):
+        # The compiled templates are generated by scripts/compile_templates.py.
+        if 'compiled_views' in dirnames:
+            dirnames.remove('compiled_views')
         for filename in filenames:
             # We use empty __init__ files for imports.  They don't need
             # docstrings.